@@ -11,11 +11,14 @@ except ImportError:
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "tinify"))
 from version import __version__
 
-install_require = ["requests >= 2.7.0, < 3.0.0"]
+install_require = ["requests >= 2.7.0, < 3.0.0", "futures >= 3.0.0; python_version < '3'"]
 tests_require = ["pytest", "pytest-xdist", "requests-mock", "types-requests"]
 
+async_require = ["httpx >= 0.26"]
+
 if sys.version_info.major > 2:
     tests_require.append("mypy")
+    tests_require.extend(async_require)
 
 with io.open("README.md", encoding="utf-8") as f:
     long_description = f.read()
@@ -35,9 +38,18 @@ setup(
         "": ["LICENSE", "README.md"],
         "tinify": ["data/cacert.pem", "py.typed"],
     },
+    entry_points={
+        "console_scripts": ["tinify = tinify.cli:main"],
+    },
     install_requires=install_require,
     tests_require=tests_require,
-    extras_require={"test": tests_require},
+    extras_require={
+        "test": tests_require,
+        "async": async_require,
+        "http2": ["httpx[http2] >= 0.26"],
+        "prometheus": ["prometheus_client"],
+        "opentelemetry": ["opentelemetry-api"],
+    },
     classifiers=(
         "Development Status :: 5 - Production/Stable",
         "Intended Audience :: Developers",
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the client against a local fake Tinify API.
+
+The fake server can add latency, limit bandwidth and fail a share of requests, so the
+overhead of the client can be measured under realistic conditions without an API key:
+
+    python test/benchmark.py --size 256KB --latency 0.005 --bandwidth 50MB --error-rate 0.01
+
+The time taken by `import tinify` is measured as well, in fresh interpreters. Compare HTTP
+stacks with --transport.
+
+Save results with --json and compare a later run against them with --baseline to catch
+regressions; the run fails when a scenario is more than --tolerance slower.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # type: ignore
+    from SocketServer import ThreadingMixIn  # type: ignore
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # type: ignore
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+import tinify
+
+# Timed in a fresh interpreter, as a module is only imported once per process.
+IMPORT_SCRIPT = """
+import sys, time
+started = time.time()
+import tinify
+print(time.time() - started)
+print(",".join(m for m in ("requests", "urllib3", "asyncio", "httpx") if m in sys.modules))
+"""
+
+
+class FakeTinify(ThreadingMixIn, HTTPServer):
+    """Local HTTP server that answers like the Tinify API."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0, bandwidth=None, error_rate=0.0, seed=0):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), FakeTinifyHandler)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.outputs = {}
+        self.ids = itertools.count()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://{0}:{1}".format(*self.server_address)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+class FakeTinifyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle delay the body.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.handle_request()
+
+    def do_GET(self):
+        self.handle_request()
+
+    def handle_request(self):
+        body = self.read_body()
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail():
+            return self.respond(503, {"Content-Type": "application/json"},
+                b'{"error":"ServiceUnavailable","message":"Injected error"}')
+
+        if self.path == "/shrink":
+            with server.lock:
+                id = str(next(server.ids))
+                # Pretend the image compresses to half its size.
+                server.outputs[id] = body[:len(body) // 2]
+            return self.respond(201, {
+                "Location": tinify.Client.API_ENDPOINT + "/output/" + id,
+                "Compression-Count": id,
+                "Content-Type": "application/json",
+            }, json.dumps({"input": {"size": len(body)}}).encode("utf-8"))
+
+        match = re.match(r"^/output/(\d+)$", self.path)
+        data = server.outputs.get(match.group(1)) if match else None
+        if data is None:
+            return self.respond(404, {"Content-Type": "application/json"},
+                b'{"error":"NotFound","message":"Not found"}')
+
+        commands = json.loads(body.decode("utf-8")) if body else {}
+        if "store" in commands:
+            return self.respond(200, {
+                "Location": "https://bucket.s3-region.amazonaws.com/output",
+                "Content-Type": "application/json",
+            }, b'{"status":"success"}')
+        if "resize" in commands:
+            data = data[:len(data) // 4]
+        self.respond(200, {"Content-Type": "image/png", "Image-Width": "100", "Image-Height": "100"}, data)
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        bandwidth = self.server.bandwidth
+        chunk_size = 16 * 1024
+        for offset in range(0, len(body), chunk_size):
+            chunk = body[offset:offset + chunk_size]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+
+class Traffic(object):
+    """Observer that counts the bytes sent and received."""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        with self.lock:
+            self.sent += event.bytes_sent or 0
+            self.received += event.bytes_received or 0
+
+
+def scenarios(data, concurrency):
+    def buffer():
+        tinify.from_buffer(data).to_buffer()
+
+    def chained():
+        tinify.from_buffer(data).resize(method="fit", width=100, height=100).convert(type="image/webp").to_buffer()
+
+    def store():
+        tinify.from_buffer(data).store(service="s3", aws_access_key_id="key", aws_secret_access_key="secret",
+            region="us-east-1", path="bucket/output.png")
+
+    def stream():
+        for _ in tinify.from_buffer(data).iter_content():
+            pass
+
+    def batch():
+        items = tinify.compress_many([data] * concurrency, concurrency=concurrency)
+        for item in items:
+            if item.error:
+                raise item.error
+
+    # Name, function, operations per call and threads calling it.
+    return [
+        ("from_buffer.to_buffer", buffer, 1, 1),
+        ("from_buffer.to_buffer x{0} threads".format(concurrency), buffer, 1, concurrency),
+        ("resize.convert.to_buffer", chained, 1, 1),
+        ("store", store, 1, 1),
+        ("iter_content", stream, 1, 1),
+        ("compress_many", batch, concurrency, 1),
+    ]
+
+
+def measure(fn, iterations, concurrency=1):
+    latencies = []
+    lock = threading.Lock()
+
+    def timed():
+        started = time.time()
+        fn()
+        with lock:
+            latencies.append(time.time() - started)
+
+    started = time.time()
+    if concurrency == 1:
+        for _ in range(iterations):
+            timed()
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(timed) for _ in range(iterations)]:
+                future.result()
+    return time.time() - started, sorted(latencies)
+
+
+def measure_import(iterations):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    latencies = []
+    for _ in range(iterations):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT], env=env).decode("utf-8").split("\n")
+        latencies.append(float(output[0]))
+        if output[1]:
+            print("import tinify also imported " + output[1], file=sys.stderr)
+    return sum(latencies), sorted(latencies)
+
+
+def peak_memory(fn, iterations):
+    """Highest memory allocated by a single call to fn, or None without tracemalloc.
+
+    Tracing starts afresh for every call, so only memory allocated on the request path counts.
+    """
+    if tracemalloc is None:
+        return None
+    peak = 0
+    for _ in range(iterations):
+        tracemalloc.start()
+        try:
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return peak
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0.0
+
+
+TRANSPORTS = {
+    "requests": tinify.RequestsTransport,
+    "urllib3": tinify.Urllib3Transport,
+    "httpx": tinify.HttpxTransport,
+    "httpx-http1": lambda *args, **kwargs: tinify.HttpxTransport(*args, http2=False, **kwargs),
+}
+
+
+def local(factory, url):
+    """Transport factory that sends the requests for the Tinify API to the fake server instead.
+
+    The client itself only talks HTTPS; the fake server is reached over plain HTTP on localhost.
+    """
+    def create(*args, **kwargs):
+        transport = factory(*args, **kwargs)
+        if hasattr(transport, "adapter"):
+            # Use the pooled adapter of the requests transport for plain HTTP as well.
+            transport.session.mount("http://", transport.adapter)
+        send = transport.request
+
+        def request(method, location, *args, **kwargs):
+            if location.startswith(tinify.Client.API_ENDPOINT):
+                location = url + location[len(tinify.Client.API_ENDPOINT):]
+            return send(method, location, *args, **kwargs)
+
+        transport.request = request
+        return transport
+    return create
+
+
+def run(args):
+    data = os.urandom(args.size)
+    traffic = Traffic()
+    tinify.key = "benchmark"
+    tinify.pool_maxsize = max(args.concurrency, tinify.Client.POOL_MAXSIZE)
+    tinify.retry_policy = tinify.RetryPolicy(retries=5, delay=0.001, max_delay=0.01)
+    tinify.observers = [traffic]
+
+    elapsed, latencies = measure_import(args.import_runs)
+    results = {"import tinify": {
+        "ops_per_sec": args.import_runs / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "bytes_sent": 0,
+        "bytes_received": 0,
+        "peak_memory": None,
+        "copies": None,
+    }}
+    with FakeTinify(args.latency, args.bandwidth, args.error_rate) as server:
+        tinify.transport = local(TRANSPORTS[args.transport], server.url)
+        for name, fn, ops, concurrency in scenarios(data, args.concurrency):
+            iterations = args.iterations if ops == 1 else max(1, args.iterations // ops)
+            measure(fn, min(iterations, 5), concurrency)
+
+            traffic.sent = traffic.received = 0
+            elapsed, latencies = measure(fn, iterations, concurrency)
+            # Read the traffic before peak_memory calls fn again.
+            sent, received = traffic.sent, traffic.received
+            peak = peak_memory(fn, min(iterations, 10))
+            results[name] = {
+                "ops_per_sec": iterations * ops / elapsed,
+                "p50_ms": percentile(latencies, 0.5) * 1000,
+                "p99_ms": percentile(latencies, 0.99) * 1000,
+                "bytes_sent": sent // (iterations * ops),
+                "bytes_received": received // (iterations * ops),
+                "peak_memory": peak,
+                # tracemalloc has no running total of allocations, so copies are counted as the
+                # number of input-sized buffers alive at the peak of an operation.
+                "copies": peak / (len(data) * ops) if peak is not None else None,
+            }
+    return results
+
+
+def report(results, baseline, tolerance):
+    print("{0:<34} {1:>10} {2:>9} {3:>9} {4:>11} {5:>11} {6:>11} {7:>7}".format(
+        "scenario", "ops/s", "p50 ms", "p99 ms", "sent/op", "recv/op", "peak mem", "copies"))
+    regressions = []
+    for name, result in results.items():
+        copies = result.get("copies")
+        print("{0:<34} {1:>10.1f} {2:>9.2f} {3:>9.2f} {4:>11} {5:>11} {6:>11} {7:>7}".format(
+            name, result["ops_per_sec"], result["p50_ms"], result["p99_ms"],
+            result["bytes_sent"], result["bytes_received"], result["peak_memory"] or "-",
+            "-" if copies is None else "{0:.1f}".format(copies)))
+        previous = baseline.get(name)
+        if previous and result["ops_per_sec"] < previous["ops_per_sec"] * (1 - tolerance):
+            regressions.append("{0}: {1:.1f} ops/s, baseline {2:.1f}".format(
+                name, result["ops_per_sec"], previous["ops_per_sec"]))
+    for regression in regressions:
+        print("Regression in " + regression, file=sys.stderr)
+    return regressions
+
+
+def size(value):
+    match = re.match(r"^(\d+(?:\.\d+)?)\s*([KMG]?)B?$", value.strip(), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError("invalid size: " + value)
+    return int(float(match.group(1)) * 1024 ** " KMG".index(match.group(2).upper() or " "))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the client against a local fake Tinify API.")
+    parser.add_argument("--iterations", type=int, default=200, help="operations per scenario (default: 200)")
+    parser.add_argument("--size", type=size, default=size("100KB"), help="input size, e.g. 100KB (default: 100KB)")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads for concurrent scenarios (default: 8)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=size, default=None, help="bytes per second per response, e.g. 50MB")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail with HTTP 503")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="requests",
+        help="HTTP transport of the client (default: requests)")
+    parser.add_argument("--import-runs", type=int, default=20, help="fresh interpreters timing import tinify (default: 20)")
+    parser.add_argument("--json", metavar="FILE", help="write results to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with results written by --json")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = report(results, baseline, args.tolerance)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
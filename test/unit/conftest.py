@@ -1,8 +1,14 @@
 import pytest
 import os
+import sys
 import tinify
 import requests_mock
 
+# The asyncio tests use syntax that older interpreters can not even parse.
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore += ["tinify_async_client_test.py", "tinify_async_source_test.py"]
+
 
 @pytest.fixture
 def dummy_file():
@@ -12,21 +18,98 @@ def dummy_file():
 @pytest.fixture(autouse=True)
 def reset_tinify():
     original_key = tinify.key
+    original_keys = tinify.keys
     original_app_identifier = tinify.app_identifier
     original_proxy = tinify.proxy
+    original_pool_maxsize = tinify.pool_maxsize
+    original_pool_block = tinify.pool_block
+    original_keep_alive = tinify.keep_alive
+    original_cache = tinify.cache
+    original_lazy = tinify.lazy
+    original_preflight = tinify.preflight
+    original_retry_policy = tinify.retry_policy
+    original_rate_limiter = tinify.rate_limiter
+    original_timeout = tinify.timeout
+    original_transport = tinify.transport
+    original_observers = tinify.observers
+    original_usage_thresholds = tinify.usage_thresholds
 
     tinify.key = None
+    tinify.keys = []
     tinify.app_identifier = None
     tinify.proxy = None
+    tinify.cache = None
+    tinify.lazy = False
+    tinify.preflight = None
+    tinify.transport = None
+    tinify.compression_count = None
 
     yield
 
     tinify.key = original_key
+    tinify.keys = original_keys
     tinify.app_identifier = original_app_identifier
     tinify.proxy = original_proxy
+    tinify.pool_maxsize = original_pool_maxsize
+    tinify.pool_block = original_pool_block
+    tinify.keep_alive = original_keep_alive
+    tinify.cache = original_cache
+    tinify.lazy = original_lazy
+    tinify.preflight = original_preflight
+    tinify.retry_policy = original_retry_policy
+    tinify.rate_limiter = original_rate_limiter
+    tinify.timeout = original_timeout
+    tinify.transport = original_transport
+    tinify.observers = original_observers
+    tinify.usage_thresholds = original_usage_thresholds
 
 
 @pytest.fixture
 def mock_requests():
     with requests_mock.Mocker(real_http=False) as m:
         yield m
+
+
+class HttpxMock(object):
+    """Minimal router for httpx.MockTransport, mirroring the requests-mock API we use."""
+
+    def __init__(self):
+        self.routes = {}
+        self.request_history = []
+
+    def register(self, method, url, *responses):
+        self.routes[(method.upper(), url)] = list(responses)
+
+    @property
+    def last_request(self):
+        return self.request_history[-1] if self.request_history else None
+
+    @property
+    def call_count(self):
+        return len(self.request_history)
+
+    def __call__(self, request):
+        import httpx
+
+        self.request_history.append(request)
+        responses = self.routes[(request.method, str(request.url))]
+        response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if callable(response):
+            response = response(request)
+        if isinstance(response, Exception):
+            raise response
+        return httpx.Response(**response)
+
+
+@pytest.fixture
+def mock_httpx(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    mock = HttpxMock()
+    original = httpx.AsyncClient
+
+    def async_client(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(mock)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", async_client)
+    yield mock
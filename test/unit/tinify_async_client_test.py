@@ -0,0 +1,119 @@
+import asyncio
+import base64
+import json
+import pytest
+import tinify
+from tinify import AsyncClient, ClientError, ServerError, ConnectionError, AccountError
+
+httpx = pytest.importorskip("httpx")
+
+AsyncClient.RETRY_DELAY = 10
+
+
+def request(method, url, body=None):
+    async def run():
+        async with AsyncClient("key") as client:
+            return await client.request(method, url, body)
+
+    return asyncio.run(run())
+
+
+class TestAsyncClientRequestWhenValid:
+    def test_should_issue_request(self, mock_httpx):
+        mock_httpx.register(
+            "GET", "https://api.tinify.com/", {"status_code": 200, "headers": {"compression-count": "12"}}
+        )
+
+        request("GET", "/")
+
+        auth_header = "Basic {0}".format(base64.b64encode(b"api:key").decode("ascii"))
+        assert mock_httpx.last_request.headers["authorization"] == auth_header
+
+    def test_should_issue_request_with_json_body(self, mock_httpx):
+        mock_httpx.register("POST", "https://api.tinify.com/", {"status_code": 200})
+
+        request("POST", "/", {"hello": "world"})
+
+        assert mock_httpx.last_request.headers["content-type"] == "application/json"
+        assert mock_httpx.last_request.content == b'{"hello":"world"}'
+
+    def test_should_issue_request_without_body_when_options_are_empty(self, mock_httpx):
+        mock_httpx.register("GET", "https://api.tinify.com/", {"status_code": 200})
+
+        request("GET", "/", {})
+
+        assert mock_httpx.last_request.content == b""
+        assert "content-type" not in mock_httpx.last_request.headers
+
+    def test_should_issue_request_with_user_agent(self, mock_httpx):
+        mock_httpx.register("GET", "https://api.tinify.com/", {"status_code": 200})
+
+        request("GET", "/")
+
+        assert mock_httpx.last_request.headers["user-agent"] == AsyncClient.USER_AGENT
+
+    def test_should_update_compression_count(self, mock_httpx):
+        mock_httpx.register(
+            "GET", "https://api.tinify.com/", {"status_code": 200, "headers": {"compression-count": "12"}}
+        )
+
+        request("GET", "/")
+
+        assert tinify.compression_count == 12
+
+
+class TestAsyncClientRequestWithErrors:
+    def test_should_raise_connection_error_on_timeout(self, mock_httpx):
+        mock_httpx.register("GET", "https://api.tinify.com/", httpx.ConnectTimeout("Timeout"))
+
+        with pytest.raises(ConnectionError) as excinfo:
+            request("GET", "/")
+        assert str(excinfo.value) == "Timeout while connecting"
+        assert mock_httpx.call_count == 2
+
+    def test_should_issue_request_after_connection_error_once(self, mock_httpx):
+        mock_httpx.register(
+            "GET",
+            "https://api.tinify.com/",
+            httpx.ConnectError("connection error"),
+            {"status_code": 201},
+        )
+
+        assert request("GET", "/").status_code == 201
+        assert mock_httpx.call_count == 2
+
+    def test_should_issue_request_after_server_error_once(self, mock_httpx):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_httpx.register(
+            "GET",
+            "https://api.tinify.com/",
+            {"status_code": 584, "text": error_body},
+            {"status_code": 201},
+        )
+
+        assert request("GET", "/").status_code == 201
+
+    def test_should_raise_server_error_repeatedly(self, mock_httpx):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_httpx.register("GET", "https://api.tinify.com/", {"status_code": 584, "text": error_body})
+
+        with pytest.raises(ServerError) as excinfo:
+            request("GET", "/")
+        assert str(excinfo.value) == "Oops! (HTTP 584/InternalServerError)"
+
+    def test_should_raise_client_error(self, mock_httpx):
+        error_body = json.dumps({"error": "BadRequest", "message": "Oops!"})
+        mock_httpx.register("GET", "https://api.tinify.com/", {"status_code": 492, "text": error_body})
+
+        with pytest.raises(ClientError) as excinfo:
+            request("GET", "/")
+        assert str(excinfo.value) == "Oops! (HTTP 492/BadRequest)"
+        assert mock_httpx.call_count == 1
+
+    def test_should_raise_account_error(self, mock_httpx):
+        error_body = json.dumps({"error": "Unauthorized", "message": "Oops!"})
+        mock_httpx.register("GET", "https://api.tinify.com/", {"status_code": 401, "text": error_body})
+
+        with pytest.raises(AccountError) as excinfo:
+            request("GET", "/")
+        assert str(excinfo.value) == "Oops! (HTTP 401/Unauthorized)"
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import pytest
+
+import tinify
+from tinify import AsyncSource, Result, ResultMeta, AccountError
+
+pytest.importorskip("httpx")
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestAsyncSourceWithInvalidApiKey:
+    def test_from_buffer_should_raise_account_error(self, mock_httpx):
+        tinify.key = "invalid"
+        mock_httpx.register("POST", "https://api.tinify.com/shrink", {"status_code": 401})
+
+        with pytest.raises(AccountError):
+            run(AsyncSource.from_buffer(b"png file"))
+
+
+class TestAsyncSourceWithValidApiKey:
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_httpx):
+        tinify.key = "valid"
+        mock_httpx.register(
+            "POST",
+            "https://api.tinify.com/shrink",
+            {"status_code": 201, "headers": {"location": "https://api.tinify.com/some/location"}},
+        )
+        mock_httpx.register("GET", "https://api.tinify.com/some/location", self.return_file)
+        mock_httpx.register("POST", "https://api.tinify.com/some/location", self.return_file)
+
+    def return_file(self, request):
+        data = json.loads(request.content) if request.content else {}
+        if "store" in data:
+            return {
+                "status_code": 200,
+                "headers": {"location": "https://bucket.s3-region.amazonaws.com/some/location"},
+                "json": {"status": "success"},
+            }
+        elif "resize" in data:
+            return {"status_code": 200, "content": b"small file"}
+        else:
+            return {"status_code": 200, "content": b"compressed file"}
+
+    def test_from_file_with_path_should_return_source_with_data(self, dummy_file):
+        async def go():
+            return await (await AsyncSource.from_file(dummy_file)).to_buffer()
+
+        assert b"compressed file" == run(go())
+
+    def test_from_buffer_should_return_source(self, mock_httpx):
+        source = run(AsyncSource.from_buffer(b"png file"))
+        assert isinstance(source, AsyncSource)
+        assert b"png file" == mock_httpx.last_request.content
+
+    def test_from_url_should_return_source(self, mock_httpx):
+        assert isinstance(run(AsyncSource.from_url("http://example.com/test.jpg")), AsyncSource)
+        assert {"source": {"url": "http://example.com/test.jpg"}} == json.loads(
+            mock_httpx.last_request.content
+        )
+
+    def test_result_should_return_result(self):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).result()
+
+        assert isinstance(run(go()), Result)
+
+    def test_resize_should_return_source_with_data(self, mock_httpx):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).resize(width=400).to_buffer()
+
+        assert b"small file" == run(go())
+        assert {"resize": {"width": 400}} == json.loads(mock_httpx.last_request.content)
+
+    def test_store_should_return_result_meta_with_location(self):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).store(service="s3")
+
+        meta = run(go())
+        assert isinstance(meta, ResultMeta)
+        assert "https://bucket.s3-region.amazonaws.com/some/location" == meta.location
+
+    def test_to_file_should_store_image_data(self, tmp_path):
+        path = str(tmp_path / "out.png")
+
+        async def go():
+            await (await AsyncSource.from_buffer(b"png file")).to_file(path)
+
+        run(go())
+        with open(path, "rb") as f:
+            assert b"compressed file" == f.read()
+
+    def test_to_buffer_should_return_image_data(self):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).to_buffer(timeout=5)
+
+        assert b"compressed file" == run(go())
+
+    def test_meta_should_return_result_meta(self):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).meta(timeout=5)
+
+        assert isinstance(run(go()), ResultMeta)
+
+    def test_variants_should_return_results_by_name(self, mock_httpx):
+        async def go():
+            source = await AsyncSource.from_buffer(b"png file")
+            return await source.variants({"small": {"resize": {"width": 100}}, "same": {"resize": {"width": 100}}})
+
+        results = run(go())
+        assert [b"small file"] * 2 == [results["small"].data, results["same"].data]
+        assert mock_httpx.call_count == 2
+
+    def test_variants_should_return_results_in_order(self):
+        async def go():
+            source = await AsyncSource.from_buffer(b"png file")
+            return await source.variants([{"resize": {"width": 100}}, {}], concurrency=1)
+
+        assert [b"small file", b"compressed file"] == [result.data for result in run(go())]
+
+    def test_store_should_accept_timeout(self):
+        async def go():
+            return await (await AsyncSource.from_buffer(b"png file")).store(timeout=5, service="s3")
+
+        assert "https://bucket.s3-region.amazonaws.com/some/location" == run(go()).location
+
+    def test_result_should_raise_connection_error_after_timeout(self, monkeypatch):
+        async def slow(*args):
+            await asyncio.sleep(1)
+
+        async def go():
+            source = await AsyncSource.from_buffer(b"png file")
+            monkeypatch.setattr(type(tinify.get_async_client()), "request", slow)
+            return await source.result(timeout=0.01)
+
+        with pytest.raises(tinify.ConnectionError):
+            run(go())
+
+    def test_should_refuse_streamed_and_lazy_downloads(self, tmp_path):
+        async def go():
+            source = await AsyncSource.from_buffer(b"png file")
+            with pytest.raises(NotImplementedError):
+                source.iter_content()
+            with pytest.raises(NotImplementedError):
+                await source.to_file(str(tmp_path / "out.png"), stream=True)
+            with pytest.raises(NotImplementedError):
+                await source.result(lazy=True)
+
+        run(go())
+
+    def test_should_keep_many_compressions_in_flight(self, mock_httpx):
+        async def go():
+            sources = await asyncio.gather(*[AsyncSource.from_buffer(b"png file") for _ in range(20)])
+            return await asyncio.gather(*[source.to_buffer() for source in sources])
+
+        assert [b"compressed file"] * 20 == run(go())
+        assert mock_httpx.call_count == 40
+
+
+def test_using_should_scope_key_per_task(mock_httpx):
+    tinify.key = "abcde"
+
+    async def key_in(key):
+        with tinify.using(key=key):
+            await asyncio.sleep(0)
+            return tinify.get_async_client().usage.key
+
+    async def main():
+        return await asyncio.gather(key_in("one"), key_in("two"))
+
+    assert run(main()) == ["one", "two"]
+
+
+def test_get_async_client_should_reject_key_pools():
+    tinify.keys = ["one", "two"]
+
+    async def main():
+        return tinify.get_async_client()
+
+    with pytest.raises(AccountError) as excinfo:
+        run(main())
+    assert "does not support key pools" in str(excinfo.value)
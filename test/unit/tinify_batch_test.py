@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import pickle
+import re
+import pytest
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+import tinify
+import tinify.batch
+from tinify import Batch, BatchItem, ProcessBatch, Result, ResultMeta, ClientError
+
+OUTPUT_URL = re.compile(r"https://api\.tinify\.com/output/.*")
+
+
+@pytest.fixture(autouse=True)
+def setup(mock_requests):
+    tinify.key = "valid"
+
+    def shrink(request, context):
+        body = request.body.read() if hasattr(request.body, "read") else request.body
+        if body == b"bad file":
+            context.status_code = 400
+            return json.dumps({"error": "BadRequest", "message": "Oops!"})
+        context.status_code = 201
+        context.headers["location"] = "https://api.tinify.com/output/" + body.decode("ascii")
+        return ""
+
+    def output(request, context):
+        data = request.json() if request.body else {}
+        name = request.url.rsplit("/", 1)[-1].encode("ascii")
+        if "resize" in data:
+            return b"small " + name
+        return b"compressed " + name
+
+    mock_requests.post("https://api.tinify.com/shrink", text=shrink)
+    mock_requests.get(OUTPUT_URL, content=output)
+    mock_requests.post(OUTPUT_URL, content=output)
+
+
+def test_compress_many_should_return_items_in_input_order():
+    inputs = [("file%d" % i).encode("ascii") for i in range(20)]
+    items = tinify.compress_many(inputs, concurrency=5)
+
+    assert [item.index for item in items] == list(range(20))
+    assert all(isinstance(item, BatchItem) for item in items)
+    assert [item.result.to_buffer() for item in items] == [b"compressed " + i for i in inputs]
+
+
+def test_compress_many_should_not_run_more_threads_than_pool_holds(monkeypatch):
+    workers = []
+
+    class Executor(ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            workers.append(max_workers)
+            ThreadPoolExecutor.__init__(self, max_workers)
+
+    monkeypatch.setattr(concurrent.futures, "ThreadPoolExecutor", Executor)
+    tinify.compress_many([b"one", b"two"], concurrency=20)
+    tinify.pool_maxsize = 16
+    tinify.compress_many([b"one", b"two"], concurrency=20)
+
+    assert workers == [tinify.Client.POOL_MAXSIZE, 16]
+
+
+def test_compress_many_should_collect_errors_per_item():
+    items = tinify.compress_many([b"one", b"bad file", b"two"])
+
+    assert items[0].ok and items[2].ok
+    assert not items[1].ok
+    assert isinstance(items[1].error, ClientError)
+
+
+def test_compress_many_should_apply_commands():
+    items = tinify.compress_many([b"one"], resize={"width": 100})
+
+    assert items[0].result.to_buffer() == b"small one"
+
+
+def test_compress_many_should_write_outputs(tmp_path):
+    source = tmp_path / "in.png"
+    source.write_bytes(b"path")
+    outputs = [str(tmp_path / "a.png"), str(tmp_path / "b.png")]
+
+    items = tinify.compress_many([str(source), b"buffer"], outputs)
+
+    assert (tmp_path / "a.png").read_bytes() == b"compressed path"
+    assert (tmp_path / "b.png").read_bytes() == b"compressed buffer"
+    assert all(type(item.result) is ResultMeta for item in items)
+
+
+def test_compress_many_should_require_matching_outputs():
+    with pytest.raises(ValueError):
+        tinify.compress_many([b"one", b"two"], ["out.png"])
+
+
+def test_cancel_should_skip_remaining_items(mock_requests):
+    batch = Batch([("file%d" % i).encode("ascii") for i in range(10)], concurrency=1)
+    original = batch._upload
+
+    def upload(input):
+        if input == b"file0":
+            batch.cancel()
+        return original(input)
+
+    batch._upload = upload
+    items = batch.run()
+
+    assert items[0].cancelled
+    assert all(item.cancelled for item in items)
+    assert mock_requests.call_count == 1
+
+
+def test_compress_many_should_accept_lazy_sources(mock_requests):
+    tinify.lazy = True
+    source = tinify.from_buffer(b"png file")
+    items = tinify.compress_many([source.resize(width=10), source.resize(width=20)])
+
+    assert all(item.ok for item in items)
+    shrinks = [r for r in mock_requests.request_history if r.path == "/shrink"]
+    assert len(shrinks) == 1
+
+
+def test_compress_many_with_journal_should_skip_completed_outputs(mock_requests, tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+    outputs = [str(tmp_path / "a.png"), str(tmp_path / "b.png")]
+
+    tinify.compress_many([b"one", b"two"], outputs, journal=journal)
+    calls = mock_requests.call_count
+    items = tinify.compress_many([b"one", b"two"], outputs, journal=journal)
+
+    assert mock_requests.call_count == calls
+    assert all(item.ok and item.resumed for item in items)
+    assert isinstance(items[0].result, ResultMeta)
+
+
+def test_compress_many_with_journal_should_reuse_recorded_locations(mock_requests, tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+    tinify.compress_many([b"one"], journal=journal)
+    items = tinify.compress_many([b"one"], journal=journal, resize={"width": 100})
+
+    shrinks = [r for r in mock_requests.request_history if r.path == "/shrink"]
+    assert len(shrinks) == 1
+    assert items[0].result.to_buffer() == b"small one"
+
+
+def test_compress_many_with_journal_should_upload_again_when_location_expired(mock_requests, tmp_path):
+    journal = tinify.Journal(str(tmp_path / "journal.jsonl"))
+    journal.record_upload(tinify.Batch([b"one"])._digest(b"one"), "https://api.tinify.com/expired")
+    mock_requests.get("https://api.tinify.com/expired", status_code=404, json={"error": "NotFound", "message": "Gone"})
+
+    items = tinify.compress_many([b"one"], journal=journal)
+    journal.close()
+
+    assert items[0].result.to_buffer() == b"compressed one"
+
+
+def test_compress_many_with_journal_should_not_upload_cached_inputs(mock_requests, tmp_path):
+    journal = str(tmp_path / "journal.jsonl")
+    tinify.cache = tinify.MemoryCache()
+    tinify.compress_many([b"one"])
+    items = tinify.compress_many([b"one"], journal=journal)
+
+    shrinks = [r for r in mock_requests.request_history if r.path == "/shrink"]
+    assert len(shrinks) == 1
+    assert items[0].result.to_buffer() == b"compressed one"
+
+
+def test_compress_many_with_journal_should_not_upload_skipped_inputs(mock_requests, tmp_path):
+    image = os.path.join(os.path.dirname(__file__), "..", "examples", "voormedia.png")
+    tinify.preflight = tinify.Preflight(min_size=10 ** 9)
+    output = str(tmp_path / "out.png")
+
+    items = tinify.compress_many([image], [output], journal=str(tmp_path / "journal.jsonl"))
+
+    assert items[0].ok
+    assert mock_requests.request_history == []
+    with open(image, "rb") as f:
+        assert (tmp_path / "out.png").read_bytes() == f.read()
+
+
+class PicklingExecutor(ThreadPoolExecutor):
+    """Runs tasks in threads, but sends them through pickle like a process pool."""
+
+    def submit(self, fn, *args, **kwargs):
+        fn, args, kwargs = pickle.loads(pickle.dumps((fn, args, kwargs)))
+        return ThreadPoolExecutor.submit(self, fn, *args, **kwargs)
+
+
+def shout(data):
+    return data.upper()
+
+
+def test_process_batch_should_send_only_settings_to_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", PicklingExecutor)
+    monkeypatch.setattr(tinify.batch, "_applied_settings", None)
+    tinify.timeout = 30
+    output = str(tmp_path / "out.png")
+
+    items = ProcessBatch([b"one", b"two", b"bad file"], [output, None, None], postprocess=shout,
+        resize={"width": 100}).run()
+
+    assert (tmp_path / "out.png").read_bytes() == b"SMALL ONE"
+    assert type(items[0].result) is ResultMeta
+    assert isinstance(items[1].result, Result) and items[1].result.to_buffer() == b"SMALL TWO"
+    assert isinstance(items[2].error, ClientError)
+
+
+def test_process_batch_should_send_picklable_settings_to_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", PicklingExecutor)
+    monkeypatch.setattr(tinify.batch, "_applied_settings", None)
+    limiter = tinify.FileRateLimiter(str(tmp_path / "limiter"), max_in_flight=2)
+    tinify.rate_limiter = limiter
+    tinify.cache = tinify.FileCache(str(tmp_path / "cache"))
+    tinify.usage_thresholds = [(100, lambda client, threshold, count: None)]
+
+    with pytest.warns(RuntimeWarning, match="usage_thresholds"):
+        items = ProcessBatch([b"one"]).run()
+
+    assert items[0].result.to_buffer() == b"compressed one"
+    assert tinify.rate_limiter is not limiter
+    assert (tinify.rate_limiter.path, tinify.rate_limiter.max_in_flight) == (limiter.path, 2)
+    assert len(os.listdir(str(tmp_path / "cache"))) == 1
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+import pytest
+
+from tinify import cli
+
+OUTPUT_URL = re.compile(r"https://api\.tinify\.com/output/.*")
+
+
+@pytest.fixture(autouse=True)
+def setup(mock_requests):
+    def shrink(request, context):
+        body = request.body.read() if hasattr(request.body, "read") else request.body
+        context.status_code = 201
+        context.headers["location"] = "https://api.tinify.com/output/" + body.decode("ascii")
+        return ""
+
+    def output(request, context):
+        data = request.json() if request.body else {}
+        if "resize" in data:
+            return b"small"
+        return b"tiny"
+
+    mock_requests.post("https://api.tinify.com/shrink", text=shrink)
+    mock_requests.get(OUTPUT_URL, content=output)
+    mock_requests.post(OUTPUT_URL, content=output)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "in" / "sub").mkdir(parents=True)
+    (tmp_path / "in" / "a.png").write_bytes(b"aaaaaaaa")
+    (tmp_path / "in" / "sub" / "b.jpg").write_bytes(b"bbbbbbbb")
+    (tmp_path / "in" / "notes.txt").write_bytes(b"text")
+    return tmp_path
+
+
+def test_collect_should_find_images_in_directories_and_globs(tree):
+    root = str(tree / "in")
+    found = sorted(cli.collect([root, os.path.join(root, "**", "*.jpg")]))
+
+    assert found == [
+        (os.path.join(root, "a.png"), "a.png"),
+        (os.path.join(root, "sub", "b.jpg"), os.path.join("sub", "b.jpg")),
+    ]
+
+
+def test_main_should_mirror_input_tree(tree, capsys):
+    status = cli.main(["--key", "valid", "--output", str(tree / "out"), str(tree / "in")])
+
+    assert status == 0
+    assert (tree / "out" / "a.png").read_bytes() == b"tiny"
+    assert (tree / "out" / "sub" / "b.jpg").read_bytes() == b"tiny"
+    assert not (tree / "out" / "notes.txt").exists()
+    assert "2 compressed, 0 unchanged, 0 failed" in capsys.readouterr().err
+
+
+def test_main_should_compress_in_place_with_commands(tree, mock_requests):
+    status = cli.main(["--key", "valid", "--in-place", "-q", "--resize-method", "fit", "--width", "10",
+        "--height", "10", "--preserve", "copyright", "--preserve", "creation", str(tree / "in" / "a.png")])
+
+    assert status == 0
+    assert (tree / "in" / "a.png").read_bytes() == b"small"
+    assert mock_requests.last_request.json() == {
+        "resize": {"method": "fit", "width": 10, "height": 10},
+        "preserve": ["copyright", "creation"],
+    }
+
+
+def test_main_should_scale_when_only_width_is_given(tree, mock_requests):
+    status = cli.main(["--key", "valid", "--in-place", "-q", "--width", "10", str(tree / "in" / "a.png")])
+
+    assert status == 0
+    assert (tree / "in" / "a.png").read_bytes() == b"small"
+    assert mock_requests.last_request.json() == {"resize": {"method": "scale", "width": 10}}
+
+
+def test_main_should_require_resize_method_for_width_and_height(tree, mock_requests, capsys):
+    with pytest.raises(SystemExit):
+        cli.main(["--key", "valid", "--in-place", "--width", "10", "--height", "10", str(tree / "in")])
+
+    assert "requires --resize-method" in capsys.readouterr().err
+    assert mock_requests.call_count == 0
+
+
+def test_main_should_change_extension_when_converting(tree):
+    cli.main(["--key", "valid", "-q", "--output", str(tree / "out"), "--convert", "image/webp", str(tree / "in")])
+
+    assert (tree / "out" / "a.webp").exists()
+    assert (tree / "out" / "sub" / "b.webp").exists()
+
+
+def test_main_should_name_outputs_after_picked_type_when_converting_to_several(tree, mock_requests):
+    mock_requests.post(OUTPUT_URL, content=b"tiny", headers={"Content-Type": "image/webp"})
+
+    status = cli.main(["--key", "valid", "-q", "--output", str(tree / "out"),
+        "--convert", "image/webp", "--convert", "image/png", str(tree / "in")])
+
+    assert status == 0
+    assert mock_requests.last_request.json() == {"convert": {"type": ["image/webp", "image/png"]}}
+    assert sorted(os.listdir(str(tree / "out"))) == ["a.webp", "sub"]
+    assert os.listdir(str(tree / "out" / "sub")) == ["b.webp"]
+
+
+def test_main_should_resume_journal_when_converting_to_several(tree, mock_requests):
+    mock_requests.post(OUTPUT_URL, content=b"tiny", headers={"Content-Type": "image/webp"})
+    args = ["--key", "valid", "-q", "--output", str(tree / "out"), "--journal", str(tree / "journal.jsonl"),
+        "--convert", "image/webp", "--convert", "image/png", str(tree / "in")]
+
+    assert cli.main(args) == 0
+    calls = mock_requests.call_count
+    assert cli.main(args) == 0
+
+    assert mock_requests.call_count == calls
+    assert sorted(os.listdir(str(tree / "out"))) == ["a.webp", "sub"]
+
+
+def test_main_should_not_overwrite_input_in_place_with_other_type(tree, mock_requests, capsys):
+    mock_requests.post(OUTPUT_URL, content=b"tiny", headers={"Content-Type": "image/gif"})
+
+    status = cli.main(["--key", "valid", "--in-place", "--convert", "image/webp", "--convert", "image/gif",
+        str(tree / "in" / "a.png")])
+
+    assert status == 1
+    assert sorted(os.listdir(str(tree / "in"))) == ["a.png", "notes.txt", "sub"]
+    assert (tree / "in" / "a.png").read_bytes() == b"aaaaaaaa"
+    assert "refusing to overwrite the input with image/gif data" in capsys.readouterr().err
+
+
+def test_main_should_skip_unchanged_outputs(tree, mock_requests, capsys):
+    args = ["--key", "valid", "--output", str(tree / "out"), "--skip-unchanged", str(tree / "in")]
+    cli.main(args)
+    calls = mock_requests.call_count
+    future = time.time() + 10
+    os.utime(str(tree / "in" / "a.png"), (future, future))
+    cli.main(args)
+
+    assert mock_requests.call_count == calls + 2
+    assert "1 compressed, 1 unchanged" in capsys.readouterr().err
+
+
+def test_main_should_return_error_status_on_failure(tree, mock_requests, capsys):
+    mock_requests.post("https://api.tinify.com/shrink", status_code=415,
+        json={"error": "Unsupported", "message": "File type is not supported"})
+
+    status = cli.main(["--key", "valid", "--output", str(tree / "out"), str(tree / "in")])
+
+    assert status == 1
+    assert "File type is not supported" in capsys.readouterr().err
+
+
+def test_main_should_require_key_and_output_mode(tree, monkeypatch):
+    monkeypatch.delenv("TINIFY_KEY", raising=False)
+    with pytest.raises(SystemExit):
+        cli.main([str(tree / "in"), "--in-place"])
+    with pytest.raises(SystemExit):
+        cli.main(["--key", "valid", str(tree / "in")])
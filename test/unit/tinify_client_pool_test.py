@@ -0,0 +1,149 @@
+import base64
+import time
+import pytest
+import tinify
+from tinify import Client, ClientPool, AccountError, ClientError
+
+Client.RETRY_DELAY = 10
+
+
+def key_of(request):
+    return base64.b64decode(request.headers["authorization"][6:]).decode("ascii")[4:]
+
+
+def respond(responses):
+    """Answer with the (status, headers) configured for the key of each request."""
+
+    def callback(request, context):
+        status, headers = responses[key_of(request)]
+        context.status_code = status
+        context.headers.update(headers)
+        if status >= 400:
+            return '{"error":"TooManyRequests","message":"Your monthly limit has been exceeded"}'
+        return ""
+
+    return callback
+
+
+def test_should_require_clients():
+    with pytest.raises(ValueError):
+        ClientPool([])
+
+
+def test_pool_stats_should_report_pools_of_every_client(monkeypatch):
+    pool = ClientPool.from_keys(["a", "b"])
+    for client in pool.clients:
+        monkeypatch.setattr(client.transport, "pool_stats", lambda key=client._key: [{"host": key}])
+
+    assert pool.pool_stats() == [{"host": "a"}, {"host": "b"}]
+
+
+def test_should_reject_unknown_strategy():
+    with pytest.raises(ValueError):
+        ClientPool.from_keys(["a"], strategy="random")
+
+
+def test_quota_strategy_should_prefer_key_with_fewest_compressions(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"])
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        text=respond({"a": (201, {"compression-count": "400"}), "b": (201, {"compression-count": "10"})}),
+    )
+
+    pool.request("POST", "/shrink")
+    pool.request("POST", "/shrink")
+    pool.request("POST", "/shrink")
+
+    assert [key_of(r) for r in mock_requests.request_history] == ["a", "b", "b"]
+    assert pool.compression_count == 410
+
+
+def test_round_robin_strategy_should_alternate_keys(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"], strategy="round_robin")
+    mock_requests.post("https://api.tinify.com/shrink", status_code=201)
+
+    for _ in range(4):
+        pool.request("POST", "/shrink")
+
+    assert [key_of(r) for r in mock_requests.request_history] == ["a", "b", "a", "b"]
+
+
+def test_should_fail_over_and_cool_down_exhausted_key(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"], strategy="round_robin", cooldown=60)
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        text=respond({"a": (429, {}), "b": (201, {})}),
+    )
+
+    pool.request("POST", "/shrink")
+    pool.request("POST", "/shrink")
+
+    assert [key_of(r) for r in mock_requests.request_history] == ["a", "b", "b"]
+    assert [c.usage.key for c in pool.available()] == ["b"]
+
+
+def test_should_return_key_to_rotation_after_cooldown(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"], cooldown=0.01)
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        text=respond({"a": (401, {}), "b": (201, {})}),
+    )
+
+    pool.request("POST", "/shrink")
+    time.sleep(0.02)
+
+    assert len(pool.available()) == 2
+
+
+def test_should_raise_account_error_when_all_keys_fail(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"])
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        text=respond({"a": (429, {}), "b": (429, {})}),
+    )
+
+    with pytest.raises(AccountError):
+        pool.request("POST", "/shrink")
+    assert len(mock_requests.request_history) == 2
+
+
+def test_should_not_fail_over_on_client_error(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"])
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        status_code=400,
+        json={"error": "BadRequest", "message": "Oops"},
+    )
+
+    with pytest.raises(ClientError):
+        pool.request("POST", "/shrink")
+    assert len(mock_requests.request_history) == 1
+
+
+def test_should_send_output_requests_with_key_that_created_them(mock_requests):
+    pool = ClientPool.from_keys(["a", "b"], strategy="round_robin")
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        status_code=201,
+        headers={"location": "https://api.tinify.com/output/1"},
+    )
+    mock_requests.get("https://api.tinify.com/output/1", content=b"compressed")
+
+    pool.request("POST", "/shrink")
+    pool.request("GET", "https://api.tinify.com/output/1")
+    pool.request("GET", "https://api.tinify.com/output/1")
+
+    assert [key_of(r) for r in mock_requests.request_history] == ["a", "a", "a"]
+
+
+def test_keys_should_make_tinify_use_client_pool(mock_requests):
+    tinify.keys = ["a", "b"]
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        status_code=201,
+        headers={"location": "https://api.tinify.com/some/location"},
+    )
+    mock_requests.get("https://api.tinify.com/some/location", content=b"compressed")
+
+    assert isinstance(tinify.get_client(), ClientPool)
+    assert tinify.from_buffer(b"png file").to_buffer() == b"compressed"
@@ -1,3 +1,6 @@
+import array
+import io
+import time
 import pytest
 import requests
 import json
@@ -84,6 +87,72 @@ class TestClientRequestWhenValid:
         assert tinify.compression_count == 12
 
 
+class TestClientCompressionCount:
+    def test_should_track_compression_count_per_client(self, mock_requests):
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [
+                {"headers": {"compression-count": "12"}},
+                {"headers": {"compression-count": "30"}},
+            ],
+        )
+        first, second = Client("first"), Client("second")
+
+        first.request("GET", "/")
+        second.request("GET", "/")
+
+        assert first.compression_count == 12
+        assert second.compression_count == 30
+        assert first.compression_count_updated_at <= second.compression_count_updated_at
+
+    def test_should_aggregate_compression_count_per_key(self, mock_requests):
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [
+                {"headers": {"compression-count": "12"}},
+                {"headers": {"compression-count": "30"}},
+                {"headers": {"compression-count": "13"}},
+            ],
+        )
+
+        Client("first").request("GET", "/")
+        Client("second").request("GET", "/")
+        Client("first").request("GET", "/")
+
+        assert tinify.compression_count == 43
+
+    def test_should_not_count_previous_key_after_key_changes(self, mock_requests):
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [
+                {"headers": {"compression-count": "100"}},
+                {"headers": {"compression-count": "5"}},
+            ],
+        )
+
+        tinify.key = "first"
+        tinify.get_client().request("GET", "/")
+        tinify.key = "second"
+        tinify.get_client().request("GET", "/")
+
+        assert tinify.compression_count == 5
+
+    def test_should_call_threshold_callbacks_once_when_crossed(self, mock_requests):
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [{"headers": {"compression-count": str(count)}} for count in (98, 99, 100, 101)],
+        )
+        calls = []
+        client = Client(
+            "key", usage_thresholds=[(100, lambda *args: calls.append(args))]
+        )
+
+        for _ in range(4):
+            client.request("GET", "/")
+
+        assert calls == [(client, 100, 100)]
+
+
 class TestClientRequestWhenValidWithAppId:
     def test_should_issue_request_with_user_agent(self, mock_requests):
         mock_requests.get(
@@ -115,6 +184,101 @@ class TestClientRequestWhenValidWithProxy:
         assert last_request.headers.get("Proxy-Authorization") == expected_auth
 
 
+class TestClientConnectionPool:
+    def test_should_use_default_pool_size(self, client):
+        assert client.adapter._pool_maxsize == Client.POOL_MAXSIZE
+        assert client.adapter._pool_block is False
+        assert client.session.get_adapter("https://api.tinify.com/") is client.adapter
+
+    def test_should_use_configured_pool_size(self):
+        client = Client("key", pool_connections=2, pool_maxsize=32, pool_block=True)
+        assert client.adapter._pool_connections == 2
+        assert client.adapter._pool_maxsize == 32
+        assert client.adapter._pool_block is True
+
+    def test_should_close_connections_without_keep_alive(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/")
+
+        Client("key", keep_alive=False).request("GET", "/")
+
+        assert mock_requests.last_request.headers["connection"] == "close"
+
+    def test_pool_stats_should_report_pools(self):
+        client = Client("key", pool_maxsize=16)
+        client.adapter.poolmanager.connection_from_url("https://api.tinify.com/")
+
+        assert client.pool_stats() == [
+            {
+                "host": "api.tinify.com",
+                "port": 443,
+                "maxsize": 16,
+                "idle": 0,
+                "connections": 0,
+                "requests": 0,
+            }
+        ]
+
+
+class TestClientAfterFork:
+    def test_should_reconnect_in_forked_process(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/")
+        client = Client("key", pool_maxsize=4)
+        session = client.session
+        client._pid = -1
+
+        client.request("GET", "/")
+
+        assert client.session is not session
+        assert client.adapter._pool_maxsize == 4
+        assert mock_requests.last_request.headers["authorization"].startswith("Basic ")
+
+
+class TestClientRequestWithDeadline:
+    def test_should_use_default_timeouts(self, mock_requests, client):
+        mock_requests.get("https://api.tinify.com/")
+
+        client.request("GET", "/")
+
+        assert mock_requests.last_request.timeout == (
+            Client.CONNECT_TIMEOUT,
+            Client.READ_TIMEOUT,
+        )
+
+    def test_should_use_configured_timeouts(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/")
+
+        Client("key", timeout=(2, 30)).request("GET", "/")
+        assert mock_requests.last_request.timeout == (2, 30)
+
+        Client("key", timeout=5).request("GET", "/")
+        assert mock_requests.last_request.timeout == (5, 5)
+
+    def test_should_bound_timeouts_by_deadline(self, mock_requests, client, monkeypatch):
+        monkeypatch.setattr(time, "time", lambda: 1000.0)
+        mock_requests.get("https://api.tinify.com/")
+
+        client.request("GET", "/", deadline=1003.0)
+
+        assert mock_requests.last_request.timeout == (3.0, 3.0)
+
+    def test_should_raise_connection_error_when_deadline_passed(self, mock_requests, client):
+        mock_requests.get("https://api.tinify.com/")
+
+        with pytest.raises(ConnectionError) as excinfo:
+            client.request("GET", "/", deadline=time.time() - 1)
+        assert str(excinfo.value) == "Deadline exceeded"
+        assert mock_requests.call_count == 0
+
+    def test_should_not_retry_beyond_deadline(self, mock_requests):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_requests.get("https://api.tinify.com/", status_code=584, text=error_body)
+
+        client = Client("key", retry_policy=tinify.RetryPolicy(retries=3, delay=10, jitter=False))
+        with pytest.raises(ServerError):
+            client.request("GET", "/", deadline=time.time() + 5)
+        assert mock_requests.call_count == 1
+
+
 class TestClientRequestWithTimeout:
     def test_should_raise_connection_error_repeatedly(self, mock_requests):
         mock_requests.get(
@@ -243,6 +407,61 @@ class TestClientRequestWithServerError:
         assert response.status_code == 201
 
 
+class TestClientRequestWithStreamedBody:
+    def test_should_rewind_file_body_before_retrying(self, mock_requests):
+        bodies = []
+
+        def respond(request, context):
+            bodies.append(request.body.read())
+            context.status_code = 584 if len(bodies) == 1 else 201
+            return "{}"
+
+        mock_requests.post("https://api.tinify.com/shrink", text=respond)
+
+        response = Client("key").request("POST", "/shrink", io.BytesIO(b"png file"))
+
+        assert response.status_code == 201
+        assert bodies == [b"png file", b"png file"]
+
+    def test_should_not_retry_generator_body(self, mock_requests):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_requests.post("https://api.tinify.com/shrink", status_code=584, text=error_body)
+
+        with pytest.raises(ServerError):
+            Client("key").request("POST", "/shrink", (chunk for chunk in [b"png file"]))
+        assert mock_requests.call_count == 1
+
+
+class TestClientRequestWithBufferBody:
+    def test_should_send_memoryview_without_copying(self, mock_requests):
+        mock_requests.post("https://api.tinify.com/shrink", status_code=201)
+        view = memoryview(bytearray(b"png file"))
+
+        Client("key").request("POST", "/shrink", view)
+
+        request = mock_requests.last_request
+        assert request.body is view
+        assert request.headers["content-length"] == "8"
+
+    def test_should_send_bytearray(self, mock_requests):
+        mock_requests.post("https://api.tinify.com/shrink", status_code=201)
+        buffer = bytearray(b"png file")
+
+        Client("key").request("POST", "/shrink", buffer)
+
+        assert mock_requests.last_request.body is buffer
+
+    def test_should_count_bytes_of_wide_items(self, mock_requests):
+        mock_requests.post("https://api.tinify.com/shrink", status_code=201)
+        view = memoryview(array.array("H", [1, 2, 3, 4]))
+
+        Client("key").request("POST", "/shrink", view)
+
+        request = mock_requests.last_request
+        assert request.headers["content-length"] == "8"
+        assert bytes(request.body) == view.tobytes()
+
+
 class TestClientRequestWithBadServerResponse:
     def test_should_raise_server_error_repeatedly(self, mock_requests):
         mock_requests.get(
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import struct
+import pytest
+
+from tinify import ImageInfo, Preflight, ClientError
+from tinify.image_info import inspect_image
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + b"\x03" + b"\x00" * 9
+    return b"\xff\xd8" + app0 + sof
+
+
+def test_inspect_image_should_read_png():
+    info = inspect_image(png(640, 480), 1234)
+    assert (info.format, info.width, info.height, info.size) == ("png", 640, 480, 1234)
+    assert info.content_type == "image/png"
+
+
+def test_inspect_image_should_read_jpeg_frame_after_other_segments():
+    info = inspect_image(jpeg(300, 200))
+    assert (info.format, info.width, info.height) == ("jpeg", 300, 200)
+
+
+def test_inspect_image_should_read_webp():
+    lossy = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 10 + struct.pack("<HH", 320, 240)
+    lossless = b"RIFF\x00\x00\x00\x00WEBPVP8L" + b"\x00" * 5 + struct.pack("<I", (99 << 14) | 199)
+    extended = b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x00" * 8 + b"\x1f\x00\x00\x0f\x00\x00"
+
+    assert (inspect_image(lossy).width, inspect_image(lossy).height) == (320, 240)
+    assert (inspect_image(lossless).width, inspect_image(lossless).height) == (200, 100)
+    assert (inspect_image(extended).width, inspect_image(extended).height) == (32, 16)
+
+
+def test_inspect_image_should_read_avif():
+    header = b"\x00\x00\x00\x1cftypavif" + b"\x00" * 20 + b"\x00\x00\x00\x14ispe\x00\x00\x00\x00" + struct.pack(">II", 64, 32)
+    info = inspect_image(header)
+    assert (info.format, info.width, info.height) == ("avif", 64, 32)
+
+
+def test_inspect_image_should_read_avif_from_compatible_brands():
+    header = b"\x00\x00\x00\x20ftypmif1\x00\x00\x00\x00mif1avifmiafMA1B" + b"\x00\x00\x00\x14ispe\x00\x00\x00\x00" + struct.pack(">II", 64, 32)
+    info = inspect_image(header)
+    assert (info.format, info.width, info.height) == ("avif", 64, 32)
+
+
+def test_inspect_image_should_not_read_heic_as_avif():
+    assert inspect_image(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic") is None
+
+
+def test_inspect_image_should_return_none_for_unknown_format():
+    assert inspect_image(b"GIF89a") is None
+
+
+def test_preflight_should_reject_empty_and_unsupported_input():
+    with pytest.raises(ClientError):
+        Preflight().inspect(b"", 0)
+    with pytest.raises(ClientError):
+        Preflight().inspect(b"not an image", 12)
+
+
+def test_preflight_should_skip_small_images_and_by_policy():
+    small = ImageInfo("png", 10, 10, 500)
+    large = ImageInfo("png", 1000, 1000, 50000)
+
+    assert Preflight(min_size=1024).skip(small)
+    assert not Preflight(min_size=1024).skip(large)
+    assert Preflight(policy=lambda info: info.width > 500).skip(large)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import warnings
+
+import pytest
+
+import tinify
+from tinify import Client, RequestEvent, RetryPolicy, Source, PrometheusObserver, OpenTelemetryObserver, Transport
+from tinify.transports import Response
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def client(events):
+    return Client("key", observers=[events.append], retry_policy=RetryPolicy(retries=1, delay=0))
+
+
+class TestRequestEvents:
+    def test_should_emit_event_for_each_attempt(self, mock_requests, client, events):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_requests.post(
+            "https://api.tinify.com/shrink",
+            [
+                {"status_code": 584, "text": error_body},
+                {"status_code": 201, "headers": {"compression-count": "7", "location": "x"}},
+            ],
+        )
+
+        client.request("POST", "/shrink", b"png file")
+
+        assert [(event.attempt, event.status, event.ok) for event in events] == [
+            (1, 584, False),
+            (2, 201, True),
+        ]
+        event = events[-1]
+        assert isinstance(event, RequestEvent)
+        assert event.method == "POST"
+        assert event.url == "https://api.tinify.com/shrink"
+        assert event.endpoint == "shrink"
+        assert event.bytes_sent == 8
+        assert event.bytes_received == 0
+        assert event.compression_count == 7
+        assert set(event.timings) == {"limiter", "backoff", "response", "download", "total"}
+
+    def test_should_report_connection_errors(self, mock_requests, client, events):
+        mock_requests.get("https://api.tinify.com/", exc=RuntimeError("some error"))
+
+        with pytest.raises(tinify.ConnectionError):
+            client.request("GET", "/")
+
+        assert [event.status for event in events] == [None, None]
+        assert isinstance(events[0].error, tinify.ConnectionError)
+        assert "response" not in events[0].timings
+
+    def test_should_classify_endpoints(self, mock_requests, events):
+        tinify.key = "valid"
+        tinify.observers = [events.append]
+        mock_requests.post(
+            "https://api.tinify.com/shrink",
+            status_code=201,
+            headers={"location": "https://api.tinify.com/output/abc"},
+        )
+        mock_requests.get("https://api.tinify.com/output/abc", content=b"compressed file")
+        mock_requests.post("https://api.tinify.com/output/abc", content=b"")
+
+        source = Source.from_buffer(b"png file")
+        source.to_buffer()
+        source.store(service="s3")
+
+        assert [event.endpoint for event in events] == ["shrink", "output", "store"]
+        assert events[1].bytes_received == len(b"compressed file")
+
+    def test_should_report_streamed_response_once_read(self, events):
+        class SlowTransport(Transport):
+            def request(self, method, url, headers=None, data=None, stream=False, timeout=None):
+                def read(chunk_size):
+                    for chunk in (b"compressed", b" file"):
+                        time.sleep(0.05)
+                        yield chunk
+                return Response(200, {"content-length": "1000"}, read=read)
+
+        client = Client("key", observers=[events.append], transport=SlowTransport)
+        response = client.request("GET", "https://api.tinify.com/output/abc", stream=True)
+        assert events == []
+
+        assert b"".join(response.iter_content(1024)) == b"compressed file"
+        (event,) = events
+        assert event.bytes_received == len(b"compressed file")
+        assert event.timings["download"] >= 0.1
+        response.close()
+        assert len(events) == 1
+
+    def test_should_report_streamed_response_when_closed(self, mock_requests, client, events):
+        mock_requests.get("https://api.tinify.com/output/abc", content=b"compressed file")
+
+        response = client.request("GET", "https://api.tinify.com/output/abc", stream=True)
+        assert events == []
+        response.close()
+
+        assert [(event.status, event.bytes_received) for event in events] == [(200, 0)]
+
+    def test_should_warn_when_observer_fails(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/")
+
+        def broken(event):
+            raise ValueError("broken")
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            Client("key", observers=[broken]).request("GET", "/")
+        assert "broken" in str(caught[0].message)
+
+
+class TestPrometheusObserver:
+    def test_should_record_metrics(self, mock_requests):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        registry = prometheus_client.CollectorRegistry()
+        mock_requests.post(
+            "https://api.tinify.com/shrink",
+            status_code=201,
+            headers={"compression-count": "12"},
+        )
+
+        Client("key", observers=[PrometheusObserver(registry)]).request("POST", "/shrink", b"png file")
+
+        labels = {"method": "POST", "endpoint": "shrink", "status": "201"}
+        assert registry.get_sample_value("tinify_requests_total", labels) == 1
+        assert registry.get_sample_value("tinify_sent_bytes_total", {"endpoint": "shrink"}) == 8
+        assert registry.get_sample_value("tinify_compression_count") == 12
+
+
+class TestOpenTelemetryObserver:
+    def test_should_record_spans(self, mock_requests):
+        pytest.importorskip("opentelemetry.sdk")
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        mock_requests.get("https://api.tinify.com/", status_code=200)
+
+        observer = OpenTelemetryObserver(provider.get_tracer("test"))
+        Client("key", observers=[observer]).request("GET", "/")
+
+        (span,) = exporter.get_finished_spans()
+        assert span.name == "tinify other"
+        assert span.attributes["http.response.status_code"] == 200
+        assert span.end_time >= span.start_time
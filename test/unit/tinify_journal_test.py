@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+from tinify import Journal
+
+
+def test_journal_should_replay_recorded_entries(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path) as journal:
+        journal.record_upload("digest", "https://api.tinify.com/output/1")
+        journal.record_output("key", "out.png", {"Content-Length": "10"})
+
+    with Journal(path) as journal:
+        assert journal.location("digest") == "https://api.tinify.com/output/1"
+        assert journal.completed("key", "out.png") == {"Content-Length": "10"}
+        assert journal.completed("key", "other.png") is None
+
+
+def test_journal_should_replay_where_outputs_were_moved(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path) as journal:
+        journal.record_output("key", "out.tmp", {}, "out.webp")
+        journal.record_output("other", "out.png", {}, "out.png")
+
+    with Journal(path) as journal:
+        assert journal.written("key", "out.tmp") == "out.webp"
+        assert journal.written("other", "out.png") == "out.png"
+        assert journal.written("key", "out.png") is None
+
+
+def test_journal_should_ignore_expired_locations(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    entry = {"event": "upload", "digest": "digest", "location": "https://api.tinify.com/output/1", "time": time.time() - 2 * Journal.LOCATION_TTL}
+    path.write_text(json.dumps(entry) + "\n")
+
+    with Journal(str(path)) as journal:
+        assert journal.location("digest") is None
+
+
+def test_journal_should_skip_truncated_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"event": "output", "key": "key", "out')
+
+    with Journal(str(path)) as journal:
+        assert journal.completed("key", "out.png") is None
+        journal.record_output("key", "out.png", {})
+
+    with Journal(str(path)) as journal:
+        assert journal.completed("key", "out.png") == {}
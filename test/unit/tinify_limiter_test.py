@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import pickle
+import time
+
+import pytest
+
+from tinify import Client, RateLimiter, FileRateLimiter, RetryPolicy
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    monkeypatch.setattr(time, "sleep", lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+
+class TestRateLimiter:
+    def test_should_allow_burst_then_limit_rate(self, clock):
+        limiter = RateLimiter(rate=2, burst=3)
+        assert [limiter.try_acquire() for _ in range(3)] == [0, 0, 0]
+        assert limiter.try_acquire() == 0.5
+
+    def test_should_refill_tokens_over_time(self, clock):
+        limiter = RateLimiter(rate=2, burst=1)
+        assert limiter.try_acquire() == 0
+        clock[0] += 0.5
+        assert limiter.try_acquire() == 0
+
+    def test_acquire_should_wait_for_token(self, clock):
+        limiter = RateLimiter(rate=4, burst=1)
+        limiter.acquire()
+        limiter.acquire()
+        assert clock[0] == 1000.25
+
+    def test_acquire_should_time_out(self, clock):
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.acquire()
+        assert limiter.acquire(timeout=0.5) is False
+
+    def test_should_limit_requests_in_flight(self):
+        limiter = RateLimiter(max_in_flight=2)
+        assert limiter.try_acquire() == 0
+        assert limiter.try_acquire() == 0
+        assert limiter.try_acquire() == RateLimiter.POLL_INTERVAL
+        limiter.release()
+        assert limiter.try_acquire() == 0
+
+    def test_should_reject_invalid_rate(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestFileRateLimiter:
+    def test_should_share_state_between_instances(self, tmp_path, clock):
+        path = str(tmp_path / "limiter")
+        first = FileRateLimiter(path, rate=1, burst=2)
+        second = FileRateLimiter(path, rate=1, burst=2)
+        assert first.try_acquire() == 0
+        assert second.try_acquire() == 0
+        assert first.try_acquire() == 1.0
+
+    def test_should_share_requests_in_flight(self, tmp_path):
+        path = str(tmp_path / "limiter")
+        first = FileRateLimiter(path, max_in_flight=1)
+        second = FileRateLimiter(path, max_in_flight=1)
+        assert first.try_acquire() == 0
+        assert second.try_acquire() > 0
+        first.release()
+        assert second.try_acquire() == 0
+
+    @pytest.mark.skipif(os.name != "posix", reason="reclaiming slots requires POSIX")
+    def test_should_pickle_without_lock_or_slots(self, tmp_path):
+        limiter = FileRateLimiter(str(tmp_path / "limiter"), rate=5, max_in_flight=1)
+        limiter.try_acquire()
+
+        copy = pickle.loads(pickle.dumps(limiter))
+
+        assert (copy.path, copy.rate, copy.max_in_flight) == (limiter.path, 5, 1)
+        assert copy.try_acquire() == RateLimiter.POLL_INTERVAL
+        limiter.release()
+        assert copy.try_acquire() == 0
+
+    def test_should_reclaim_slots_of_exited_processes(self, tmp_path):
+        path = tmp_path / "limiter"
+        path.write_text(json.dumps({"in_flight": 1, "holders": {"999999999": 1}}))
+        assert FileRateLimiter(str(path), max_in_flight=1).try_acquire() == 0
+
+
+class TestClientWithRateLimiter:
+    def test_should_acquire_and_release_for_each_attempt(self, mock_requests):
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [{"exc": RuntimeError("some error")}, {"status_code": 200}],
+        )
+        limiter = RateLimiter(max_in_flight=1)
+        calls = []
+        original_acquire = limiter.acquire
+        limiter.acquire = lambda timeout=None: calls.append("acquire") or original_acquire(timeout)
+        original_release = limiter.release
+        limiter.release = lambda: calls.append("release") or original_release()
+
+        Client("key", rate_limiter=limiter, retry_policy=RetryPolicy(retries=1, delay=0)).request("GET", "/")
+
+        assert calls == ["acquire", "release", "acquire", "release"]
+        assert limiter.try_acquire() == 0
+
+    def test_should_hold_slot_until_streamed_response_is_read(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/output/1", content=b"compressed file")
+        limiter = RateLimiter(max_in_flight=1)
+        client = Client("key", rate_limiter=limiter)
+
+        response = client.request("GET", "/output/1", stream=True)
+        assert limiter.try_acquire() == RateLimiter.POLL_INTERVAL
+
+        assert b"".join(response.iter_content(4)) == b"compressed file"
+        assert limiter.try_acquire() == 0
+
+    def test_should_release_slot_when_streamed_response_is_closed(self, mock_requests):
+        mock_requests.get("https://api.tinify.com/output/1", content=b"compressed file")
+        limiter = RateLimiter(max_in_flight=1)
+        client = Client("key", rate_limiter=limiter)
+
+        client.request("GET", "/output/1", stream=True).close()
+        assert limiter.try_acquire() == 0
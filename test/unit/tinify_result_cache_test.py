@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import time
+import pytest
+
+import tinify
+from tinify import Source, MemoryCache, FileCache
+from tinify.result_cache import cache_key
+
+META = {"Content-Type": "image/png", "Content-Length": "4", "Image-Width": "1", "Location": "ignored"}
+
+
+class TestMemoryCache:
+    def test_get_should_return_stored_result(self):
+        cache = MemoryCache()
+        cache.set("key", META, b"data")
+        assert cache.get("key") == (
+            {"Content-Type": "image/png", "Content-Length": "4", "Image-Width": "1"},
+            b"data",
+        )
+
+    def test_get_should_return_none_when_missing(self):
+        assert MemoryCache().get("key") is None
+
+    def test_should_evict_least_recently_used(self):
+        cache = MemoryCache(max_size=8)
+        cache.set("a", META, b"aaaa")
+        cache.set("b", META, b"bbbb")
+        cache.get("a")
+        cache.set("c", META, b"cccc")
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    def test_should_expire_entries_after_ttl(self, monkeypatch):
+        cache = MemoryCache(ttl=10)
+        cache.set("key", META, b"data")
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 11)
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_clear_should_remove_all_entries(self):
+        cache = MemoryCache()
+        cache.set("key", META, b"data")
+        cache.clear()
+        assert cache.get("key") is None
+
+
+class TestFileCache:
+    def test_get_should_return_stored_result(self, tmp_path):
+        cache = FileCache(str(tmp_path / "cache"))
+        cache.set("key", META, b"data")
+        assert FileCache(str(tmp_path / "cache")).get("key") == (
+            {"Content-Type": "image/png", "Content-Length": "4", "Image-Width": "1"},
+            b"data",
+        )
+
+    def test_should_expire_entries_after_ttl(self, tmp_path):
+        cache = FileCache(str(tmp_path), ttl=10)
+        cache.set("key", META, b"data")
+        old = time.time() - 11
+        os.utime(str(tmp_path / "key"), (old, old))
+        assert cache.get("key") is None
+        assert not (tmp_path / "key").exists()
+
+    def test_should_evict_least_recently_used(self, tmp_path):
+        cache = FileCache(str(tmp_path), max_size=300)
+        cache.set("a", META, b"a" * 60)
+        os.utime(str(tmp_path / "a"), (1, 1))
+        cache.set("b", META, b"b" * 60)
+        os.utime(str(tmp_path / "b"), (2, 2))
+        cache.set("c", META, b"c" * 60)
+        assert sorted(os.listdir(str(tmp_path))) == ["b", "c"]
+
+    def test_clear_should_remove_all_entries(self, tmp_path):
+        cache = FileCache(str(tmp_path))
+        cache.set("key", META, b"data")
+        cache.clear()
+        assert os.listdir(str(tmp_path)) == []
+
+
+def test_cache_key_should_depend_on_commands():
+    assert cache_key("digest", {"resize": {"width": 1}}) != cache_key("digest", {})
+    assert cache_key("digest", {"a": 1, "b": 2}) == cache_key("digest", {"b": 2, "a": 1})
+
+
+class TestSourceWithCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, mock_requests):
+        tinify.key = "valid"
+        tinify.cache = MemoryCache()
+        mock_requests.post(
+            "https://api.tinify.com/shrink",
+            status_code=201,
+            headers={"location": "https://api.tinify.com/some/location"},
+        )
+        mock_requests.get(
+            "https://api.tinify.com/some/location",
+            content=b"compressed file",
+            headers={"Content-Type": "image/png"},
+        )
+        mock_requests.post("https://api.tinify.com/some/location", content=b"small file")
+
+    def test_from_buffer_should_not_upload_before_result(self, mock_requests):
+        Source.from_buffer(b"png file")
+        assert mock_requests.call_count == 0
+
+    def test_result_should_be_served_from_cache(self, mock_requests):
+        assert b"compressed file" == Source.from_buffer(b"png file").to_buffer()
+        assert mock_requests.call_count == 2
+
+        result = Source.from_buffer(b"png file").result()
+        assert b"compressed file" == result.to_buffer()
+        assert "image/png" == result.content_type
+        assert mock_requests.call_count == 2
+
+    def test_cache_should_depend_on_commands(self, mock_requests):
+        source = Source.from_buffer(b"png file")
+        assert b"compressed file" == source.to_buffer()
+        assert b"small file" == source.resize(width=100).to_buffer()
+        assert b"small file" == Source.from_buffer(b"png file").resize(width=100).to_buffer()
+        assert mock_requests.call_count == 3
+
+    def test_from_file_should_be_served_from_cache(self, mock_requests, tmp_path):
+        path = tmp_path / "input.png"
+        path.write_bytes(b"png file")
+
+        Source.from_file(str(path)).to_buffer()
+        assert str(path) == mock_requests.request_history[0].body.name
+        assert b"compressed file" == Source.from_buffer(b"png file").to_buffer()
+        assert mock_requests.call_count == 2
+
+    def test_from_file_with_file_object_should_hash_in_chunks(self, mock_requests, monkeypatch):
+        monkeypatch.setattr(Source, "CHUNK_SIZE", 3)
+        stream = io.BytesIO(b"xxpng file")
+        stream.seek(2)
+        reads = []
+        read = stream.read
+        monkeypatch.setattr(stream, "read", lambda *args: reads.append(args) or read(*args))
+
+        source = Source.from_file(stream)
+        assert 2 == stream.tell()
+        assert reads and all(args == (3,) for args in reads)
+        assert mock_requests.call_count == 0
+
+        assert b"compressed file" == source.to_buffer()
+        assert b"compressed file" == Source.from_buffer(b"png file").to_buffer()
+        assert mock_requests.call_count == 2
+
+    def test_from_file_with_named_file_object_should_read_from_path(self, mock_requests, tmp_path):
+        path = tmp_path / "input.png"
+        path.write_bytes(b"png file")
+
+        with open(str(path), "rb") as f:
+            source = Source.from_file(f)
+        assert b"compressed file" == source.to_buffer()
+        assert str(path) == mock_requests.request_history[0].body.name
+
+    def test_from_file_should_raise_clear_error_when_file_object_is_closed(self, mock_requests):
+        stream = io.BytesIO(b"png file")
+        source = Source.from_file(stream)
+        stream.close()
+
+        with pytest.raises(ValueError) as excinfo:
+            source.to_buffer()
+        assert "closed before it was uploaded" in str(excinfo.value)
+
+    def test_iter_content_should_be_served_from_cache(self, mock_requests):
+        Source.from_buffer(b"png file").to_buffer()
+        assert [b"compressed", b" file"] == list(Source.from_buffer(b"png file").iter_content(10))
+        assert mock_requests.call_count == 2
+
+    def test_store_should_upload(self, mock_requests):
+        Source.from_buffer(b"png file").to_buffer()
+        Source.from_buffer(b"png file").store(service="s3")
+        assert mock_requests.call_count == 4
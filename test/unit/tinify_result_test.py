@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import pickle
 import pytest
-from tinify import Result
+from tinify import Result, ResultMeta
 
 
 @pytest.fixture
@@ -48,6 +49,18 @@ class TestTinifyResultWithMetaAndData:
     def test_extension(self, result_with_meta_and_data):
         assert "png" == result_with_meta_and_data.extension
 
+    def test_view_should_expose_data_without_copy(self):
+        data = bytearray(b"image data")
+        view = Result({}, data).view
+
+        data[0:5] = b"IMAGE"
+        assert view.tobytes() == b"IMAGE data"
+
+    def test_to_file_should_write_data(self, result_with_meta_and_data, tmp_path):
+        path = tmp_path / "out.png"
+        result_with_meta_and_data.to_file(str(path))
+        assert path.read_bytes() == b"image data"
+
 
 class TestTinifyResultWithoutMetaAndData:
     def test_width_should_return_none(self, result_without_meta_and_data):
@@ -73,3 +86,115 @@ class TestTinifyResultWithoutMetaAndData:
 
     def test_extension(self, result_without_meta_and_data):
         assert None is result_without_meta_and_data.extension
+
+
+class FakeBody(object):
+    def __init__(self, data):
+        self.data = data
+        self.reads = 0
+        self.closed = False
+
+    def read(self):
+        self.reads += 1
+        return self.data
+
+    def iter_content(self, chunk_size):
+        for offset in range(0, len(self.data), chunk_size):
+            yield self.data[offset:offset + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestTinifyResultWithLazyBody:
+    def test_data_should_be_read_on_first_access(self):
+        body = FakeBody(b"image data")
+        result = Result({"Content-Length": "10"}, body=body)
+
+        assert not result.loaded and body.reads == 0
+        assert result.size == 10
+        assert result.to_buffer() == b"image data"
+        assert result.to_buffer() == b"image data"
+        assert body.reads == 1 and body.closed
+
+    def test_to_file_should_stream_unread_body(self, tmp_path):
+        body = FakeBody(b"image data" * 10000)
+        result = Result({}, body=body)
+
+        result.to_file(str(tmp_path / "out.png"))
+
+        assert (tmp_path / "out.png").read_bytes() == b"image data" * 10000
+        assert body.reads == 0 and body.closed
+
+    def test_should_read_body_again_after_streaming_it(self, tmp_path):
+        body = FakeBody(b"image data" * 10000)
+        result = Result({}, body=body)
+
+        result.to_file(str(tmp_path / "a.png"))
+        result.to_file(str(tmp_path / "b.png"))
+
+        assert (tmp_path / "b.png").read_bytes() == b"image data" * 10000
+        assert result.to_buffer() == b"image data" * 10000
+        assert body.reads == 0 and body.closed
+
+    def test_should_keep_rest_of_body_when_streaming_stops_early(self):
+        result = Result({}, body=FakeBody(b"image data"))
+
+        chunks = result.iter_content(4)
+        assert next(chunks) == b"imag"
+        chunks.close()
+
+        assert result.to_buffer() == b"image data"
+
+    def test_data_should_replace_unread_body(self):
+        body = FakeBody(b"image data")
+        result = Result({}, body=body)
+
+        result.data = b"other data"
+
+        assert body.closed
+        assert result.to_buffer() == b"other data"
+
+    def test_release_should_close_body_and_free_data(self):
+        body = FakeBody(b"image data")
+        with Result({"Image-Width": "100"}, body=body) as result:
+            pass
+
+        assert body.closed
+        assert result.width == 100
+        with pytest.raises(ValueError):
+            result.to_buffer()
+
+    def test_spill_should_move_data_to_file(self, tmp_path):
+        result = Result({}, b"image data")
+        result.spill(str(tmp_path))
+
+        assert not result.loaded
+        assert len(list(tmp_path.iterdir())) == 1
+        assert b"".join(result.iter_content(4)) == b"image data"
+        assert result.to_buffer() == b"image data"
+        assert list(tmp_path.iterdir()) == []
+
+    def test_spill_should_move_unread_body_to_file(self, tmp_path):
+        body = FakeBody(b"image data" * 10000)
+        result = Result({}, body=body)
+        result.spill(str(tmp_path))
+
+        assert body.reads == 0 and body.closed
+        assert len(list(tmp_path.iterdir())) == 1
+        assert result.to_buffer() == b"image data" * 10000
+
+    def test_release_should_remove_spill_file(self, tmp_path):
+        result = Result({}, b"image data")
+        result.spill(str(tmp_path))
+        result.release()
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_should_not_have_instance_dict(self):
+        assert not hasattr(Result({}, b""), "__dict__")
+        assert not hasattr(ResultMeta({}), "__dict__")
+
+    def test_should_pickle(self):
+        result = pickle.loads(pickle.dumps(Result({"Image-Width": "1"}, b"image data")))
+        assert (result.width, result.to_buffer()) == (1, b"image data")
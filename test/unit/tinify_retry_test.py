@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+from email.utils import formatdate
+
+import pytest
+
+from tinify import Client, RetryPolicy, AccountError, ServerError
+
+
+class TestRetryPolicy:
+    def test_should_back_off_exponentially(self):
+        policy = RetryPolicy(retries=4, delay=0.5, backoff=2.0, jitter=False)
+        assert [policy.retry_delay(attempt, 0) for attempt in range(1, 6)] == [0.5, 1.0, 2.0, 4.0, None]
+
+    def test_should_cap_delay(self):
+        policy = RetryPolicy(retries=10, delay=1.0, max_delay=5.0, jitter=False)
+        assert policy.retry_delay(8, 0) == 5.0
+
+    def test_should_apply_full_jitter(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr("random.uniform", lambda a, b: calls.append((a, b)) or b / 2)
+        assert RetryPolicy(delay=2.0).retry_delay(2, 0) == 2.0
+        assert calls == [(0, 4.0)]
+
+    def test_should_stop_after_max_elapsed(self):
+        policy = RetryPolicy(retries=10, delay=1.0, jitter=False, max_elapsed=10)
+        assert policy.retry_delay(2, 7.0) == 2.0
+        assert policy.retry_delay(2, 8.5) is None
+
+    def test_should_retry_server_errors(self):
+        policy = RetryPolicy(jitter=False)
+        assert policy.retry_delay(1, 0, 503, {}) == 0.5
+        assert policy.retry_delay(1, 0, 400, {}) is None
+
+    def test_should_retry_rate_limit_with_retry_after(self):
+        policy = RetryPolicy(jitter=False)
+        assert policy.retry_delay(1, 0, 429, {"retry-after": "3"}) == 3.0
+
+    def test_should_not_retry_exhausted_quota(self):
+        assert RetryPolicy().retry_delay(1, 0, 429, {}) is None
+
+    def test_should_parse_retry_after_date(self):
+        headers = {"retry-after": formatdate(time.time() + 60, usegmt=True)}
+        assert 55 < RetryPolicy(jitter=False, max_delay=120).retry_delay(1, 0, 429, headers) <= 60
+
+    def test_should_not_wait_for_retry_after_beyond_max_delay(self):
+        policy = RetryPolicy(jitter=False)
+        assert policy.retry_delay(1, 0, 429, {"retry-after": "30"}) == 30
+        assert policy.retry_delay(1, 0, 429, {"retry-after": "3600"}) is None
+
+    def test_should_ignore_retry_after_when_disabled(self):
+        policy = RetryPolicy(jitter=False, respect_retry_after=False)
+        assert policy.retry_delay(1, 0, 503, {"retry-after": "30"}) == 0.5
+
+    def test_should_use_explicit_statuses(self):
+        policy = RetryPolicy(jitter=False, statuses=[429, 503])
+        assert policy.retry_delay(1, 0, 429, {}) == 0.5
+        assert policy.retry_delay(1, 0, 500, {}) is None
+
+
+class TestClientWithRetryPolicy:
+    @pytest.fixture(autouse=True)
+    def sleeps(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(time, "sleep", sleeps.append)
+        return sleeps
+
+    def test_should_retry_with_policy(self, mock_requests, sleeps):
+        error_body = json.dumps({"error": "InternalServerError", "message": "Oops!"})
+        mock_requests.get("https://api.tinify.com/", status_code=503, text=error_body)
+
+        client = Client("key", retry_policy=RetryPolicy(retries=3, delay=1.0, jitter=False))
+        with pytest.raises(ServerError):
+            client.request("GET", "/")
+
+        assert mock_requests.call_count == 4
+        assert sleeps == [1.0, 2.0, 4.0]
+
+    def test_should_retry_rate_limit_after_retry_after(self, mock_requests, sleeps):
+        error_body = json.dumps({"error": "TooManyRequests", "message": "Slow down"})
+        mock_requests.get(
+            "https://api.tinify.com/",
+            [
+                {"status_code": 429, "text": error_body, "headers": {"Retry-After": "2"}},
+                {"status_code": 200},
+            ],
+        )
+
+        assert Client("key").request("GET", "/").status_code == 200
+        assert sleeps == [2.0]
+
+    def test_should_not_block_on_long_retry_after_by_default(self, mock_requests, sleeps):
+        error_body = json.dumps({"error": "TooManyRequests", "message": "Slow down"})
+        mock_requests.get(
+            "https://api.tinify.com/",
+            status_code=429, text=error_body, headers={"Retry-After": "3600"},
+        )
+
+        with pytest.raises(AccountError):
+            Client("key").request("GET", "/")
+        assert mock_requests.call_count == 1
+        assert sleeps == []
+
+    def test_should_not_retry_exhausted_quota(self, mock_requests, sleeps):
+        error_body = json.dumps({"error": "TooManyRequests", "message": "Limit reached"})
+        mock_requests.get("https://api.tinify.com/", status_code=429, text=error_body)
+
+        with pytest.raises(AccountError):
+            Client("key").request("GET", "/")
+        assert mock_requests.call_count == 1
+        assert sleeps == []
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import os
 import json
+import mmap
+import time
 import tempfile
 import pytest
 
@@ -8,6 +10,9 @@ import tinify
 from tinify import Source, Result, ResultMeta, AccountError, ClientError
 
 
+PNG_HEADER = b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x02\x00\x00\x00\x03\x08\x06\x00\x00\x00"
+
+
 def create_named_tmpfile():
     """Helper to create a named temporary file"""
     fd, name = tempfile.mkstemp()
@@ -95,6 +100,35 @@ class TestTinifySourceWithValidApiKey:
         with open(dummy_file, "rb") as f:
             assert b"compressed file" == Source.from_file(f).to_buffer()
 
+    def test_from_file_with_path_should_stream_file(self, mock_requests, dummy_file):
+        Source.from_file(dummy_file)
+        body = mock_requests.request_history[0].body
+        assert hasattr(body, "read")
+        assert body.name == dummy_file
+
+    def test_from_file_with_generator_should_stream_chunks(self, mock_requests):
+        def chunks():
+            yield b"png "
+            yield b"file"
+
+        Source.from_file(chunks())
+        body = mock_requests.request_history[0]
+        assert b"png file" == b"".join(body.body)
+        assert "chunked" == body.headers["transfer-encoding"]
+
+    def test_from_file_with_mmap_should_stream_data(self, mock_requests, tmp_path):
+        path = tmp_path / "input.png"
+        path.write_bytes(b"png file")
+        with open(str(path), "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                Source.from_file(data)
+                request = mock_requests.request_history[0]
+                assert request.body is data
+                assert "8" == request.headers["content-length"]
+            finally:
+                data.close()
+
     def test_from_buffer_should_return_source(self):
         assert isinstance(Source.from_buffer("png file"), Source)
 
@@ -270,6 +304,142 @@ class TestTinifySourceWithValidApiKey:
             mock_requests.last_request.json(),
         )
 
+    def test_from_buffer_should_accept_buffers(self, mock_requests):
+        view = memoryview(bytearray(b"png file"))
+        assert Source.from_buffer(view).to_buffer() == b"compressed file"
+        assert mock_requests.request_history[0].body is view
+
+    def test_lazy_source_should_not_upload_until_result_is_needed(self, mock_requests, dummy_file):
+        tinify.lazy = True
+        source = Source.from_file(dummy_file).resize(width=100)
+
+        assert source.pending
+        assert mock_requests.call_count == 0
+        assert source.to_buffer() == b"small file"
+        assert not source.pending
+        assert mock_requests.call_count == 2
+
+    def test_lazy_source_should_read_file_object_before_it_is_closed(self, mock_requests, dummy_file):
+        tinify.lazy = True
+        with open(dummy_file, "rb") as f:
+            source = Source.from_file(f)
+
+        assert mock_requests.call_count == 0
+        assert source.to_buffer() == b"compressed file"
+
+    def test_lazy_sources_should_share_one_upload(self, mock_requests):
+        tinify.lazy = True
+        source = Source.from_buffer(b"png file")
+        source.resize(width=100).to_buffer()
+        source.convert(type="image/webp").to_buffer()
+
+        shrinks = [r for r in mock_requests.request_history if r.path == "/shrink"]
+        assert len(shrinks) == 1
+
+    def test_lazy_source_that_is_dropped_should_never_upload(self, mock_requests):
+        tinify.lazy = True
+        Source.from_url("http://example.com/test.jpg").preserve("copyright")
+
+        assert mock_requests.call_count == 0
+
+    def test_lazy_source_should_upload_url_when_stored(self, mock_requests):
+        tinify.lazy = True
+        Source.from_url("http://example.com/test.jpg").store(service="s3")
+
+        assert_json_equal(
+            {"source": {"url": "http://example.com/test.jpg"}},
+            mock_requests.request_history[0].json(),
+        )
+
+    def test_preflight_should_reject_unsupported_input_without_request(self, mock_requests):
+        tinify.preflight = tinify.Preflight()
+        with pytest.raises(ClientError):
+            Source.from_buffer(b"png file")
+        assert mock_requests.call_count == 0
+
+    def test_preflight_should_expose_info_and_upload(self, mock_requests):
+        tinify.preflight = tinify.Preflight()
+        image = PNG_HEADER + b"\x00" * 100
+        source = Source.from_buffer(image)
+
+        assert (source.info.format, source.info.width, source.info.size) == ("png", 2, len(image))
+        assert not source.skipped
+        assert source.to_buffer() == b"compressed file"
+
+    def test_preflight_should_return_skipped_input_as_result(self, mock_requests):
+        tinify.preflight = tinify.Preflight(min_size=1024)
+        path = create_named_tmpfile()
+        with open(path, "wb") as f:
+            f.write(PNG_HEADER)
+
+        source = Source.from_file(path)
+        result = source.result()
+
+        assert source.skipped
+        assert mock_requests.call_count == 0
+        assert result.data == PNG_HEADER
+        assert (result.width, result.media_type) == (2, "image/png")
+        assert source.resize(width=1).to_buffer() == b"small file"
+
+    def test_preflight_should_inspect_path_objects(self, mock_requests, tmp_path):
+        tinify.preflight = tinify.Preflight(min_size=1024)
+        path = tmp_path / "small.png"
+        path.write_bytes(PNG_HEADER)
+
+        source = Source.from_file(path)
+
+        assert source.skipped
+        assert source.info.format == "png"
+        assert source.to_buffer() == PNG_HEADER
+        assert mock_requests.call_count == 0
+
+    def test_preflight_should_pass_input_through_after_derived_upload(self, mock_requests):
+        tinify.preflight = tinify.Preflight(min_size=1024)
+        with tempfile.TemporaryFile() as f:
+            f.write(PNG_HEADER)
+            f.seek(0)
+            source = Source.from_file(f)
+
+            assert source.resize(width=1).to_buffer() == b"small file"
+            assert source.to_buffer() == PNG_HEADER
+
+    def test_preflight_should_rewind_file_objects(self, mock_requests):
+        tinify.preflight = tinify.Preflight()
+        with tempfile.TemporaryFile() as f:
+            f.write(PNG_HEADER)
+            f.seek(0)
+            source = Source.from_file(f)
+            assert mock_requests.request_history[0].body.read() == PNG_HEADER
+
+        assert source.info.height == 3
+
+    def test_lazy_result_should_download_when_data_is_needed(self, mock_requests):
+        result = Source.from_buffer(b"png file").result(lazy=True)
+
+        assert mock_requests.last_request.stream is True
+        assert not result.loaded
+        assert result.to_buffer() == b"compressed file"
+
+    def test_meta_should_return_result_meta_without_reading_body(self, mock_requests):
+        mock_requests.post(
+            "https://api.tinify.com/some/location",
+            headers={"Image-Width": "100", "Image-Height": "60", "Content-Length": "4500"},
+            content=b"small file",
+        )
+        meta = Source.from_buffer(b"png file").resize(width=100).meta()
+
+        assert type(meta) is ResultMeta
+        assert (meta.width, meta.height, meta.size) == (100, 60, 4500)
+        assert mock_requests.last_request.stream is True
+
+    def test_meta_should_use_cached_result(self, mock_requests):
+        tinify.cache = tinify.MemoryCache()
+        Source.from_buffer(b"png file").result()
+        calls = mock_requests.call_count
+
+        assert type(Source.from_buffer(b"png file").meta()) is ResultMeta
+        assert mock_requests.call_count == calls
+
     def test_to_buffer_should_return_image_data(self):
         assert b"compressed file" == Source.from_buffer(b"png file").to_buffer()
 
@@ -288,6 +458,108 @@ class TestTinifySourceWithValidApiKey:
         finally:
             os.unlink(name)
 
+    def test_iter_content_should_yield_image_data(self, mock_requests):
+        source = Source.from_buffer(b"png file")
+        assert [b"compr", b"essed", b" file"] == list(source.iter_content(5))
+        assert mock_requests.last_request.method == "GET"
+
+    def test_iter_content_should_use_post_when_commands_is_not_empty(self, mock_requests):
+        source = Source.from_buffer(b"png file").resize(width=400)
+        assert b"small file" == b"".join(source.iter_content())
+        assert mock_requests.last_request.method == "POST"
+
+    def test_to_file_with_stream_should_store_image_data(self, tmp_path):
+        path = tmp_path / "output.png"
+        path.write_bytes(b"old file")
+        Source.from_buffer(b"png file").to_file(str(path), stream=True)
+        assert b"compressed file" == path.read_bytes()
+        assert ["output.png"] == os.listdir(str(tmp_path))
+
+    def test_to_file_with_stream_should_write_to_file_object(self):
+        with tempfile.TemporaryFile() as tmp:
+            Source.from_buffer(b"png file").to_file(tmp, stream=True)
+            tmp.seek(0)
+            assert b"compressed file" == tmp.read()
+
+    def test_to_file_with_stream_should_keep_original_on_error(self, tmp_path):
+        path = tmp_path / "output.png"
+        path.write_bytes(b"old file")
+        source = Source.from_buffer(b"png file")
+
+        def broken(chunk_size=None, timeout=None):
+            yield b"partial"
+            raise IOError("connection lost")
+
+        source.iter_content = broken
+        with pytest.raises(IOError):
+            source.to_file(str(path), stream=True)
+        assert b"old file" == path.read_bytes()
+        assert ["output.png"] == os.listdir(str(tmp_path))
+
+    def test_variants_with_mapping_should_return_results_by_name(self, mock_requests):
+        results = Source.from_buffer(b"png file").variants(
+            {
+                "small": {"resize": {"width": 100}},
+                "webp": {"convert": {"type": "image/webp"}},
+            }
+        )
+        assert b"small file" == results["small"].to_buffer()
+        assert b"converted file" == results["webp"].to_buffer()
+        assert mock_requests.call_count == 3
+
+    def test_variants_with_sequence_should_return_results_in_order(self):
+        results = Source.from_buffer(b"png file").variants(
+            [{"resize": {"width": 100}}, {}, {"transform": {"background": "black"}}]
+        )
+        assert [b"small file", b"compressed file", b"transformed file"] == [
+            result.to_buffer() for result in results
+        ]
+
+    def test_variants_should_request_identical_commands_once(self, mock_requests):
+        results = Source.from_buffer(b"png file").variants(
+            [{"resize": {"width": 100}}, {"resize": {"width": 100}}]
+        )
+        assert results[0] is results[1]
+        assert mock_requests.call_count == 2
+
+    def test_variants_should_include_commands_of_source(self, mock_requests):
+        Source.from_buffer(b"png file").preserve("copyright").variants(
+            [{"resize": {"width": 100}}]
+        )
+        assert_json_equal(
+            '{"preserve":["copyright"],"resize":{"width":100}}',
+            mock_requests.last_request.json(),
+        )
+
+    def test_variants_should_use_configured_pool_size(self, monkeypatch):
+        import concurrent.futures
+        workers = []
+
+        class Executor(concurrent.futures.ThreadPoolExecutor):
+            def __init__(self, max_workers):
+                workers.append(max_workers)
+                super(Executor, self).__init__(max_workers)
+
+        monkeypatch.setattr(concurrent.futures, "ThreadPoolExecutor", Executor)
+        tinify.pool_maxsize = 2
+        Source.from_buffer(b"png file").variants(
+            [{"resize": {"width": 100}}, {}, {"transform": {"background": "black"}}]
+        )
+        assert workers == [2]
+
+    def test_result_with_timeout_should_bound_requests(self, mock_requests, monkeypatch):
+        source = Source.from_buffer(b"png file")
+        monkeypatch.setattr(time, "time", lambda: 1000.0)
+        source.result(timeout=2.5)
+        assert (2.5, 2.5) == mock_requests.last_request.timeout
+
+    def test_store_with_timeout_should_bound_requests(self, mock_requests, monkeypatch):
+        source = Source.from_buffer(b"png file")
+        monkeypatch.setattr(time, "time", lambda: 1000.0)
+        source.store(timeout=4, service="s3")
+        assert (4, 4) == mock_requests.last_request.timeout
+        assert_json_equal('{"store":{"service":"s3"}}', mock_requests.last_request.json())
+
     def test_all_options_together(self, mock_requests):
         assert (
             "https://bucket.s3-region.amazonaws.com/some/location"
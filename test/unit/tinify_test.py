@@ -1,6 +1,10 @@
 import pytest
 import tinify
 import base64
+import os
+import subprocess
+import sys
+import threading
 
 
 def test_key_should_reset_client_with_new_key(mock_requests):
@@ -46,6 +50,142 @@ def test_proxy_should_reset_client_with_new_proxy(mock_requests):
     assert new_client.session.proxies["https"] == "http://localhost:9090"
 
 
+def test_pool_settings_should_reset_client_with_new_settings():
+    tinify.key = "abcde"
+    tinify.pool_maxsize = 4
+    client = tinify.get_client()
+    assert client.adapter._pool_maxsize == 4
+
+    tinify.pool_maxsize = 64
+    tinify.pool_block = True
+    tinify.keep_alive = False
+    new_client = tinify.get_client()
+
+    assert new_client is not client
+    assert new_client.adapter._pool_maxsize == 64
+    assert new_client.adapter._pool_block is True
+    assert new_client.session.headers["connection"] == "close"
+
+
+def test_retry_policy_should_reset_client_with_new_policy():
+    tinify.key = "abcde"
+    client = tinify.get_client()
+    policy = tinify.RetryPolicy(retries=5)
+    tinify.retry_policy = policy
+
+    assert tinify.get_client() is not client
+    assert tinify.get_client().retry_policy is policy
+
+
+def test_using_should_scope_key_to_block(mock_requests):
+    mock_requests.get("https://api.tinify.com/")
+    tinify.key = "abcde"
+    client = tinify.get_client()
+
+    with tinify.using(key="tenant"):
+        scoped = tinify.get_client()
+        scoped.request("GET", "/")
+
+    assert scoped is not client
+    assert tinify.get_client() is client
+    assert mock_requests.last_request.headers["authorization"] == "Basic {0}".format(
+        base64.b64encode(b"api:tenant").decode("ascii")
+    )
+
+
+def test_using_should_reuse_client_for_same_settings():
+    tinify.key = "abcde"
+    with tinify.using(key="tenant", proxy="http://localhost:8080"):
+        client = tinify.get_client()
+    with tinify.using(key="tenant", proxy="http://localhost:8080"):
+        assert tinify.get_client() is client
+    with tinify.using(key="tenant"):
+        assert tinify.get_client() is not client
+
+    assert client.session.proxies["https"] == "http://localhost:8080"
+
+
+def test_using_should_nest_and_inherit_settings():
+    tinify.key = "abcde"
+    with tinify.using(key="tenant"):
+        with tinify.using(app_identifier="MyApp/1.0"):
+            client = tinify.get_client()
+
+    assert client.usage.key == "tenant"
+    assert client.session.headers["user-agent"].endswith(" MyApp/1.0")
+
+
+def test_using_should_not_leak_into_other_threads():
+    tinify.key = "abcde"
+    seen = []
+    with tinify.using(key="tenant"):
+        thread = threading.Thread(target=lambda: seen.append(tinify.get_client().usage.key))
+        thread.start()
+        thread.join()
+
+    assert seen == ["abcde"]
+
+
+def test_using_should_apply_to_batch_workers(mock_requests):
+    mock_requests.post(
+        "https://api.tinify.com/shrink",
+        status_code=201,
+        headers={"Location": "https://api.tinify.com/some/location"},
+    )
+    mock_requests.get("https://api.tinify.com/some/location", content=b"compressed")
+    tinify.key = "abcde"
+
+    with tinify.using(key="tenant"):
+        tinify.compress_many([b"png file", b"png file"], concurrency=2)
+
+    assert all(
+        r.headers["authorization"] == "Basic {0}".format(base64.b64encode(b"api:tenant").decode("ascii"))
+        for r in mock_requests.request_history
+    )
+
+
+def test_settings_should_reset_scoped_clients():
+    tinify.key = "abcde"
+    with tinify.using(key="tenant"):
+        client = tinify.get_client()
+    tinify.timeout = 5
+    with tinify.using(key="tenant"):
+        assert tinify.get_client() is not client
+
+
+def test_using_should_close_least_recently_used_clients(monkeypatch):
+    monkeypatch.setattr(tinify, "MAX_SCOPED_CLIENTS", 2)
+    closed = []
+    monkeypatch.setattr(tinify.Client, "close", lambda client: closed.append(client._key))
+    clients = {}
+    for key in ["a", "b", "a", "c"]:
+        with tinify.using(key=key):
+            clients[key] = tinify.get_client()
+
+    assert closed == ["b"]
+    with tinify.using(key="a"):
+        assert tinify.get_client() is clients["a"]
+    assert len(tinify._scoped_clients) == 2
+
+
+def test_after_fork_should_reset_clients():
+    tinify.key = "abcde"
+    client = tinify.get_client()
+    tinify._after_fork()
+    assert tinify.get_client() is not client
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_forked_process_should_not_share_client():
+    tinify.key = "abcde"
+    tinify.get_client()
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0 if tinify._client is None else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+
+
 def test_client_with_key_should_return_client():
     tinify.key = "abcde"
     assert isinstance(tinify.get_client(), tinify.Client)
@@ -142,3 +282,17 @@ def test_from_url_should_return_source(mock_requests):
     tinify.key = "valid"
     result = tinify.from_url("http://example.com/test.jpg")
     assert isinstance(result, tinify.Source)
+
+
+def test_import_should_not_load_http_stack():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+    script = (
+        "import sys, tinify\n"
+        "print(sorted(m for m in ('requests', 'urllib3', 'asyncio', 'multiprocessing') if m in sys.modules))\n"
+        "tinify.Client.USER_AGENT\n"
+        "print(tinify.AsyncClient.__name__ if sys.version_info >= (3, 7) else 'AsyncClient')\n"
+    )
+    env = dict(os.environ, PYTHONPATH=root)
+    output = subprocess.check_output([sys.executable, "-c", script], env=env).decode("utf-8").split()
+
+    assert output == ["[]", "AsyncClient"]
@@ -0,0 +1,241 @@
+import functools
+import json
+import socket
+import threading
+import pytest
+import tinify
+from tinify import Client, ClientError, ConnectionError, MemoryTransport, Urllib3Transport, HttpxTransport
+
+Client.RETRY_DELAY = 10
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.read_body()
+        self.server.received.append((self.path, dict(self.headers), body))
+        self.respond(201, {"Location": "https://api.tinify.com/output/1", "Compression-Count": "7"}, b"{}")
+
+    def do_GET(self):
+        self.server.received.append((self.path, dict(self.headers), b""))
+        if self.path == "/output/1":
+            self.respond(200, {"Content-Type": "image/png"}, b"compressed" * 1000)
+        else:
+            self.respond(404, {"Content-Type": "application/json"}, b'{"error":"NotFound","message":"Oops"}')
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+            if size == 0:
+                return b"".join(chunks)
+
+    def respond(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def local(factory, url):
+    # The client only talks HTTPS; send its requests to the plain HTTP test server instead.
+    def create(*args, **kwargs):
+        transport = factory(*args, **kwargs)
+        send = transport.request
+        transport.request = lambda method, location, *args, **kwargs: send(
+            method, location.replace(Client.API_ENDPOINT, url, 1), *args, **kwargs)
+        return transport
+    return create
+
+
+@pytest.fixture
+def server():
+    server = Server(("127.0.0.1", 0), Handler)
+    server.url = "http://127.0.0.1:{0}".format(server.server_address[1])
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestMemoryTransport:
+    def test_should_answer_with_added_responses(self):
+        transport = MemoryTransport()
+        transport.add("POST", "/shrink", 201, {"Location": "https://api.tinify.com/output/1", "Compression-Count": "3"})
+        client = Client("key", "MyApp/1.0", transport=transport)
+
+        response = client.request("POST", "/shrink", b"png file")
+
+        assert response.status_code == 201
+        assert response.headers["location"] == "https://api.tinify.com/output/1"
+        assert client.compression_count == 3
+        request = transport.last_request
+        assert (request.method, request.url, request.body) == ("POST", "https://api.tinify.com/shrink", b"png file")
+        assert request.headers["user-agent"] == Client.USER_AGENT + " MyApp/1.0"
+        assert request.headers["authorization"] == "Basic YXBpOmtleQ=="
+
+    def test_should_prefer_latest_response(self):
+        transport = MemoryTransport()
+        transport.add("GET", "/output/1", body=b"first")
+        transport.add("GET", "https://api.tinify.com/output/1", body=b"second")
+
+        assert Client("key", transport=transport).request("GET", "/output/1").content == b"second"
+
+    def test_should_answer_unknown_requests_with_not_found(self):
+        with pytest.raises(ClientError) as excinfo:
+            Client("key", transport=MemoryTransport()).request("GET", "/output/1")
+        assert excinfo.value.status == 404
+
+    def test_should_raise_added_errors(self):
+        transport = MemoryTransport()
+        transport.add("POST", "/shrink", error=socket.timeout("timed out"))
+
+        with pytest.raises(ConnectionError) as excinfo:
+            Client("key", transport=transport).request("POST", "/shrink")
+        assert str(excinfo.value) == "Timeout while connecting"
+        assert len(transport.requests) == 2
+
+    def test_should_stream_response(self):
+        transport = MemoryTransport()
+        transport.add("GET", "/output/1", body=b"compressed")
+
+        response = Client("key", transport=transport).request("GET", "/output/1", stream=True)
+
+        assert list(response.iter_content(4)) == [b"comp", b"ress", b"ed"]
+
+    def test_should_be_used_by_tinify(self):
+        transport = MemoryTransport()
+        transport.add("POST", "/shrink", 201, {"Location": "https://api.tinify.com/output/1"})
+        transport.add("GET", "/output/1", body=b"compressed")
+        tinify.key = "valid"
+        tinify.transport = transport
+
+        assert tinify.from_buffer(b"png file").to_buffer() == b"compressed"
+        assert [(r.method, r.url) for r in transport.requests] == [
+            ("POST", "https://api.tinify.com/shrink"),
+            ("GET", "https://api.tinify.com/output/1"),
+        ]
+
+    def test_should_not_send_requests_over_plain_http(self):
+        transport = MemoryTransport()
+        with pytest.raises(ClientError):
+            Client("key", transport=transport).request("GET", "http://example.com/output/1")
+        assert transport.last_request.url.startswith("https://api.tinify.com")
+
+    def test_should_keep_state_after_reconnect(self):
+        transport = MemoryTransport()
+        transport.add("GET", "/", body=b"")
+        client = Client("key", transport=transport)
+        client._pid = -1
+
+        client.request("GET", "/")
+
+        assert client.transport is transport
+        assert len(transport.requests) == 1
+
+
+@pytest.fixture(params=["urllib3", "httpx"])
+def factory(request):
+    if request.param == "urllib3":
+        return Urllib3Transport
+    pytest.importorskip("httpx")
+    return functools.partial(HttpxTransport, http2=False)
+
+
+@pytest.fixture
+def transport(factory, server):
+    return local(factory, server.url)
+
+
+class TestNetworkTransports:
+    def test_should_send_requests(self, server, transport):
+        client = Client("key", "MyApp/1.0", transport=transport)
+
+        response = client.request("POST", "/shrink", b"png file")
+
+        assert response.status_code == 201
+        assert response.headers["location"] == "https://api.tinify.com/output/1"
+        assert client.compression_count == 7
+        path, headers, body = server.received[-1]
+        headers = dict((name.lower(), value) for name, value in headers.items())
+        assert (path, body) == ("/shrink", b"png file")
+        assert headers["authorization"] == "Basic YXBpOmtleQ=="
+        assert headers["user-agent"] == Client.USER_AGENT + " MyApp/1.0"
+
+    def test_should_send_json_and_streams(self, server, transport, tmp_path):
+        client = Client("key", transport=transport)
+        path = tmp_path / "input.png"
+        path.write_bytes(b"png file" * 10000)
+
+        client.request("POST", "/shrink", {"resize": {"width": 100}})
+        assert json.loads(server.received[-1][2].decode("utf-8")) == {"resize": {"width": 100}}
+
+        with open(str(path), "rb") as f:
+            client.request("POST", "/shrink", f)
+        assert server.received[-1][2] == b"png file" * 10000
+
+    def test_should_download_and_stream_outputs(self, server, transport):
+        client = Client("key", transport=transport)
+
+        assert client.request("GET", "/output/1").content == b"compressed" * 1000
+
+        response = client.request("GET", "/output/1", stream=True)
+        assert b"".join(response.iter_content(1024)) == b"compressed" * 1000
+        response.close()
+
+    def test_should_raise_client_error(self, server, transport):
+        with pytest.raises(ClientError) as excinfo:
+            Client("key", transport=transport).request("GET", "/missing")
+        assert excinfo.value.status == 404
+
+    def test_should_raise_connection_error(self, factory):
+        with pytest.raises(ConnectionError):
+            Client("key", transport=local(factory, "http://127.0.0.1:1")).request("GET", "/")
+
+
+class TestUrllib3Transport:
+    def test_pool_stats_should_report_pools(self, server):
+        client = Client("key", pool_maxsize=16, transport=local(Urllib3Transport, server.url))
+        client.request("GET", "/output/1")
+
+        stats = client.pool_stats()
+        assert [(s["port"], s["maxsize"], s["idle"], s["requests"]) for s in stats] == [
+            (server.server_address[1], 16, 1, 1)
+        ]
+
+
+class TestHttpxTransport:
+    def test_should_require_h2_for_http2(self):
+        pytest.importorskip("httpx")
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            with pytest.raises(ImportError):
+                Client("key", transport=HttpxTransport)
+        else:
+            assert Client("key", transport=HttpxTransport).transport.client._transport._pool._http2
@@ -1,20 +1,46 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import collections
+import importlib
+import os
 import threading
 import sys
 try:
-    from typing import Optional, Any, TYPE_CHECKING
+    from typing import Optional, Any, Callable, ContextManager, Dict, Iterable, List, Tuple, Union, TYPE_CHECKING
 except ImportError:
     TYPE_CHECKING = False # type: ignore
 
+# Attributes whose modules are only imported when they are used, as they pull in asyncio.
+_LAZY_ATTRIBUTES = {
+    'AsyncClient': '.async_client',
+    'AsyncSource': '.async_source',
+}
+
 class tinify(object):
 
-    _client = None  # type: Optional[Client]
+    # Clients kept for the settings of tinify.using(); the least recently used are closed.
+    MAX_SCOPED_CLIENTS = 32
+
+    _client = None  # type: Union[None, Client, ClientPool]
+    _async_client = None  # type: Optional[AsyncClient]
     _key = None  # type: Optional[str]
+    _keys = []  # type: List[str]
     _app_identifier = None  # type: Optional[str]
     _proxy = None  # type: Optional[str]
     _compression_count = None  # type: Optional[int]
+    _pool_maxsize = None  # type: Optional[int]
+    _pool_block = False  # type: bool
+    _keep_alive = True  # type: bool
+    _cache = None  # type: Optional[ResultCache]
+    _lazy = False  # type: bool
+    _preflight = None  # type: Optional[Preflight]
+    _retry_policy = None  # type: Optional[RetryPolicy]
+    _rate_limiter = None  # type: Optional[RateLimiter]
+    _timeout = None  # type: Union[None, float, Tuple[float, float]]
+    _transport = None  # type: Optional[Callable[..., Transport]]
+    _observers = []  # type: List[Callable[[RequestEvent], Any]]
+    _usage_thresholds = []  # type: List[Tuple[int, Callable[[Any, int, int], Any]]]
 
     def __init__(self, module):
         # type: (Any) -> None
@@ -22,10 +48,28 @@ class tinify(object):
         self._lock = threading.RLock()
 
         self._client = None
+        self._async_client = None
+        self._async_client_loop = None  # type: Any
         self._key = None
+        self._keys = []
         self._app_identifier = None
         self._proxy = None
         self._compression_count = None
+        self._pool_maxsize = None
+        self._pool_block = False
+        self._keep_alive = True
+        self._cache = None
+        self._lazy = False
+        self._preflight = None
+        self._retry_policy = None
+        self._rate_limiter = None
+        self._timeout = None
+        self._transport = None
+        self._observers = []
+        self._usage_thresholds = []
+        self._compression_counts = {}  # type: Dict[str, int]
+        self._scoped_clients = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[Any, ...], Union[Client, ClientPool]]
+        self._scoped_async_clients = collections.OrderedDict()  # type: collections.OrderedDict[Tuple[Any, ...], Tuple[Any, AsyncClient]]
 
     @property
     def key(self):
@@ -36,7 +80,20 @@ class tinify(object):
     def key(self, value):
         # type: (str) -> None
         self._key = value
-        self._client = None
+        self._forget_compression_counts()
+        self._reset_clients()
+
+    @property
+    def keys(self):
+        # type: () -> List[str]
+        return self._keys
+
+    @keys.setter
+    def keys(self, value):
+        # type: (List[str]) -> None
+        self._keys = list(value)
+        self._forget_compression_counts()
+        self._reset_clients()
 
     @property
     def app_identifier(self):
@@ -47,7 +104,7 @@ class tinify(object):
     def app_identifier(self, value):
         # type: (str) -> None
         self._app_identifier = value
-        self._client = None
+        self._reset_clients()
 
     @property
     def proxy(self):
@@ -58,7 +115,136 @@ class tinify(object):
     def proxy(self, value):
         # type: (str) -> None
         self._proxy = value
-        self._client = None
+        self._reset_clients()
+
+    @property
+    def pool_maxsize(self):
+        # type: () -> Optional[int]
+        return self._pool_maxsize
+
+    @pool_maxsize.setter
+    def pool_maxsize(self, value):
+        # type: (Optional[int]) -> None
+        self._pool_maxsize = value
+        self._reset_clients()
+
+    @property
+    def pool_block(self):
+        # type: () -> bool
+        return self._pool_block
+
+    @pool_block.setter
+    def pool_block(self, value):
+        # type: (bool) -> None
+        self._pool_block = value
+        self._reset_clients()
+
+    @property
+    def keep_alive(self):
+        # type: () -> bool
+        return self._keep_alive
+
+    @keep_alive.setter
+    def keep_alive(self, value):
+        # type: (bool) -> None
+        self._keep_alive = value
+        self._reset_clients()
+
+    @property
+    def retry_policy(self):
+        # type: () -> Optional[RetryPolicy]
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, value):
+        # type: (Optional[RetryPolicy]) -> None
+        self._retry_policy = value
+        self._reset_clients()
+
+    @property
+    def rate_limiter(self):
+        # type: () -> Optional[RateLimiter]
+        return self._rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, value):
+        # type: (Optional[RateLimiter]) -> None
+        self._rate_limiter = value
+        self._reset_clients()
+
+    @property
+    def timeout(self):
+        # type: () -> Union[None, float, Tuple[float, float]]
+        return self._timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        # type: (Union[None, float, Tuple[float, float]]) -> None
+        self._timeout = value
+        self._reset_clients()
+
+    @property
+    def transport(self):
+        # type: () -> Optional[Callable[..., Transport]]
+        return self._transport
+
+    @transport.setter
+    def transport(self, value):
+        # type: (Optional[Callable[..., Transport]]) -> None
+        self._transport = value
+        self._reset_clients()
+
+    @property
+    def observers(self):
+        # type: () -> List[Callable[[RequestEvent], Any]]
+        return self._observers
+
+    @observers.setter
+    def observers(self, value):
+        # type: (List[Callable[[RequestEvent], Any]]) -> None
+        self._observers = value
+        self._reset_clients()
+
+    @property
+    def usage_thresholds(self):
+        # type: () -> List[Tuple[int, Callable[[Any, int, int], Any]]]
+        return self._usage_thresholds
+
+    @usage_thresholds.setter
+    def usage_thresholds(self, value):
+        # type: (List[Tuple[int, Callable[[Any, int, int], Any]]]) -> None
+        self._usage_thresholds = value
+        self._reset_clients()
+
+    @property
+    def cache(self):
+        # type: () -> Optional[ResultCache]
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        # type: (Optional[ResultCache]) -> None
+        self._cache = value
+
+    @property
+    def lazy(self):
+        # type: () -> bool
+        return self._lazy
+
+    @lazy.setter
+    def lazy(self, value):
+        # type: (bool) -> None
+        self._lazy = value
+
+    @property
+    def preflight(self):
+        # type: () -> Optional[Preflight]
+        return self._preflight
+
+    @preflight.setter
+    def preflight(self, value):
+        # type: (Optional[Preflight]) -> None
+        self._preflight = value
 
     @property
     def compression_count(self):
@@ -67,24 +253,152 @@ class tinify(object):
 
     @compression_count.setter
     def compression_count(self, value):
-        # type: (int) -> None
-        self._compression_count = value
+        # type: (Optional[int]) -> None
+        with self._lock:
+            self._compression_count = value
+            self._compression_counts = {}
+
+    def _record_compression_count(self, key, count):
+        # type: (str, int) -> None
+        # The module wide count is the sum of the latest count of every key in use.
+        with self._lock:
+            self._compression_counts[key] = count
+            self._compression_count = sum(self._compression_counts.values())
+
+    def _forget_compression_counts(self):
+        # type: () -> None
+        # Keys that are no longer configured must not count towards the sum.
+        with self._lock:
+            self._compression_counts = {}
+
+    def using(self, key=None, app_identifier=None, proxy=None):
+        # type: (Optional[str], Optional[str], Optional[str]) -> ContextManager[Dict[str, Any]]
+        """Use another key, app identifier or proxy for requests made within the block.
+
+        The settings apply to the current thread or asyncio task only. Clients are kept per
+        combination of settings, so switching between them keeps their connections. Only the
+        MAX_SCOPED_CLIENTS most recently used are kept; older clients are closed.
+        """
+        return context.using(key=key, app_identifier=app_identifier, proxy=proxy)
+
+    def _after_fork(self):
+        # type: () -> None
+        # The lock may have been held by another thread of the parent while it forked.
+        self._lock = threading.RLock()
+        self._reset_clients()
+
+    def _reset_clients(self):
+        # type: () -> None
+        with self._lock:
+            self._client = None
+            self._async_client = None
+            self._scoped_clients = collections.OrderedDict()
+            self._scoped_async_clients = collections.OrderedDict()
+
+    def _settings(self):
+        # type: () -> Tuple[Optional[str], Optional[str], Optional[str]]
+        overrides = context.current()
+        return (
+            overrides.get('key', self._key),
+            overrides.get('app_identifier', self._app_identifier),
+            overrides.get('proxy', self._proxy),
+        )
 
     def get_client(self):
-        # type: () -> Client
-        if not self._key:
+        # type: () -> Union[Client, ClientPool]
+        if context.current():
+            return self._scoped_client()
+
+        if not self._key and not self._keys:
             raise AccountError('Provide an API key with tinify.key = ...')
 
         if not self._client:
             with self._lock:
                 if not self._client:
-                    self._client = Client(self._key, self._app_identifier, self._proxy)
+                    if self._keys:
+                        self._client = ClientPool([self._new_client(key) for key in self._keys])
+                    else:
+                        self._client = self._new_client(self._key)  # type: ignore[arg-type]
 
         return self._client
 
-    # Delegate to underlying base module.
+    def _scoped_client(self):
+        # type: () -> Union[Client, ClientPool]
+        key, app_identifier, proxy = settings = self._settings()
+        if not key and not self._keys:
+            raise AccountError('Provide an API key with tinify.key = ...')
+
+        registry_key = settings + (None if key else tuple(self._keys),)
+        evicted = []
+        with self._lock:
+            client = self._scoped_clients.pop(registry_key, None)
+            if client is None:
+                if key:
+                    client = self._new_client(key, app_identifier, proxy)
+                else:
+                    client = ClientPool([self._new_client(k, app_identifier, proxy) for k in self._keys])
+            self._scoped_clients[registry_key] = client
+            while len(self._scoped_clients) > self.MAX_SCOPED_CLIENTS:
+                evicted.append(self._scoped_clients.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return client
+
+    def _new_client(self, key, app_identifier=None, proxy=None):
+        # type: (str, Optional[str], Optional[str]) -> Client
+        return Client(key, app_identifier or self._app_identifier, proxy or self._proxy,
+            pool_maxsize=self._pool_maxsize, pool_block=self._pool_block, keep_alive=self._keep_alive,
+            retry_policy=self._retry_policy, rate_limiter=self._rate_limiter,
+            timeout=self._timeout, observers=self._observers,
+            usage_thresholds=self._usage_thresholds, transport=self._transport)
+
+    def get_async_client(self):
+        # type: () -> AsyncClient
+        key, app_identifier, proxy = settings = self._settings()
+        if not key and self._keys:
+            raise AccountError('The async client does not support key pools; provide a single API key with tinify.key = ...')
+        if not key:
+            raise AccountError('Provide an API key with tinify.key = ...')
+
+        # An httpx connection pool is bound to the event loop it was created in.
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if context.current():
+            with self._lock:
+                entry = self._scoped_async_clients.pop(settings, None)
+                if entry is None or entry[0] is not loop:
+                    entry = (loop, self._new_async_client(key, app_identifier, proxy))
+                self._scoped_async_clients[settings] = entry
+                # Closing an async client needs its event loop; evicted ones are left to the collector.
+                while len(self._scoped_async_clients) > self.MAX_SCOPED_CLIENTS:
+                    self._scoped_async_clients.popitem(last=False)
+                return entry[1]
+
+        if not self._async_client or self._async_client_loop is not loop:
+            with self._lock:
+                if not self._async_client or self._async_client_loop is not loop:
+                    self._async_client = self._new_async_client(key, app_identifier, proxy)
+                    self._async_client_loop = loop
+
+        return self._async_client
+
+    def _new_async_client(self, key, app_identifier, proxy):
+        # type: (str, Optional[str], Optional[str]) -> AsyncClient
+        from .async_client import AsyncClient
+        return AsyncClient(key, app_identifier, proxy,
+            pool_maxsize=self._pool_maxsize, keep_alive=self._keep_alive,
+            retry_policy=self._retry_policy, rate_limiter=self._rate_limiter,
+            timeout=self._timeout, observers=self._observers,
+            usage_thresholds=self._usage_thresholds)
+
+    # Delegate to underlying base module, importing the modules of lazy attributes on first use.
     def __getattr__(self, attr):
         # type: (str) -> Any
+        module = _LAZY_ATTRIBUTES.get(attr)
+        if module is not None and sys.version_info >= (3, 7):
+            value = getattr(importlib.import_module(module, __name__), attr)
+            setattr(self._module, attr, value)
+            return value
         return getattr(self._module, attr)
 
     def validate(self):
@@ -111,18 +425,46 @@ class tinify(object):
         # type: (str) -> Source
         return Source.from_url(url)
 
+    def compress_many(self, inputs, outputs=None, concurrency=4, journal=None, **commands):
+        # type: (Iterable[Any], Optional[Iterable[Any]], int, Union[None, str, Journal], **Any) -> List[BatchItem]
+        return Batch(inputs, outputs, concurrency, journal, **commands).run()
+
 if TYPE_CHECKING:
     # Help the type checker here, as we overrride the module with a singleton object.
-    def get_client(): # type: () -> Client
+    def get_client(): # type: () -> Union[Client, ClientPool]
+        pass
+    def get_async_client(): # type: () -> AsyncClient
+        pass
+    def using(key=None, app_identifier=None, proxy=None):  # type: (Optional[str], Optional[str], Optional[str]) -> ContextManager[Dict[str, Any]]
         pass
     key = None  # type: Optional[str]
+    keys = []  # type: List[str]
     app_identifier = None  # type: Optional[str]
     proxy = None  # type: Optional[str]
+    pool_maxsize = None  # type: Optional[int]
+    pool_block = False  # type: bool
+    keep_alive = True  # type: bool
+    retry_policy = None  # type: Optional[RetryPolicy]
+    rate_limiter = None  # type: Optional[RateLimiter]
+    timeout = None  # type: Union[None, float, Tuple[float, float]]
+    transport = None  # type: Optional[Callable[..., Transport]]
+    observers = []  # type: List[Callable[[RequestEvent], Any]]
+    usage_thresholds = []  # type: List[Tuple[int, Callable[[Any, int, int], Any]]]
+    cache = None  # type: Optional[ResultCache]
+    lazy = False  # type: bool
+    preflight = None  # type: Optional[Preflight]
     compression_count = None  # type: Optional[int]
+    MAX_SCOPED_CLIENTS = 32  # type: int
 
     def validate():  # type: () -> bool
         pass
 
+    def _record_compression_count(key, count):  # type: (str, int) -> None
+        pass
+
+    def _settings():  # type: () -> Tuple[Optional[str], Optional[str], Optional[str]]
+        pass
+
     def from_file(path):  # type: (str) -> Source
         pass
 
@@ -132,26 +474,73 @@ if TYPE_CHECKING:
     def from_url(url):  # type: (str) -> Source
         pass
 
+    def compress_many(inputs, outputs=None, concurrency=4, journal=None, **commands):  # type: (Iterable[Any], Optional[Iterable[Any]], int, Union[None, str, Journal], **Any) -> List[BatchItem]
+        pass
+
 
 # Overwrite current module with singleton object.
 tinify = sys.modules[__name__] = tinify(sys.modules[__name__])  # type: ignore
 
+if hasattr(os, 'register_at_fork'):
+    # Give forked processes their own connections. Clients created before the fork also
+    # notice it themselves, on their next request.
+    os.register_at_fork(after_in_child=tinify._after_fork)
+
 from .version import __version__
 
+from . import context
+
+from .retry import RetryPolicy
+from .limiter import RateLimiter, FileRateLimiter
+from .instrumentation import RequestEvent, PrometheusObserver, OpenTelemetryObserver
+from .transports import Transport, RequestsTransport, Urllib3Transport, HttpxTransport, MemoryTransport
 from .client import Client
+from .client_pool import ClientPool
+from .image_info import ImageInfo, Preflight
 from .result_meta import ResultMeta
 from .result import Result
+from .result_cache import ResultCache, MemoryCache, FileCache
 from .source import Source
+from .journal import Journal
+from .batch import Batch, BatchItem, ProcessBatch
 from .errors import *
 
+if TYPE_CHECKING:
+    from .async_client import AsyncClient
+    from .async_source import AsyncSource
+
 __all__ = [
     'Client',
+    'ClientPool',
+    'Transport',
+    'RequestsTransport',
+    'Urllib3Transport',
+    'HttpxTransport',
+    'MemoryTransport',
+    'RetryPolicy',
+    'RateLimiter',
+    'FileRateLimiter',
+    'RequestEvent',
+    'PrometheusObserver',
+    'OpenTelemetryObserver',
+    'ImageInfo',
+    'Preflight',
     'Result',
     'ResultMeta',
+    'ResultCache',
+    'MemoryCache',
+    'FileCache',
     'Source',
+    'Batch',
+    'BatchItem',
+    'ProcessBatch',
+    'Journal',
     'Error',
     'AccountError',
     'ClientError',
     'ServerError',
     'ConnectionError'
 ]
+
+if sys.version_info >= (3, 7):
+    __all__ += ['AsyncClient', 'AsyncSource']
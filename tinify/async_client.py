@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import asyncio
+import ssl
+import time
+
+from .client import Client, Usage, _default_policy, _prepare_request, _error_from_response, _timeouts
+from .errors import ConnectionError, Error
+from .retry import RetryPolicy
+from .limiter import RateLimiter
+from .instrumentation import RequestEvent, body_size, endpoint_kind, notify, request_event
+
+try:
+    from typing import Any, Callable, List, Optional, Tuple, Union, TYPE_CHECKING
+    if TYPE_CHECKING:
+        import httpx
+except ImportError:
+    pass
+
+class AsyncClient(object):
+    API_ENDPOINT = Client.API_ENDPOINT
+
+    RETRY_COUNT = Client.RETRY_COUNT
+    RETRY_DELAY = Client.RETRY_DELAY
+    RETRY_MAX_ELAPSED = Client.RETRY_MAX_ELAPSED
+
+    USER_AGENT = Client.USER_AGENT
+
+    POOL_MAXSIZE = 100
+
+    def __init__(self, key, app_identifier=None, proxy=None, pool_maxsize=None, keep_alive=True, retry_policy=None, rate_limiter=None, timeout=None, observers=None, usage_thresholds=None):  # type: (str, Optional[str], Optional[str], Optional[int], bool, Optional[RetryPolicy], Optional[RateLimiter], Union[None, float, Tuple[float, float]], Optional[List[Callable[[RequestEvent], Any]]], Optional[List[Tuple[int, Callable[[Any, int, int], Any]]]]) -> None
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('AsyncClient requires httpx, install it with: pip install tinify[async]')
+
+        connect_timeout, read_timeout = _timeouts(timeout, Client.CONNECT_TIMEOUT, Client.READ_TIMEOUT)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.observers = observers if observers is not None else []
+        self.usage = Usage(key, usage_thresholds)
+        self.session = httpx.AsyncClient(
+            auth=('api', key),
+            headers={
+                'user-agent': self.USER_AGENT + ' ' + app_identifier if app_identifier else self.USER_AGENT,
+            },
+            verify=ssl.create_default_context(cafile=Client.CA_BUNDLE),
+            proxy=proxy or None,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize or self.POOL_MAXSIZE,
+                max_keepalive_connections=(pool_maxsize or self.POOL_MAXSIZE) if keep_alive else 0,
+            ),
+            # Tasks beyond the connection limit wait for a free connection without a time limit.
+            timeout=httpx.Timeout(connect=connect_timeout, read=read_timeout, write=read_timeout, pool=None),
+            follow_redirects=True,
+        )
+
+    async def __aenter__(self):  # type: () -> AsyncClient
+        return self
+
+    async def __aexit__(self, *args):  # type: (*Any) -> None
+        await self.close()
+        return None
+
+    async def close(self):  # type: () -> None
+        await self.session.aclose()
+
+    @property
+    def compression_count(self):  # type: () -> Optional[int]
+        return self.usage.count
+
+    @property
+    def compression_count_updated_at(self):  # type: () -> Optional[float]
+        return self.usage.updated_at
+
+    async def request(self, method, url, body=None):  # type: (str, str, Any) -> httpx.Response
+        import httpx
+
+        endpoint = endpoint_kind(url, body)
+        url, headers, data = _prepare_request(self.API_ENDPOINT, url, body)
+        if isinstance(data, (bytearray, memoryview)):
+            # httpx only sends bytes as a single body.
+            data = bytes(data)
+
+        policy = self.retry_policy or _default_policy(self)
+        bytes_sent = body_size(data) if self.observers else None
+        start = time.time()
+        attempt = 0
+        backoff = 0.0
+
+        while True:
+            attempt += 1
+            started = time.time()
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.try_acquire()
+                while wait:
+                    await asyncio.sleep(wait)
+                    wait = self.rate_limiter.try_acquire()
+            requested = time.time()
+            response = None  # type: Any
+            try:
+                response = await self.session.request(method, url, headers=headers, content=data)
+            except httpx.TimeoutException as err:
+                error = ConnectionError('Timeout while connecting', cause=err)  # type: Optional[Error]
+                delay = policy.retry_delay(attempt, time.time() - start)
+            except Exception as err:
+                error = ConnectionError('Error while connecting: {0}'.format(err), cause=err)
+                delay = policy.retry_delay(attempt, time.time() - start)
+            else:
+                self.usage.update(response, self)
+
+                if not response.is_error:
+                    error = None
+                else:
+                    error = _error_from_response(response)
+                    delay = policy.retry_delay(attempt, time.time() - start, response.status_code, response.headers)
+            finally:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.release()
+
+            if self.observers:
+                notify(self.observers, request_event(method, url, endpoint, attempt, started, requested, backoff, bytes_sent, False, response, error))
+
+            if error is None:
+                return response
+            if delay is None:
+                raise error
+
+            await asyncio.sleep(delay)
+            backoff = delay
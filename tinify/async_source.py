@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import asyncio
+import json
+from collections.abc import Mapping
+
+import tinify
+from .source import Source
+from .result import Result
+from .result_meta import ResultMeta
+from .errors import ConnectionError
+
+try:
+    from typing import Union, IO, Any, Awaitable, Dict, Iterator, Optional, Sequence
+except ImportError:
+    pass
+
+class AsyncSource(Source):
+    """Source whose network calls are coroutines, issued through tinify.get_async_client().
+
+    Every method that talks to the API is awaited, and timeout bounds the whole call. Streamed
+    and lazy downloads are not supported; iter_content, to_file(stream=True) and
+    result(lazy=True) raise NotImplementedError rather than block the event loop.
+    """
+
+    @classmethod
+    async def from_file(cls, path):  # type: (Union[str, IO]) -> AsyncSource  # type: ignore[override]
+        if hasattr(path, 'read'):
+            return await cls._shrink(path.read())
+        else:
+            return await cls._shrink(await asyncio.get_running_loop().run_in_executor(None, _read_file, path))
+
+    @classmethod
+    async def from_buffer(cls, string):  # type: (Union[bytes, bytearray, memoryview]) -> AsyncSource  # type: ignore[override]
+        return await cls._shrink(string)
+
+    @classmethod
+    async def from_url(cls, url):  # type: (str) -> AsyncSource  # type: ignore[override]
+        return await cls._shrink({"source": {"url": url}})
+
+    @classmethod
+    async def _shrink(cls, obj):  # type: (Any) -> AsyncSource  # type: ignore[override]
+        response = await tinify.get_async_client().request('POST', '/shrink', obj)
+        return cls(response.headers['location'])
+
+    async def store(self, timeout=None, **options):  # type: (Optional[float], Any) -> ResultMeta  # type: ignore[override]
+        response = await _within(tinify.get_async_client().request('POST', self.url, self._merge_commands(store=options)), timeout)
+        return ResultMeta(response.headers)
+
+    async def result(self, timeout=None, lazy=False):  # type: (Optional[float], bool) -> Result  # type: ignore[override]
+        if lazy:
+            raise NotImplementedError('AsyncSource does not support lazy results; use Source.result(lazy=True) in a thread')
+        response = await _within(self._request_result(), timeout)
+        return Result(response.headers, response.content)
+
+    def iter_content(self, chunk_size=Source.CHUNK_SIZE, timeout=None):  # type: (int, Optional[float]) -> Iterator[bytes]
+        raise NotImplementedError('AsyncSource does not support streamed downloads; await to_buffer() or result() instead')
+
+    async def to_file(self, path, stream=False, timeout=None):  # type: (Union[str, IO], bool, Optional[float]) -> None  # type: ignore[override]
+        if stream:
+            raise NotImplementedError('AsyncSource does not support streamed downloads; use Source.to_file(stream=True) in a thread')
+        result = await self.result(timeout)
+        if hasattr(path, 'write'):
+            result.to_file(path)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, result.to_file, path)
+
+    async def to_buffer(self, timeout=None):  # type: (Optional[float]) -> bytes  # type: ignore[override]
+        return (await self.result(timeout)).to_buffer()
+
+    async def meta(self, timeout=None):  # type: (Optional[float]) -> ResultMeta  # type: ignore[override]
+        """Fetch the size, dimensions and type of the result. Unlike Source.meta, the body is downloaded too."""
+        response = await _within(self._request_result(), timeout)
+        return ResultMeta(response.headers)
+
+    async def variants(self, variants, concurrency=None):  # type: (Union[Mapping[Any, Dict[str, Any]], Sequence[Dict[str, Any]]], Optional[int]) -> Any  # type: ignore[override]
+        """Fetch several outputs of this source concurrently, like Source.variants."""
+        named = isinstance(variants, Mapping)
+        items = list(variants.items()) if named else list(enumerate(variants))  # type: ignore[union-attr, arg-type]
+
+        unique = dict((json.dumps(commands, sort_keys=True), commands) for _, commands in items)
+        semaphore = asyncio.Semaphore(concurrency or len(unique) or 1)
+
+        async def fetch(commands):  # type: (Dict[str, Any]) -> Result
+            async with semaphore:
+                return await self._derive(**self._merge_commands(**commands)).result()  # type: ignore[misc, no-any-return]
+
+        fetched = await asyncio.gather(*[fetch(commands) for commands in unique.values()])
+        results = dict(zip(unique.keys(), fetched))
+
+        if named:
+            return dict((name, results[json.dumps(commands, sort_keys=True)]) for name, commands in items)
+        return [results[json.dumps(commands, sort_keys=True)] for _, commands in items]
+
+    def _request_result(self, stream=False, deadline=None):  # type: (bool, Optional[float]) -> Any
+        if not self.commands:
+            return tinify.get_async_client().request('GET', self.url, self.commands)
+        else:
+            return tinify.get_async_client().request('POST', self.url, self.commands)
+
+async def _within(awaitable, timeout):  # type: (Awaitable[Any], Optional[float]) -> Any
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise ConnectionError('Deadline exceeded')
+
+def _read_file(path):  # type: (str) -> bytes
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import pickle
+import threading
+import uuid
+import warnings
+
+import tinify
+
+from .context import propagate
+from .errors import ClientError
+from .journal import Journal
+from .source import Source
+from .result import Result, _write_atomic
+from .result_meta import ResultMeta
+from .result_cache import FileCache, cache_key, _cached_meta, _digest
+
+try:
+    from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union, IO
+except ImportError:
+    pass
+
+class BatchItem(object):
+    """Outcome of compressing a single input of a Batch."""
+
+    def __init__(self, index, input, output=None):  # type: (int, Any, Any) -> None
+        self.index = index
+        self.input = input
+        self.output = output
+        self.source = None  # type: Optional[Source]
+        self.result = None  # type: Optional[ResultMeta]
+        self.error = None  # type: Optional[Exception]
+        self.cancelled = False
+        self.resumed = False
+
+    @property
+    def ok(self):  # type: () -> bool
+        return self.result is not None
+
+    def __repr__(self):  # type: () -> str
+        state = 'ok' if self.ok else 'cancelled' if self.cancelled else 'error' if self.error else 'pending'
+        return '<BatchItem {0} {1}>'.format(self.index, state)
+
+class Batch(object):
+    """Compresses many inputs over a bounded pool of worker threads.
+
+    Every worker uploads an input and downloads its result, so with a concurrency of N
+    there are up to N transfers in flight at any time. No more workers are started than
+    the connection pool holds (tinify.pool_maxsize), so every worker keeps its connection. Results are returned in input
+    order and a failing item does not stop the others; its exception is stored on the
+    item instead. Inputs can be paths, file objects, buffers or sources, e.g. lazy
+    sources with their own commands (see tinify.lazy). When no outputs are
+    given the compressed data is kept in memory as a Result on each item.
+
+    With a journal (a Journal or the path of one) progress of path and buffer inputs is
+    recorded, so a run that is interrupted can be started again without redoing outputs
+    that were written, or uploading inputs whose location is still available.
+
+    callback is called with every item as soon as it is finished, from the worker thread
+    that processed it.
+    """
+
+    def __init__(self, inputs, outputs=None, concurrency=4, journal=None, callback=None, **commands):  # type: (Iterable[Any], Optional[Iterable[Any]], int, Union[None, str, Journal], Optional[Callable[[BatchItem], Any]], **Any) -> None
+        inputs = list(inputs)
+        outputs = list(outputs) if outputs is not None else [None] * len(inputs)
+        if len(inputs) != len(outputs):
+            raise ValueError('Expected as many outputs as inputs')
+        if concurrency < 1:
+            raise ValueError('Concurrency must be at least 1')
+
+        self.items = [BatchItem(index, input, output) for index, (input, output) in enumerate(zip(inputs, outputs))]
+        self.concurrency = concurrency
+        self.commands = commands
+        self.callback = callback
+        self._owns_journal = not (journal is None or isinstance(journal, Journal))
+        if journal is None or isinstance(journal, Journal):
+            self.journal = journal  # type: Optional[Journal]
+        else:
+            self.journal = Journal(journal)
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):  # type: () -> bool
+        return self._cancelled.is_set()
+
+    def cancel(self):  # type: () -> None
+        """Stop starting new transfers. Transfers that are already running will finish."""
+        self._cancelled.set()
+
+    def run(self):  # type: () -> List[BatchItem]
+        from concurrent.futures import ThreadPoolExecutor
+
+        process = propagate(self._process)
+        try:
+            workers = min(self.concurrency, tinify.pool_maxsize or tinify.Client.POOL_MAXSIZE)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(process, item) for item in self.items]:
+                    future.result()
+        finally:
+            if self._owns_journal and self.journal is not None:
+                self.journal.close()
+        return self.items
+
+    def _process(self, item):  # type: (BatchItem) -> None
+        output = item.output
+        key = self._compress(item)
+        if self.callback is not None:
+            self.callback(item)
+        # Recorded after the callback, which may move the output or reject it.
+        if key is not None and item.error is None and item.result is not None:
+            self.journal.record_output(key, str(output), _cached_meta(item.result._meta), str(item.output))  # type: ignore[union-attr]
+
+    def _compress(self, item):  # type: (BatchItem) -> Optional[str]
+        # Returns the journal key of the item when a new output file was written.
+        digest = key = None
+        try:
+            if self.cancelled:
+                item.cancelled = True
+                return None
+
+            if self.journal is not None:
+                digest = self._digest(item.input)
+                key = cache_key(digest, self.commands) if digest is not None else None
+                if key is not None and self._resume(item, key):
+                    return None
+
+            location = self.journal.location(digest) if self.journal is not None and digest is not None else None
+            item.source = Source(location) if location else self._source(item.input, digest)  # type: ignore[arg-type]
+            if self.commands:
+                item.source = item.source._derive(**self.commands)
+
+            if self.cancelled:
+                item.cancelled = True
+                return
+
+            # Outputs are streamed to disk instead of being held in memory.
+            lazy = item.output is not None
+            try:
+                result = item.source.result(lazy=lazy)
+            except ClientError:
+                if not location:
+                    raise
+                # The recorded location has expired; upload the input again.
+                item.source = self._source(item.input, digest)._derive(**self.commands)
+                result = item.source.result(lazy=lazy)
+
+            if item.output is None:
+                item.result = result
+            elif hasattr(item.output, 'write'):
+                # Only the metadata is kept, so the streamed data is not kept around either.
+                for chunk in result._stream(Result.CHUNK_SIZE, keep=False):
+                    item.output.write(chunk)
+                item.result = ResultMeta(result._meta)
+            else:
+                # Outputs may replace their input, so never leave a partially written file.
+                _write_atomic(str(item.output), result._stream(Result.CHUNK_SIZE, keep=False))
+                item.result = ResultMeta(result._meta)
+                return key
+        except Exception as err:
+            item.error = err
+            if key is not None:
+                output = None if item.output is None or hasattr(item.output, 'write') else str(item.output)
+                self.journal.record_error(key, output, err)  # type: ignore[union-attr]
+        return None
+
+    def _resume(self, item, key):  # type: (BatchItem, str) -> bool
+        if item.output is None or hasattr(item.output, 'write'):
+            return False
+        meta = self.journal.completed(key, str(item.output))  # type: ignore[union-attr]
+        path = self.journal.written(key, str(item.output))  # type: ignore[union-attr]
+        if meta is None or path is None or not os.path.exists(path):
+            return False
+        item.output = path
+        item.result = ResultMeta(meta)
+        item.resumed = True
+        return True
+
+    def _source(self, input, digest):  # type: (Any, Optional[str]) -> Source
+        source = self._upload(input)
+        if self.journal is not None and digest is not None:
+            # Reading source.url would upload inputs the cache or preflight can answer locally.
+            journal = self.journal
+            if source.pending:
+                source._upload.on_upload = lambda url: journal.record_upload(digest, url)
+            else:
+                journal.record_upload(digest, source.url)
+        return source
+
+    def _digest(self, input):  # type: (Any) -> Optional[str]
+        if isinstance(input, bytes):
+            return _digest([input])
+        if isinstance(input, type('')) or hasattr(input, '__fspath__'):
+            with open(input, 'rb') as f:
+                return _digest(iter(lambda: f.read(Source.CHUNK_SIZE), b''))
+        # File objects, iterators and sources can not be identified without consuming them.
+        return None
+
+    def _upload(self, input):  # type: (Any) -> Source
+        if isinstance(input, Source):
+            return input
+        if isinstance(input, bytes):
+            return Source.from_buffer(input)
+        return Source.from_file(input)
+
+class ProcessBatch(object):
+    """Compresses inputs in worker processes, next to CPU-heavy work on every image.
+
+    Only the API key and settings are sent to the workers, which set up clients of their own.
+    A RateLimiter then limits every worker on its own; use a FileRateLimiter to share one
+    budget. A FileCache is shared, a MemoryCache is not sent. Observers are not sent, nor are
+    a preflight policy or usage thresholds that can not be pickled, which warns. preprocess is called in the worker with every input and returns the path or
+    bytes to compress; postprocess is called with the compressed bytes and returns the
+    bytes to keep. Both must be picklable, e.g. functions defined at module level. Inputs
+    must be paths or bytes.
+    """
+
+    def __init__(self, inputs, outputs=None, processes=None, preprocess=None, postprocess=None, **commands):  # type: (Iterable[Any], Optional[Iterable[Any]], Optional[int], Optional[Callable[[Any], Any]], Optional[Callable[[bytes], bytes]], **Any) -> None
+        inputs = list(inputs)
+        outputs = list(outputs) if outputs is not None else [None] * len(inputs)
+        if len(inputs) != len(outputs):
+            raise ValueError('Expected as many outputs as inputs')
+
+        self.items = [BatchItem(index, input, output) for index, (input, output) in enumerate(zip(inputs, outputs))]
+        self.processes = processes
+        self.preprocess = preprocess
+        self.postprocess = postprocess
+        self.commands = commands
+
+    def run(self):  # type: () -> List[BatchItem]
+        # Imported here, as multiprocessing is slow to import and only needed by this class.
+        from concurrent.futures import ProcessPoolExecutor
+
+        settings = _process_settings()
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            futures = [executor.submit(_compress_in_process, settings, item.input, item.output,
+                self.commands, self.preprocess, self.postprocess) for item in self.items]
+            for item, future in zip(self.items, futures):
+                try:
+                    item.result = future.result()
+                except Exception as err:
+                    item.error = err
+        return self.items
+
+# Settings last applied in this worker process.
+_applied_settings = None  # type: Optional[str]
+
+def _process_settings():  # type: () -> Dict[str, Any]
+    key, app_identifier, proxy = tinify._settings()
+    settings = {
+        'id': uuid.uuid4().hex,
+        'key': key,
+        'keys': list(tinify.keys),
+        'app_identifier': app_identifier,
+        'proxy': proxy,
+        'pool_maxsize': tinify.pool_maxsize,
+        'keep_alive': tinify.keep_alive,
+        'retry_policy': tinify.retry_policy,
+        'timeout': tinify.timeout,
+        'transport': tinify.transport,
+        'pool_block': tinify.pool_block,
+        'lazy': tinify.lazy,
+    }  # type: Dict[str, Any]
+    # Caches in memory are not shared by the workers.
+    if isinstance(tinify.cache, FileCache):
+        settings['cache'] = tinify.cache
+    # These may hold callbacks, e.g. lambdas, that can not be sent to another process.
+    for name in ('rate_limiter', 'preflight', 'usage_thresholds'):
+        value = getattr(tinify, name)
+        if _picklable(value):
+            settings[name] = value
+        else:
+            warnings.warn('tinify.{0} can not be pickled and is not used by worker processes'.format(name), RuntimeWarning)
+    return settings
+
+def _picklable(value):  # type: (Any) -> bool
+    try:
+        pickle.dumps(value)
+    except Exception:
+        return False
+    return True
+
+def _compress_in_process(settings, input, output, commands, preprocess, postprocess):  # type: (Dict[str, Any], Any, Any, Dict[str, Any], Optional[Callable[[Any], Any]], Optional[Callable[[bytes], bytes]]) -> ResultMeta
+    global _applied_settings
+    if _applied_settings != settings['id']:
+        for name, value in settings.items():
+            if name != 'id':
+                setattr(tinify, name, value)
+        _applied_settings = settings['id']
+
+    if preprocess is not None:
+        input = preprocess(input)
+    source = Source.from_buffer(input) if isinstance(input, (bytes, bytearray)) else Source.from_file(input)
+    if commands:
+        source = source._derive(**commands)
+    result = source.result()
+    data = postprocess(result.data) if postprocess is not None else result.data
+
+    if output is None:
+        return Result(result._meta, data)
+    _write_atomic(output, [data])
+    return ResultMeta(result._meta)
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""Compress images from the command line.
+
+    tinify --key KEY --output compressed/ photos/ 'assets/**/*.png'
+    tinify --in-place --resize-method fit --width 1200 --height 1200 photos/
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+
+import tinify
+from .batch import Batch, BatchItem
+
+try:
+    from typing import Any, Dict, IO, Iterator, List, Optional, Sequence, Tuple
+except ImportError:
+    pass
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.avif')
+
+CONVERT_EXTENSIONS = {
+    'image/png': '.png',
+    'image/jpeg': '.jpg',
+    'image/webp': '.webp',
+    'image/avif': '.avif',
+}
+
+EXTENSION_TYPES = dict((extension, type) for type, extension in CONVERT_EXTENSIONS.items())
+EXTENSION_TYPES['.jpeg'] = 'image/jpeg'
+
+def main(argv=None):  # type: (Optional[Sequence[str]]) -> int
+    parser = _parser()
+    args = parser.parse_args(argv)
+
+    key = args.key or os.environ.get('TINIFY_KEY')
+    if not key:
+        parser.error('provide an API key with --key or the TINIFY_KEY environment variable')
+    if bool(args.output) == bool(args.in_place):
+        parser.error('choose either --output DIR or --in-place')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    if args.skip_unchanged and args.in_place:
+        parser.error('--skip-unchanged compares outputs with their inputs and requires --output')
+    if not args.resize_method and args.width is not None and args.height is not None:
+        parser.error('--width together with --height requires --resize-method')
+
+    tinify.key = key
+    if args.proxy:
+        tinify.proxy = args.proxy
+    tinify.pool_maxsize = max(args.concurrency, tinify.Client.POOL_MAXSIZE)
+
+    commands = _commands(args)
+    pairs = []  # type: List[Tuple[str, str]]
+    skipped = 0
+    for path, relative in collect(args.paths):
+        if args.in_place:
+            output = _output_path(os.path.dirname(path), os.path.basename(path), commands)
+        else:
+            output = _output_path(args.output, relative, commands)
+        if args.skip_unchanged and _unchanged(path, output):
+            skipped += 1
+            continue
+        pairs.append((path, output))
+
+    for _, output in pairs:
+        directory = os.path.dirname(output)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    # With several convert types the extension is only known once the API picked one, so
+    # outputs are written to a temporary file and renamed after the result's content type.
+    typed = len(_convert_types(commands)) > 1
+    progress = Progress(len(pairs), sys.stderr, enabled=not args.quiet and sys.stderr.isatty())
+    sizes = dict((path, os.path.getsize(path)) for path, _ in pairs)
+
+    def finish(item):  # type: (BatchItem) -> None
+        # Resumed items were renamed in the run that wrote them.
+        if typed and item.error is None and not item.resumed:
+            _rename_typed(item, args.in_place)
+        progress.update(item, sizes[item.input])
+
+    outputs = [output + '.tinify.tmp' if typed else output for _, output in pairs]
+    batch = Batch([path for path, _ in pairs], outputs, args.concurrency,
+        journal=args.journal, callback=finish, **commands)
+    items = batch.run()
+    progress.finish()
+
+    for item in items:
+        if item.error is not None:
+            print('{0}: {1}'.format(item.input, item.error), file=sys.stderr)
+    if not args.quiet:
+        print(progress.summary(skipped), file=sys.stderr)
+    return 1 if any(item.error is not None for item in items) else 0
+
+def collect(paths):  # type: (Sequence[str]) -> Iterator[Tuple[str, str]]
+    """Yield every image in the given files, directories and globs, with its path
+    relative to the directory or glob it was found in."""
+    seen = set()
+    for arg in paths:
+        if os.path.isdir(arg):
+            found = [(path, os.path.relpath(path, arg)) for path in _walk(arg)]
+        elif os.path.isfile(arg):
+            found = [(arg, os.path.basename(arg))]
+        else:
+            root = _glob_root(arg)
+            matches = glob.glob(arg, recursive=True) if sys.version_info >= (3, 5) else glob.glob(arg)  # type: ignore[call-arg]
+            found = [(path, os.path.relpath(path, root)) for path in sorted(matches)
+                if os.path.isfile(path) and path.lower().endswith(EXTENSIONS)]
+
+        for path, relative in found:
+            real = os.path.realpath(path)
+            if real not in seen:
+                seen.add(real)
+                yield path, relative
+
+class Progress(object):
+    """Progress bar and throughput counters, updated from the batch worker threads."""
+
+    WIDTH = 30
+
+    def __init__(self, total, stream, enabled=True):  # type: (int, IO[str], bool) -> None
+        self.total = total
+        self.stream = stream
+        self.enabled = enabled
+        self.done = 0
+        self.failed = 0
+        self.resumed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def update(self, item, size):  # type: (BatchItem, int) -> None
+        with self._lock:
+            self.done += 1
+            if item.error is not None:
+                self.failed += 1
+            elif item.resumed:
+                self.resumed += 1
+            else:
+                self.bytes_in += size
+                self.bytes_out += os.path.getsize(item.output)
+            if self.enabled:
+                self._draw()
+
+    def finish(self):  # type: () -> None
+        if self.enabled and self.total:
+            self.stream.write('\n')
+            self.stream.flush()
+
+    def summary(self, skipped=0):  # type: (int) -> str
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        compressed = self.done - self.failed - self.resumed
+        saved = 100.0 * (1 - self.bytes_out / self.bytes_in) if self.bytes_in else 0.0
+        return ('{0} compressed, {1} unchanged, {2} failed in {3:.1f}s ({4:.1f} files/s, {5}/s); '
+            '{6} -> {7} ({8:.1f}% saved)').format(
+            compressed, skipped + self.resumed, self.failed, elapsed, compressed / elapsed,
+            _format_size(self.bytes_in / elapsed), _format_size(self.bytes_in), _format_size(self.bytes_out), saved)
+
+    def _draw(self):  # type: () -> None
+        filled = self.WIDTH * self.done // self.total if self.total else self.WIDTH
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        self.stream.write('\r[{0}{1}] {2}/{3} {4}/s'.format(
+            '#' * filled, ' ' * (self.WIDTH - filled), self.done, self.total, _format_size(self.bytes_in / elapsed)))
+        self.stream.flush()
+
+def _parser():  # type: () -> argparse.ArgumentParser
+    parser = argparse.ArgumentParser(prog='tinify', description='Compress images with the Tinify API.')
+    parser.add_argument('paths', nargs='+', metavar='PATH', help='image files, directories or glob patterns')
+    parser.add_argument('--key', help='API key (default: TINIFY_KEY environment variable)')
+    parser.add_argument('--proxy', help='HTTPS proxy URL')
+    parser.add_argument('-j', '--concurrency', type=int, default=4, help='number of concurrent compressions (default: 4)')
+
+    target = parser.add_argument_group('output')
+    target.add_argument('-o', '--output', metavar='DIR', help='write outputs to DIR, mirroring the input tree')
+    target.add_argument('--in-place', action='store_true', help='replace inputs with their compressed version')
+    target.add_argument('--skip-unchanged', action='store_true', help='skip inputs whose output is newer than the input')
+    target.add_argument('--journal', metavar='FILE', help='record progress in FILE to resume an interrupted run')
+
+    commands = parser.add_argument_group('commands')
+    commands.add_argument('--resize-method', choices=('scale', 'fit', 'cover', 'thumb'),
+        help='resize the images (default: scale, when only --width or --height is given)')
+    commands.add_argument('--width', type=int, help='target width when resizing')
+    commands.add_argument('--height', type=int, help='target height when resizing')
+    commands.add_argument('--convert', metavar='TYPE', action='append',
+        help='convert to a media type, e.g. image/webp; repeat to let the API pick the smallest')
+    commands.add_argument('--background', help='background color when converting to a format without transparency')
+    commands.add_argument('--preserve', action='append', choices=('copyright', 'creation', 'location'),
+        help='metadata to preserve; can be repeated')
+
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not show progress or a summary')
+    return parser
+
+def _commands(args):  # type: (argparse.Namespace) -> Dict[str, Any]
+    commands = {}  # type: Dict[str, Any]
+    # A single dimension scales the image proportionally.
+    method = args.resize_method or ('scale' if args.width is not None or args.height is not None else None)
+    if method:
+        commands['resize'] = dict((name, value) for name, value in
+            (('method', method), ('width', args.width), ('height', args.height)) if value is not None)
+    if args.convert:
+        commands['convert'] = {'type': args.convert[0] if len(args.convert) == 1 else args.convert}
+    if args.background:
+        commands['transform'] = {'background': args.background}
+    if args.preserve:
+        commands['preserve'] = args.preserve
+    return commands
+
+def _output_path(directory, relative, commands):  # type: (str, str, Dict[str, Any]) -> str
+    output = os.path.join(directory, relative)
+    types = _convert_types(commands)
+    extension = CONVERT_EXTENSIONS.get(types[0]) if len(types) == 1 else None
+    if extension:
+        output = os.path.splitext(output)[0] + extension
+    return output
+
+def _convert_types(commands):  # type: (Dict[str, Any]) -> List[str]
+    types = commands.get('convert', {}).get('type', [])
+    return [types] if isinstance(types, type('')) else list(types)
+
+def _rename_typed(item, in_place):  # type: (BatchItem, bool) -> None
+    temporary = str(item.output)
+    output = temporary[:-len('.tinify.tmp')]
+    media_type = (item.result._meta.get('Content-Type') or '').split(';')[0].strip()  # type: ignore[union-attr]
+    extension = CONVERT_EXTENSIONS.get(media_type)
+    if extension:
+        output = os.path.splitext(output)[0] + extension
+    if in_place and os.path.abspath(output) == os.path.abspath(item.input) and \
+            EXTENSION_TYPES.get(os.path.splitext(output)[1].lower()) != media_type:
+        os.unlink(temporary)
+        item.error = ValueError('refusing to overwrite the input with {0} data'.format(media_type))
+        return
+    getattr(os, 'replace', os.rename)(temporary, output)
+    item.output = output
+
+def _unchanged(path, output):  # type: (str, str) -> bool
+    return os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(path)
+
+def _walk(directory):  # type: (str) -> Iterator[str]
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(EXTENSIONS):
+                yield os.path.join(root, name)
+
+def _glob_root(pattern):  # type: (str) -> str
+    parts = []  # type: List[str]
+    for part in pattern.replace(os.sep, '/').split('/'):
+        if glob.has_magic(part):  # type: ignore[attr-defined]
+            break
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+def _format_size(size):  # type: (float) -> str
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return '{0:.1f} {1}'.format(size, unit) if unit != 'B' else '{0:d} B'.format(int(size))
+        size /= 1024.0
+    return ''
+
+if __name__ == '__main__':
+    sys.exit(main())
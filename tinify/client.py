@@ -3,38 +3,126 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import sys
 import os
-import platform
-import requests
-import requests.exceptions
-from requests.compat import json # type: ignore
-import traceback
+import functools
+import json
+import threading
 import time
 
 import tinify
 from .errors import ConnectionError, Error
+from .retry import RetryPolicy
+from .limiter import RateLimiter
+from .instrumentation import RequestEvent, body_size, endpoint_kind, notify, request_event
+from .transports import Transport, RequestsTransport
 
 try:
-    from typing import Any, Optional
+    from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 except ImportError:
     pass
 
+class _lazy_constant(object):
+    """Class attribute computed on first access and then stored on the class."""
+
+    def __init__(self, fn):  # type: (Callable[[], Any]) -> None
+        self.fn = fn
+        self.name = fn.__name__
+
+    def __get__(self, instance, owner):  # type: (Any, Any) -> Any
+        value = self.fn()
+        setattr(owner, self.name, value)
+        return value
+
+class Usage(object):
+    """Compressions made with one API key this month, as reported by the API.
+
+    thresholds is a list of (count, callback) pairs. A callback is called with the client,
+    the threshold and the current count when a response moves the count to or past the
+    threshold.
+    """
+
+    def __init__(self, key, thresholds=None):  # type: (str, Optional[List[Tuple[int, Callable[[Any, int, int], Any]]]]) -> None
+        self.key = key
+        self.thresholds = thresholds if thresholds is not None else []
+        self.count = None  # type: Optional[int]
+        self.updated_at = None  # type: Optional[float]
+        self._lock = threading.Lock()
+
+    def update(self, response, client):  # type: (Any, Any) -> None
+        value = response.headers.get('compression-count')
+        if not value:
+            return
+        count = int(value)
+        with self._lock:
+            previous = self.count
+            self.count = count
+            self.updated_at = time.time()
+        tinify._record_compression_count(self.key, count)
+
+        for threshold, callback in self.thresholds:
+            if (previous is None or previous < threshold) and count >= threshold:
+                callback(client, threshold, count)
+
 class Client(object):
     API_ENDPOINT = 'https://api.tinify.com'
 
     RETRY_COUNT = 1
     RETRY_DELAY = 500
+    RETRY_MAX_ELAPSED = 60000
+
+    # Resolved on first use, so importing tinify does not probe the platform or the file system.
+    @_lazy_constant
+    def USER_AGENT():  # type: () -> str
+        import platform
+        return 'Tinify/{0} Python/{1} ({2})'.format(tinify.__version__, platform.python_version(), platform.python_implementation())
+
+    @_lazy_constant
+    def CA_BUNDLE():  # type: () -> str
+        return os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cacert.pem')
+
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+
+    # Seconds to wait for a connection, and between bytes received from the server.
+    CONNECT_TIMEOUT = 10.0
+    READ_TIMEOUT = 120.0
 
-    USER_AGENT = 'Tinify/{0} Python/{1} ({2})'.format(tinify.__version__, platform.python_version(), platform.python_implementation())
+    def __init__(self, key, app_identifier=None, proxy=None, pool_connections=None, pool_maxsize=None, pool_block=False, keep_alive=True, retry_policy=None, rate_limiter=None, timeout=None, observers=None, usage_thresholds=None, transport=None):  # type: (str, Optional[str], Optional[str], Optional[int], Optional[int], bool, bool, Optional[RetryPolicy], Optional[RateLimiter], Union[None, float, Tuple[float, float]], Optional[List[Callable[[RequestEvent], Any]]], Optional[List[Tuple[int, Callable[[Any, int, int], Any]]]], Optional[Callable[..., Transport]]) -> None
+        self.timeout = _timeouts(timeout, self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.observers = observers if observers is not None else []
+        self.usage = Usage(key, usage_thresholds)
+        self._key = key
+        self._user_agent = self.USER_AGENT + ' ' + app_identifier if app_identifier else self.USER_AGENT
+        self._proxy = proxy
+        self._pool_connections = pool_connections or self.POOL_CONNECTIONS
+        self._pool_maxsize = pool_maxsize or self.POOL_MAXSIZE
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._transport_factory = transport or RequestsTransport
+        self._connect()
 
-    def __init__(self, key, app_identifier=None, proxy=None):  # type: (str, Optional[str], Optional[str]) -> None
-        self.session = requests.sessions.Session()
-        if proxy:
-            self.session.proxies = {'https': proxy}
-        self.session.auth = ('api', key)
-        self.session.headers = {
-            'user-agent': self.USER_AGENT + ' ' + app_identifier if app_identifier else self.USER_AGENT,
-        }
-        self.session.verify = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cacert.pem')
+    def _connect(self):  # type: () -> None
+        # Remember the process that owns the connections; a forked child must not share them.
+        self._pid = os.getpid()
+        self.transport = self._transport_factory(('api', self._key), {'user-agent': self._user_agent},
+            proxy=self._proxy,
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block,
+            keep_alive=self._keep_alive,
+            verify=self.CA_BUNDLE,
+        )  # type: Transport
+
+    @property
+    def session(self):  # type: () -> Any
+        """The requests session of the default transport."""
+        return self.transport.session  # type: ignore[attr-defined]
+
+    @property
+    def adapter(self):  # type: () -> Any
+        """The requests adapter of the default transport, holding its connection pools."""
+        return self.transport.adapter  # type: ignore[attr-defined]
 
     def __enter__(self):  # type: () -> Client
         return self
@@ -44,44 +132,199 @@ class Client(object):
         return None
 
     def close(self):  # type: () -> None
-        self.session.close()
-
-    def request(self, method, url, body=None):  # type: (str, str, Any) -> requests.Response
-        url = url if url.lower().startswith('https://') else self.API_ENDPOINT + url
-        params = {}  # type: dict[str, Any]
-        if isinstance(body, dict):
-            if body:
-                # Dump without whitespace.
-                params['headers'] = {'Content-Type': 'application/json'}
-                params['data'] = json.dumps(body, separators=(',', ':'))
-        elif body:
-            params['data'] = body
-
-        for retries in range(self.RETRY_COUNT, -1, -1):
-            if retries < self.RETRY_COUNT: time.sleep(self.RETRY_DELAY / 1000.0)
+        self.transport.close()
+
+    @property
+    def compression_count(self):  # type: () -> Optional[int]
+        return self.usage.count
+
+    @property
+    def compression_count_updated_at(self):  # type: () -> Optional[float]
+        return self.usage.updated_at
+
+    def pool_stats(self):  # type: () -> List[Dict[str, Any]]
+        """Report usage of the connection pool of every host this client connected to."""
+        return self.transport.pool_stats()
+
+    def request(self, method, url, body=None, stream=False, deadline=None):  # type: (str, str, Any, bool, Optional[float]) -> Any
+        """Issue a request, retrying according to the retry policy.
 
+        deadline is an absolute time.time() by which the request must be done. Every attempt
+        and every wait before a retry is bounded by the time that remains.
+        """
+        if self._pid != os.getpid():
+            # This process was forked; pooled sockets belong to the parent.
+            self._connect()
+
+        endpoint = endpoint_kind(url, body)
+        url, headers, data = _prepare_request(self.API_ENDPOINT, url, body)
+
+        policy = self.retry_policy or _default_policy(self)
+        # Streamed bodies can only be sent again if they can be rewound.
+        position = _stream_position(data)
+        replayable = position is not None or not _is_stream(data)
+        bytes_sent = body_size(data) if self.observers else None
+        start = time.time()
+        attempt = 0
+        backoff = 0.0
+
+        while True:
+            attempt += 1
+            remaining = _remaining(deadline)
+            started = time.time()
+            limiter = self.rate_limiter
+            if limiter is not None and not limiter.acquire(remaining):
+                raise ConnectionError('Deadline exceeded while waiting for rate limiter')
+            requested = time.time()
+            response = None  # type: Any
+            streaming = False
             try:
-                response = self.session.request(method, url, **params)
-            except requests.exceptions.Timeout as err:
-                if retries > 0: continue
-                raise ConnectionError('Timeout while connecting', cause=err)
+                response = self.transport.request(method, url, headers=headers, data=data, stream=stream,
+                    timeout=_bounded(self.timeout, _remaining(deadline)))
             except Exception as err:
-                if retries > 0: continue
-                raise ConnectionError('Error while connecting: {0}'.format(err), cause=err)
+                if self.transport.is_timeout(err):
+                    error = ConnectionError('Timeout while connecting', cause=err)  # type: Optional[Error]
+                else:
+                    error = ConnectionError('Error while connecting: {0}'.format(err), cause=err)
+                delay = policy.retry_delay(attempt, time.time() - start)
+            else:
+                self.usage.update(response, self)
 
-            count = response.headers.get('compression-count')
-            if count:
-                tinify.compression_count = int(count)
+                if response.ok:
+                    error = None
+                    streaming = stream
+                else:
+                    error = _error_from_response(response)
+                    delay = policy.retry_delay(attempt, time.time() - start, response.status_code, response.headers)
+            finally:
+                # A streamed download keeps its slot until the body has been read.
+                if limiter is not None and not streaming:
+                    limiter.release()
 
-            if response.ok:
+            if streaming and (limiter is not None or self.observers):
+                # The body is yet to be read; report the attempt once it has been.
+                report = functools.partial(request_event, method, url, endpoint, attempt, started, requested, backoff, bytes_sent, stream, response, error)
+                return _StreamedResponse(response, functools.partial(self._finish_stream, limiter, report))
+            if self.observers:
+                notify(self.observers, request_event(method, url, endpoint, attempt, started, requested, backoff, bytes_sent, stream, response, error))
+
+            if error is None:
                 return response
+            if delay is None or not replayable:
+                raise error
+            if deadline is not None and time.time() + delay >= deadline:
+                raise error
 
-            details = None
-            try:
-                details = response.json()
-            except Exception as err:
-                details = {'message': 'Error while parsing response: {0}'.format(err), 'error': 'ParseError'}
-            if retries > 0 and response.status_code >= 500: continue
-            raise Error.create(details.get('message'), details.get('error'), response.status_code)
+            time.sleep(delay)
+            backoff = delay
+            if position is not None: data.seek(position)
+
+    def _finish_stream(self, limiter, report, received):  # type: (Optional[RateLimiter], Callable[..., RequestEvent], int) -> None
+        if limiter is not None:
+            limiter.release()
+        if self.observers:
+            notify(self.observers, report(received=received))
+
+class _StreamedResponse(object):
+    """A streamed response that calls done with the number of bytes received, once its body
+    has been read to the end or it is closed. Until then it holds a slot of the rate limiter."""
+
+    def __init__(self, response, done):  # type: (Any, Callable[[int], Any]) -> None
+        self._response = response
+        self._done = done  # type: Optional[Callable[[int], Any]]
+        self._received = 0
+
+    def __getattr__(self, name):  # type: (str) -> Any
+        return getattr(self._response, name)
+
+    @property
+    def content(self):  # type: () -> bytes
+        content = self._response.content
+        self._received = len(content)
+        self._finish()
+        return content
+
+    def iter_content(self, chunk_size=1):  # type: (int) -> Iterator[bytes]
+        try:
+            for chunk in self._response.iter_content(chunk_size):
+                self._received += len(chunk)
+                yield chunk
+        finally:
+            self._finish()
+
+    def close(self):  # type: () -> None
+        try:
+            self._response.close()
+        finally:
+            self._finish()
+
+    def _finish(self):  # type: () -> None
+        done, self._done = self._done, None
+        if done is not None:
+            done(self._received)
+
+    def __del__(self):  # type: () -> None
+        self._finish()
+
+def _default_policy(client):  # type: (Any) -> RetryPolicy
+    # A rate limit can ask for a long wait; never block longer than RETRY_MAX_ELAPSED on it.
+    return RetryPolicy(retries=client.RETRY_COUNT, delay=client.RETRY_DELAY / 1000.0, backoff=1.0,
+        jitter=False, max_elapsed=client.RETRY_MAX_ELAPSED / 1000.0)
+
+def _timeouts(timeout, connect, read):  # type: (Union[None, float, Tuple[float, float]], float, float) -> Tuple[float, float]
+    if timeout is None:
+        return (connect, read)
+    if isinstance(timeout, tuple):
+        return timeout
+    return (timeout, timeout)
+
+def _remaining(deadline):  # type: (Optional[float]) -> Optional[float]
+    if deadline is None:
+        return None
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise ConnectionError('Deadline exceeded')
+    return remaining
+
+def _bounded(timeout, remaining):  # type: (Tuple[float, float], Optional[float]) -> Tuple[float, float]
+    if remaining is None:
+        return timeout
+    return (min(timeout[0], remaining), min(timeout[1], remaining))
+
+def _prepare_request(endpoint, url, body):  # type: (str, str, Any) -> Tuple[str, Optional[dict[str, str]], Any]
+    url = url if url.lower().startswith('https://') else endpoint + url
+    if isinstance(body, dict):
+        if body:
+            # Dump without whitespace.
+            return url, {'Content-Type': 'application/json'}, json.dumps(body, separators=(',', ':'))
+    elif body:
+        return url, None, _buffer(body)
+    return url, None, None
+
+def _buffer(data):  # type: (Any) -> Any
+    # Bytes-like objects are handed to the socket as they are, without a copy. Views of
+    # multi-byte or multi-dimensional items are cast so their length is counted in bytes.
+    if isinstance(data, memoryview) and (data.ndim != 1 or data.itemsize != 1):
+        if data.c_contiguous and hasattr(data, 'cast'):
+            return data.cast('B')
+        return data.tobytes()
+    return data
+
+def _is_stream(data):  # type: (Any) -> bool
+    return hasattr(data, 'read') or hasattr(data, '__next__') or hasattr(data, 'next')
+
+def _stream_position(data):  # type: (Any) -> Optional[int]
+    if not hasattr(data, 'read'):
+        return None
+    try:
+        return data.tell()
+    except Exception:
+        return None
 
-        raise Error.create("Received no response", "ConnectionError", 0)
\ No newline at end of file
+def _error_from_response(response):  # type: (Any) -> Error
+    details = None
+    try:
+        details = response.json()
+    except Exception as err:
+        details = {'message': 'Error while parsing response: {0}'.format(err), 'error': 'ParseError'}
+    return Error.create(details.get('message'), details.get('error'), response.status_code)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import itertools
+import threading
+import time
+
+from .errors import AccountError
+from .client import Client, _is_stream, _stream_position
+
+try:
+    from typing import Any, Dict, Iterable, List, Optional
+except ImportError:
+    pass
+
+class ClientPool(object):
+    """Spread requests over clients for several API keys.
+
+    With the 'quota' strategy new compressions go to the client that has used the fewest
+    compressions this month, as reported by the compression-count header. With the
+    'round_robin' strategy clients take turns. A client that fails with an account error
+    (HTTP 401 or 429) is taken out of rotation for cooldown seconds and the request is sent
+    with the next client.
+
+    Compressed images can only be fetched with the key that created them, so requests to a
+    location returned by the API are always sent with the client it came from.
+    """
+
+    STRATEGIES = ('quota', 'round_robin')
+
+    # Locations remembered to route follow-up requests to the client that owns them.
+    MAX_LOCATIONS = 10000
+
+    def __init__(self, clients, strategy='quota', cooldown=60.0):  # type: (Iterable[Client], str, float) -> None
+        self.clients = list(clients)
+        if not self.clients:
+            raise ValueError('A client pool needs at least one client')
+        if strategy not in self.STRATEGIES:
+            raise ValueError('Unknown strategy: {0}'.format(strategy))
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+        self._cooling = {}  # type: Dict[int, float]
+        self._owners = collections.OrderedDict()  # type: collections.OrderedDict[str, Client]
+
+    @classmethod
+    def from_keys(cls, keys, strategy='quota', cooldown=60.0, **options):  # type: (Iterable[str], str, float, **Any) -> ClientPool
+        """Create a pool with one client per key, passing options on to every client."""
+        return cls([Client(key, **options) for key in keys], strategy, cooldown)
+
+    def __enter__(self):  # type: () -> ClientPool
+        return self
+
+    def __exit__(self, *args):  # type: (*Any) -> None
+        self.close()
+        return None
+
+    def close(self):  # type: () -> None
+        for client in self.clients:
+            client.close()
+
+    @property
+    def compression_count(self):  # type: () -> Optional[int]
+        counts = [client.compression_count for client in self.clients if client.compression_count is not None]
+        return sum(counts) if counts else None
+
+    def pool_stats(self):  # type: () -> List[Dict[str, Any]]
+        """Report usage of the connection pools of every client, as Client.pool_stats() does."""
+        return [stats for client in self.clients for stats in client.pool_stats()]
+
+    def available(self):  # type: () -> List[Client]
+        """Return the clients that are currently in rotation."""
+        now = time.time()
+        with self._lock:
+            return [client for client in self.clients if self._cooling.get(id(client), 0) <= now]
+
+    def request(self, method, url, body=None, stream=False, deadline=None):  # type: (str, str, Any, bool, Optional[float]) -> Any
+        owner = self._owner(url)
+        if owner is not None:
+            return owner.request(method, url, body, stream=stream, deadline=deadline)
+
+        position = _stream_position(body)
+        tried = []  # type: List[Client]
+        while True:
+            client = self._select(tried)
+            tried.append(client)
+            try:
+                response = client.request(method, url, body, stream=stream, deadline=deadline)
+            except AccountError as err:
+                if err.status not in (401, 429):
+                    raise
+                self._cool_down(client)
+                if len(tried) == len(self.clients) or (_is_stream(body) and position is None):
+                    raise
+                if position is not None:
+                    body.seek(position)
+                continue
+
+            location = response.headers.get('location')
+            if location and url.endswith('/shrink'):
+                self._remember(location, client)
+            return response
+
+    def _select(self, tried):  # type: (List[Client]) -> Client
+        now = time.time()
+        with self._lock:
+            candidates = [client for client in self.clients if client not in tried]
+            ready = [client for client in candidates if self._cooling.get(id(client), 0) <= now]
+            if not ready:
+                # Every key is cooling down; try the one that has been resting the longest.
+                return min(candidates, key=lambda client: self._cooling.get(id(client), 0))
+
+            if self.strategy == 'round_robin':
+                start = next(self._turn)
+                ordered = self.clients[start % len(self.clients):] + self.clients[:start % len(self.clients)]
+                return next(client for client in ordered if client in ready)
+
+            return min(ready, key=lambda client: client.compression_count or 0)
+
+    def _cool_down(self, client):  # type: (Client) -> None
+        with self._lock:
+            self._cooling[id(client)] = time.time() + self.cooldown
+
+    def _remember(self, location, client):  # type: (str, Client) -> None
+        with self._lock:
+            self._owners[location] = client
+            while len(self._owners) > self.MAX_LOCATIONS:
+                self._owners.popitem(last=False)
+
+    def _owner(self, url):  # type: (str) -> Optional[Client]
+        with self._lock:
+            return self._owners.get(url)
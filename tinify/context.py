@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import contextlib
+import threading
+
+try:
+    import contextvars
+except ImportError:
+    contextvars = None  # type: ignore
+
+try:
+    from typing import Any, Callable, Dict, Iterator
+except ImportError:
+    pass
+
+class _LocalVar(object):
+    """Thread-local stand-in for contextvars.ContextVar on Python 2."""
+
+    def __init__(self, name, default):  # type: (str, Any) -> None
+        self.name = name
+        self._default = default
+        self._local = threading.local()
+
+    def get(self):  # type: () -> Any
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):  # type: (Any) -> Any
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):  # type: (Any) -> None
+        self._local.value = token
+
+if contextvars is not None:
+    _settings = contextvars.ContextVar('tinify_settings', default={})  # type: Any
+else:
+    _settings = _LocalVar('tinify_settings', {})
+
+def current():  # type: () -> Dict[str, Any]
+    """Return the settings overridden in the current context."""
+    return _settings.get()
+
+@contextlib.contextmanager
+def using(**settings):  # type: (**Any) -> Iterator[Dict[str, Any]]
+    """Override settings until the block exits, in this thread or asyncio task only."""
+    merged = dict(current())
+    merged.update((name, value) for name, value in settings.items() if value is not None)
+    token = _settings.set(merged)
+    try:
+        yield merged
+    finally:
+        _settings.reset(token)
+
+def propagate(fn):  # type: (Callable[..., Any]) -> Callable[..., Any]
+    """Wrap fn to run with the settings of the calling context, e.g. in a worker thread."""
+    settings = current()
+
+    def wrapper(*args, **kwargs):  # type: (*Any, **Any) -> Any
+        token = _settings.set(settings)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _settings.reset(token)
+    return wrapper
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import struct
+
+from .errors import ClientError
+
+try:
+    from typing import Any, Callable, Optional, Set, Tuple
+except ImportError:
+    pass
+
+class ImageInfo(object):
+    """Format, dimensions and size of an image, read from its first bytes."""
+
+    def __init__(self, format, width=None, height=None, size=None):  # type: (str, Optional[int], Optional[int], Optional[int]) -> None
+        self.format = format
+        self.width = width
+        self.height = height
+        self.size = size
+
+    @property
+    def content_type(self):  # type: () -> str
+        return 'image/' + self.format
+
+    def __repr__(self):  # type: () -> str
+        return '<ImageInfo {0} {1}x{2} {3} bytes>'.format(self.format, self.width, self.height, self.size)
+
+class Preflight(object):
+    """Inspects inputs locally before they are uploaded.
+
+    Inputs that are empty or not in a supported format raise a ClientError without a
+    request being made. Inputs smaller than min_size bytes, or for which policy(info)
+    returns True, are skipped: their result is the input itself, unless commands such as
+    resize or convert were applied.
+    """
+
+    HEADER_SIZE = 64 * 1024
+
+    def __init__(self, min_size=None, policy=None):  # type: (Optional[int], Optional[Callable[[ImageInfo], Any]]) -> None
+        self.min_size = min_size
+        self.policy = policy
+
+    def inspect(self, header, size=None):  # type: (bytes, Optional[int]) -> ImageInfo
+        if not header or size == 0:
+            raise ClientError('Input is empty', 'Empty')
+        info = inspect_image(header, size)
+        if info is None:
+            raise ClientError('File type is not supported', 'Unsupported')
+        return info
+
+    def skip(self, info):  # type: (ImageInfo) -> bool
+        if self.min_size is not None and info.size is not None and info.size < self.min_size:
+            return True
+        return bool(self.policy and self.policy(info))
+
+def inspect_image(header, size=None):  # type: (bytes, Optional[int]) -> Optional[ImageInfo]
+    """Identify a PNG, JPEG, WebP or AVIF image from its first bytes, or return None."""
+    if header.startswith(b'\x89PNG\r\n\x1a\n'):
+        if header[12:16] != b'IHDR' or len(header) < 24:
+            return None
+        width, height = struct.unpack('>II', header[16:24])
+        return ImageInfo('png', width, height, size)
+
+    if header.startswith(b'\xff\xd8\xff'):
+        return ImageInfo('jpeg', *_jpeg_dimensions(header), size=size)
+
+    if header[0:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return ImageInfo('webp', *_webp_dimensions(header), size=size)
+
+    if header[4:8] == b'ftyp' and _ftyp_brands(header) & set([b'avif', b'avis']):
+        return ImageInfo('avif', *_avif_dimensions(header), size=size)
+
+    return None
+
+# Start of frame markers, which hold the dimensions. 0xc4, 0xc8 and 0xcc are not frames.
+_JPEG_FRAMES = set(range(0xc0, 0xd0)) - set([0xc4, 0xc8, 0xcc])
+
+def _jpeg_dimensions(header):  # type: (bytes) -> Tuple[Optional[int], Optional[int]]
+    offset = 2
+    while offset + 9 <= len(header):
+        if header[offset:offset + 1] != b'\xff':
+            break
+        marker = bytearray(header[offset + 1:offset + 2])[0]
+        if marker == 0xff:
+            offset += 1
+            continue
+        if marker in _JPEG_FRAMES:
+            height, width = struct.unpack('>HH', header[offset + 5:offset + 9])
+            return width, height
+        length, = struct.unpack('>H', header[offset + 2:offset + 4])
+        offset += 2 + length
+    return None, None
+
+def _webp_dimensions(header):  # type: (bytes) -> Tuple[Optional[int], Optional[int]]
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits, = struct.unpack('<I', header[21:25])
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b'VP8X' and len(header) >= 30:
+        width = bytearray(header[24:27])
+        height = bytearray(header[27:30])
+        return (width[0] | width[1] << 8 | width[2] << 16) + 1, (height[0] | height[1] << 8 | height[2] << 16) + 1
+    return None, None
+
+def _ftyp_brands(header):  # type: (bytes) -> Set[bytes]
+    # The major brand, followed by the minor version and the compatible brands. Files that use
+    # a generic major brand such as mif1 list avif among the compatible brands.
+    size = min(struct.unpack('>I', header[0:4])[0], len(header))
+    brands = set([header[8:12]])
+    for offset in range(16, size - 3, 4):
+        brands.add(header[offset:offset + 4])
+    return brands
+
+def _avif_dimensions(header):  # type: (bytes) -> Tuple[Optional[int], Optional[int]]
+    # The image spatial extents property box holds the dimensions of the primary image.
+    offset = header.find(b'ispe')
+    if offset < 0 or offset + 16 > len(header):
+        return None, None
+    width, height = struct.unpack('>II', header[offset + 8:offset + 16])
+    return width, height
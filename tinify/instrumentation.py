@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import time
+import warnings
+
+try:
+    from typing import Any, Callable, Dict, Iterable, Optional
+except ImportError:
+    pass
+
+class RequestEvent(object):
+    """Describes one attempt of a request made by a client, passed to every observer.
+
+    endpoint is 'shrink' for uploads, 'store' for storing results, 'output' for downloading
+    results, or 'other'. timings holds durations in seconds: 'limiter' (waiting for the rate
+    limiter), 'backoff' (sleeping before this retry), 'response' (sending the request until
+    the response headers arrived, which includes connecting, uploading and processing),
+    'download' (reading the response body) and 'total' (the attempt itself). Connection setup
+    is not reported separately because the HTTP stack does not expose it. The event of a
+    streamed download is passed on once its body has been read or the response is closed.
+    """
+
+    def __init__(self, method, url, endpoint, attempt, started_at, timings, status=None, bytes_sent=None, bytes_received=None, compression_count=None, error=None):  # type: (str, str, str, int, float, Dict[str, float], Optional[int], Optional[int], Optional[int], Optional[int], Optional[Exception]) -> None
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.attempt = attempt
+        self.started_at = started_at
+        self.timings = timings
+        self.status = status
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.compression_count = compression_count
+        self.error = error
+
+    @property
+    def ok(self):  # type: () -> bool
+        return self.error is None
+
+    def __repr__(self):  # type: () -> str
+        return '<RequestEvent {0} {1} attempt={2} status={3} total={4:.3f}s>'.format(
+            self.method, self.endpoint, self.attempt, self.status, self.timings.get('total', 0.0))
+
+class PrometheusObserver(object):
+    """Records request events as Prometheus metrics. Requires prometheus_client."""
+
+    def __init__(self, registry=None, namespace='tinify'):  # type: (Any, str) -> None
+        from prometheus_client import Counter, Gauge, Histogram, REGISTRY  # type: ignore[import-not-found]
+
+        registry = registry if registry is not None else REGISTRY
+        labels = ['method', 'endpoint', 'status']
+        self.requests = Counter('requests_total', 'Request attempts made to the Tinify API.', labels, namespace=namespace, registry=registry)
+        self.duration = Histogram('request_duration_seconds', 'Duration of request attempts.', ['endpoint', 'phase'], namespace=namespace, registry=registry)
+        self.bytes_sent = Counter('sent_bytes_total', 'Bytes sent to the Tinify API.', ['endpoint'], namespace=namespace, registry=registry)
+        self.bytes_received = Counter('received_bytes_total', 'Bytes received from the Tinify API.', ['endpoint'], namespace=namespace, registry=registry)
+        self.compression_count = Gauge('compression_count', 'Compressions made this month.', namespace=namespace, registry=registry)
+
+    def __call__(self, event):  # type: (RequestEvent) -> None
+        status = str(event.status) if event.status is not None else 'error'
+        self.requests.labels(event.method, event.endpoint, status).inc()
+        for phase, seconds in event.timings.items():
+            self.duration.labels(event.endpoint, phase).observe(seconds)
+        if event.bytes_sent:
+            self.bytes_sent.labels(event.endpoint).inc(event.bytes_sent)
+        if event.bytes_received:
+            self.bytes_received.labels(event.endpoint).inc(event.bytes_received)
+        if event.compression_count is not None:
+            self.compression_count.set(event.compression_count)
+
+class OpenTelemetryObserver(object):
+    """Records every request attempt as an OpenTelemetry span. Requires opentelemetry-api."""
+
+    def __init__(self, tracer=None):  # type: (Any) -> None
+        from opentelemetry import trace  # type: ignore[import-not-found]
+        from .version import __version__
+
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer('tinify', __version__)
+
+    def __call__(self, event):  # type: (RequestEvent) -> None
+        attributes = {
+            'http.request.method': event.method,
+            'url.full': event.url,
+            'tinify.endpoint': event.endpoint,
+            'tinify.attempt': event.attempt,
+        }  # type: Dict[str, Any]
+        if event.status is not None:
+            attributes['http.response.status_code'] = event.status
+        if event.bytes_sent is not None:
+            attributes['http.request.body.size'] = event.bytes_sent
+        if event.bytes_received is not None:
+            attributes['http.response.body.size'] = event.bytes_received
+        if event.compression_count is not None:
+            attributes['tinify.compression_count'] = event.compression_count
+        for phase, seconds in event.timings.items():
+            attributes['tinify.timing.' + phase] = seconds
+
+        start = event.started_at
+        span = self.tracer.start_span('tinify ' + event.endpoint, start_time=int(start * 1e9), attributes=attributes)
+        if event.error is not None:
+            span.record_exception(event.error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(event.error)))
+        span.end(end_time=int((start + event.timings.get('total', 0.0)) * 1e9))
+
+def endpoint_kind(url, body):  # type: (str, Any) -> str
+    if url.endswith('/shrink'):
+        return 'shrink'
+    if isinstance(body, dict) and 'store' in body:
+        return 'store'
+    # Absolute URLs are the locations of uploaded images.
+    if url.lower().startswith('https://'):
+        return 'output'
+    return 'other'
+
+def body_size(data):  # type: (Any) -> Optional[int]
+    if data is None:
+        return 0
+    if isinstance(data, memoryview):
+        return data.nbytes
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, type('')):
+        return len(data.encode('utf-8'))
+    try:
+        from requests.utils import super_len
+        return super_len(data) or None
+    except Exception:
+        return None
+
+def request_event(method, url, endpoint, attempt, started, requested, backoff, bytes_sent, stream, response, error, received=None):  # type: (str, str, str, int, float, float, float, Optional[int], bool, Any, Optional[Exception], Optional[int]) -> RequestEvent
+    # received is the size of a streamed body, once it has been read.
+    finished = time.time()
+    timings = {
+        'limiter': requested - started,
+        'backoff': backoff,
+        'total': finished - started,
+    }
+    status = bytes_received = count = None
+    if response is not None:
+        status = response.status_code
+        timings['response'] = response.elapsed.total_seconds()
+        timings['download'] = max(0.0, finished - requested - timings['response'])
+        length = response.headers.get('content-length')
+        if received is not None:
+            bytes_received = received
+        elif not stream:
+            bytes_received = len(response.content)
+        elif length:
+            bytes_received = int(length)
+        count = response.headers.get('compression-count')
+    return RequestEvent(method, url, endpoint, attempt, started, timings,
+        status=status, bytes_sent=bytes_sent, bytes_received=bytes_received,
+        compression_count=int(count) if count else None, error=error)
+
+def notify(observers, event):  # type: (Iterable[Callable[[RequestEvent], Any]], RequestEvent) -> None
+    for observer in observers:
+        try:
+            observer(event)
+        except Exception as err:
+            warnings.warn('Request observer {0!r} failed: {1}'.format(observer, err), RuntimeWarning)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import json
+import threading
+import time
+
+try:
+    from typing import Any, Dict, Mapping, Optional, Tuple
+except ImportError:
+    pass
+
+class Journal(object):
+    """Append-only record of batch progress in JSON lines, to resume an interrupted run.
+
+    Every upload is recorded with the digest of its input and the location it returned,
+    and every written output with the commands used, the metadata of its result and the
+    path it was moved to, if a batch callback moved it. A batch
+    run with the same journal skips outputs that were completed before, and downloads from
+    recorded locations instead of uploading the input again while they are still fresh.
+    """
+
+    # Seconds a location returned by the API can be expected to remain available.
+    LOCATION_TTL = 3600
+
+    def __init__(self, path):  # type: (str) -> None
+        self.path = path
+        self._lock = threading.Lock()
+        self._locations = {}  # type: Dict[str, Tuple[str, float]]
+        self._completed = {}  # type: Dict[Tuple[str, str], Dict[str, str]]
+        self._written = {}  # type: Dict[Tuple[str, str], str]
+        self._load()
+        self._file = io.open(path, 'a', encoding='utf-8')
+        if self._file.tell() > 0 and not self._terminated:
+            self._file.write('\n')
+
+    def __enter__(self):  # type: () -> Journal
+        return self
+
+    def __exit__(self, *args):  # type: (*Any) -> None
+        self.close()
+        return None
+
+    def close(self):  # type: () -> None
+        with self._lock:
+            self._file.close()
+
+    def location(self, digest):  # type: (str) -> Optional[str]
+        """Return a location of an earlier upload of the input, if it is still fresh."""
+        with self._lock:
+            entry = self._locations.get(digest)
+        if entry is None or entry[1] + self.LOCATION_TTL < time.time():
+            return None
+        return entry[0]
+
+    def completed(self, key, output):  # type: (str, str) -> Optional[Dict[str, str]]
+        """Return the result metadata of an output written before with the same input and commands."""
+        with self._lock:
+            return self._completed.get((key, output))
+
+    def written(self, key, output):  # type: (str, str) -> Optional[str]
+        """Return where a completed output ended up, which differs when it was moved afterwards."""
+        with self._lock:
+            if (key, output) not in self._completed:
+                return None
+            return self._written.get((key, output), output)
+
+    def record_upload(self, digest, location):  # type: (str, str) -> None
+        entry = {'event': 'upload', 'digest': digest, 'location': location, 'time': time.time()}
+        self._append(entry)
+
+    def record_output(self, key, output, meta, path=None):  # type: (str, str, Mapping[str, str], Optional[str]) -> None
+        entry = {'event': 'output', 'key': key, 'output': output, 'meta': dict(meta), 'time': time.time()}  # type: Dict[str, Any]
+        if path is not None and path != output:
+            entry['path'] = path
+        self._append(entry)
+
+    def record_error(self, key, output, error):  # type: (str, Optional[str], Exception) -> None
+        entry = {'event': 'error', 'key': key, 'output': output, 'error': str(error), 'time': time.time()}
+        self._append(entry)
+
+    def _append(self, entry):  # type: (Dict[str, Any]) -> None
+        line = '{0}\n'.format(json.dumps(entry, sort_keys=True))
+        with self._lock:
+            self._apply(entry)
+            self._file.write(line)
+            self._file.flush()
+
+    def _apply(self, entry):  # type: (Dict[str, Any]) -> None
+        if entry.get('event') == 'upload':
+            self._locations[entry['digest']] = (entry['location'], entry['time'])
+        elif entry.get('event') == 'output':
+            self._completed[(entry['key'], entry['output'])] = entry['meta']
+            if 'path' in entry:
+                self._written[(entry['key'], entry['output'])] = entry['path']
+            else:
+                self._written.pop((entry['key'], entry['output']), None)
+
+    def _load(self):  # type: () -> None
+        self._terminated = True
+        try:
+            f = io.open(self.path, 'r', encoding='utf-8')
+        except IOError:
+            return
+        with f:
+            for line in f:
+                self._terminated = line.endswith('\n')
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash; the item is simply done again.
+                    continue
+                self._apply(entry)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore
+    import msvcrt
+
+try:
+    from typing import Any, Dict, Optional
+except ImportError:
+    pass
+
+class RateLimiter(object):
+    """Limits the request rate and the number of requests in flight within one process.
+
+    Requests are admitted at rate per second on average, with bursts of up to burst requests
+    (a token bucket), and no more than max_in_flight requests run at the same time. Either
+    limit may be None to disable it. Share one instance between clients to give them a
+    common budget.
+    """
+
+    # Seconds to wait before checking again for a free slot when max_in_flight is reached.
+    POLL_INTERVAL = 0.01
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):  # type: (Optional[float], Optional[float], Optional[int]) -> None
+        if rate is not None and rate <= 0:
+            raise ValueError('Rate must be positive')
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 0)
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._state = {}  # type: Dict[str, Any]
+
+    def try_acquire(self):  # type: () -> float
+        """Take a slot if one is available now and return 0, otherwise return the seconds to wait."""
+        with self._lock:
+            return self._take(self._state)
+
+    def acquire(self, timeout=None):  # type: (Optional[float]) -> bool
+        """Wait for a slot. Returns False if none became available within timeout seconds."""
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def release(self):  # type: () -> None
+        with self._lock:
+            self._give(self._state)
+
+    def __getstate__(self):  # type: () -> Dict[str, Any]
+        # Copies sent to worker processes start without a lock or slots of their own.
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_state'] = {}
+        return state
+
+    def __setstate__(self, state):  # type: (Dict[str, Any]) -> None
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _take(self, state):  # type: (Dict[str, Any]) -> float
+        now = time.time()
+        if self.max_in_flight is not None and state.get('in_flight', 0) >= self.max_in_flight:
+            return self.POLL_INTERVAL
+
+        if self.rate is not None:
+            tokens = state.get('tokens', self.burst)
+            updated = state.get('updated', now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            state['updated'] = now
+            if tokens < 1:
+                state['tokens'] = tokens
+                return (1 - tokens) / self.rate
+            state['tokens'] = tokens - 1
+
+        state['in_flight'] = state.get('in_flight', 0) + 1
+        return 0.0
+
+    def _give(self, state):  # type: (Dict[str, Any]) -> None
+        state['in_flight'] = max(0, state.get('in_flight', 0) - 1)
+
+class FileRateLimiter(RateLimiter):
+    """A RateLimiter whose state lives in a locked file, so processes on one host share it.
+
+    Point every process at the same path. Slots held by processes that exited without
+    releasing them are reclaimed on POSIX systems.
+    """
+
+    def __init__(self, path, rate=None, burst=None, max_in_flight=None):  # type: (str, Optional[float], Optional[float], Optional[int]) -> None
+        RateLimiter.__init__(self, rate, burst, max_in_flight)
+        self.path = path
+
+    def try_acquire(self):  # type: () -> float
+        with self._lock:
+            return self._update(self._take)
+
+    def release(self):  # type: () -> None
+        with self._lock:
+            self._update(self._give)
+
+    def _take(self, state):  # type: (Dict[str, Any]) -> float
+        holders = dict((pid, count) for pid, count in state.get('holders', {}).items() if _alive(int(pid)))
+        state['in_flight'] = sum(holders.values())
+        wait = RateLimiter._take(self, state)
+        if not wait:
+            pid = str(os.getpid())
+            holders[pid] = holders.get(pid, 0) + 1
+        state['holders'] = holders
+        return wait
+
+    def _give(self, state):  # type: (Dict[str, Any]) -> None
+        holders = state.get('holders', {})
+        pid = str(os.getpid())
+        if holders.get(pid, 0) > 1:
+            holders[pid] -= 1
+        else:
+            holders.pop(pid, None)
+        state['holders'] = holders
+        state['in_flight'] = sum(holders.values())
+
+    def _update(self, change):  # type: (Any) -> Any
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            _lock_file(fd)
+            try:
+                data = b''
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    data += chunk
+                try:
+                    state = json.loads(data.decode('utf-8')) if data else {}
+                except ValueError:
+                    state = {}
+                result = change(state)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps(state).encode('utf-8'))
+                return result
+            finally:
+                _unlock_file(fd)
+        finally:
+            os.close(fd)
+
+def _lock_file(fd):  # type: (int) -> None
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+def _unlock_file(fd):  # type: (int) -> None
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+def _alive(pid):  # type: (int) -> bool
+    if pid == os.getpid() or os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+    return True
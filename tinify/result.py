@@ -1,30 +1,170 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
-from requests.structures import CaseInsensitiveDict
+
+import os
+import uuid
 
 from . import ResultMeta
 
 try:
-    from typing import Union, Optional, IO
+    from typing import Any, Union, Optional, IO, Iterable, Iterator, Mapping
 except ImportError:
     pass
 
 
 class Result(ResultMeta):
-    def __init__(self, meta, data):  # type: (CaseInsensitiveDict[str], bytes) -> None
+    """Compressed image and its metadata.
+
+    The image can be held in memory, or in a body that is read when the data is first
+    needed: an unread streaming response, or a spill file. release() frees the image and
+    closes its body; a result used as a context manager is released when the block exits.
+    """
+
+    __slots__ = ('_data', '_body', '_released')
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, meta, data=None, body=None):  # type: (Mapping[str, str], Optional[bytes], Any) -> None
         ResultMeta.__init__(self, meta)
-        self.data = data
+        self._data = data
+        self._body = body
+        self._released = False
+
+    def __enter__(self):  # type: () -> Result
+        return self
+
+    def __exit__(self, *args):  # type: (*Any) -> None
+        self.release()
+        return None
+
+    @property
+    def data(self):  # type: () -> bytes
+        if self._released:
+            raise ValueError('The data of this result has been released')
+        if self._body is not None:
+            body, self._body = self._body, None
+            try:
+                self._data = body.read()
+            finally:
+                body.close()
+        return self._data  # type: ignore[return-value]
+
+    @data.setter
+    def data(self, value):  # type: (bytes) -> None
+        body, self._body = self._body, None
+        self._data = value
+        self._released = False
+        if body is not None:
+            body.close()
+
+    @property
+    def loaded(self):  # type: () -> bool
+        """Whether the image is held in memory."""
+        return self._data is not None
+
+    def release(self):  # type: () -> None
+        """Free the image data, and close the response or remove the spill file it came from."""
+        body, self._body = self._body, None
+        self._data = None
+        self._released = True
+        if body is not None:
+            body.close()
+
+    def spill(self, directory=None):  # type: (Optional[str]) -> None
+        """Move the image data out of memory into a temporary file, read back when needed."""
+        if self._released or (self._data is None and isinstance(self._body, _FileBody)):
+            return
+        if self._body is not None:
+            # Streaming an unread response leaves its data in a spill file.
+            for _ in self._stream(self.CHUNK_SIZE, directory=directory):
+                pass
+            return
+        import tempfile
+        fd, path = tempfile.mkstemp(prefix='tinify-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.view)
+        except BaseException:
+            os.unlink(path)
+            raise
+        self._body = _FileBody(path)
+        self._data = None
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):  # type: (int) -> Iterator[Union[bytes, memoryview]]
+        """Iterate over the image data. An unread response is streamed without keeping it in
+        memory; what is streamed is spilled to a temporary file, so it can be read again."""
+        return self._stream(chunk_size)
+
+    def _stream(self, chunk_size, keep=True, directory=None):  # type: (int, bool, Optional[str]) -> Iterator[Union[bytes, memoryview]]
+        # Without keep an unread response is passed on once and the result is released.
+        if self._body is None or self._released:
+            data = self.view
+            for offset in range(0, len(data), chunk_size):
+                yield data[offset:offset + chunk_size]
+            return
+        body, self._body = self._body, None
+        if isinstance(body, _FileBody):
+            try:
+                for chunk in body.iter_content(chunk_size):
+                    yield chunk
+            finally:
+                self._body = body
+            return
+        if not keep:
+            try:
+                for chunk in body.iter_content(chunk_size):
+                    yield chunk
+            finally:
+                self._released = True
+                body.close()
+            return
+
+        import tempfile
+        fd, path = tempfile.mkstemp(prefix='tinify-', suffix='.tmp', dir=directory)
+        complete = False
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                chunks = body.iter_content(chunk_size)
+                try:
+                    for chunk in chunks:
+                        f.write(chunk)
+                        yield chunk
+                except GeneratorExit:
+                    # Read what the caller left behind, so the result stays complete.
+                    for chunk in chunks:
+                        f.write(chunk)
+                    complete = True
+                    raise
+                complete = True
+        finally:
+            body.close()
+            if complete:
+                self._body = _FileBody(path)
+            else:
+                os.unlink(path)
+                self._released = True
 
     def to_file(self, path):  # type: (Union[str, IO]) -> None
-        if hasattr(path, 'write'):
-            path.write(self.data)
+        if self._body is not None:
+            if hasattr(path, 'write'):
+                for chunk in self.iter_content():
+                    path.write(chunk)  # type: ignore[union-attr]
+            else:
+                _write_atomic(path, self.iter_content())  # type: ignore[arg-type]
+        elif hasattr(path, 'write'):
+            path.write(self.view)  # type: ignore[union-attr]
         else:
-            with open(path, 'wb') as f:
-                f.write(self.data)
+            with open(path, 'wb') as f:  # type: ignore[arg-type]
+                f.write(self.view)
 
     def to_buffer(self):  # type: () -> bytes
         return self.data
 
+    @property
+    def view(self):  # type: () -> memoryview
+        """The image data as a memoryview, to pass it on without copying it."""
+        return memoryview(self.data)
+
     @property
     def size(self):  # type: () -> Optional[int]
         value = self._meta.get('Content-Length')
@@ -48,3 +188,59 @@ class Result(ResultMeta):
     @property
     def location(self):  # type: () -> Optional[str]
         return None
+
+
+class _ResponseBody(object):
+    """Body of a streaming response that has not been read yet."""
+
+    def __init__(self, response):  # type: (Any) -> None
+        self.response = response
+
+    def read(self):  # type: () -> bytes
+        return self.response.content
+
+    def iter_content(self, chunk_size):  # type: (int) -> Iterator[bytes]
+        return self.response.iter_content(chunk_size)
+
+    def close(self):  # type: () -> None
+        self.response.close()
+
+class _FileBody(object):
+    """Image data spilled to a temporary file, which is removed when closed."""
+
+    def __init__(self, path):  # type: (str) -> None
+        self.path = path
+
+    def read(self):  # type: () -> bytes
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def iter_content(self, chunk_size):  # type: (int) -> Iterator[bytes]
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    def close(self):  # type: () -> None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __del__(self):  # type: () -> None
+        self.close()
+
+def _write_atomic(path, chunks):  # type: (str, Iterable[Union[bytes, memoryview]]) -> None
+    """Write chunks to a temporary file next to path, then move it into place."""
+    tmp_path = '{0}.{1}.tmp'.format(path, uuid.uuid4().hex[:12])
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .result import _write_atomic
+
+try:
+    from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+except ImportError:
+    pass
+
+# Response headers that describe a result and are kept alongside the cached image.
+CACHED_HEADERS = ('Content-Type', 'Content-Length', 'Image-Width', 'Image-Height')
+
+class ResultCache(object):
+    """Stores compressed results, keyed by a digest of the input and the requested commands.
+
+    Set an instance as tinify.cache to have Source.from_file and Source.from_buffer look up
+    results locally before anything is uploaded. Implementations must be thread safe.
+    """
+
+    def get(self, key):  # type: (str) -> Optional[Tuple[Dict[str, str], bytes]]
+        raise NotImplementedError
+
+    def set(self, key, meta, data):  # type: (str, Mapping[str, str], bytes) -> None
+        raise NotImplementedError
+
+    def clear(self):  # type: () -> None
+        raise NotImplementedError
+
+class MemoryCache(ResultCache):
+    """Keeps results in memory, evicting the least recently used ones beyond max_size bytes."""
+
+    def __init__(self, max_size=64 * 1024 * 1024, ttl=None):  # type: (int, Optional[float]) -> None
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()  # type: collections.OrderedDict[str, Tuple[Optional[float], Dict[str, str], bytes]]
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):  # type: (str) -> Optional[Tuple[Dict[str, str], bytes]]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, meta, data = entry
+            if expires is not None and expires < time.time():
+                self._remove(key)
+                return None
+            # Move to the end to mark as most recently used.
+            del self._entries[key]
+            self._entries[key] = entry
+            return dict(meta), data
+
+    def set(self, key, meta, data):  # type: (str, Mapping[str, str], bytes) -> None
+        if len(data) > self.max_size:
+            return
+        expires = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires, _cached_meta(meta), data)
+            self._size += len(data)
+            while self._size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):  # type: () -> None
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):  # type: () -> int
+        return len(self._entries)
+
+    def _remove(self, key):  # type: (str) -> None
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[2])
+
+class FileCache(ResultCache):
+    """Keeps results as files in a directory, which can be shared between processes.
+
+    Entries older than ttl seconds are ignored. When max_size bytes is exceeded, the least
+    recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_size=None, ttl=None):  # type: (str, Optional[int], Optional[float]) -> None
+        self.directory = directory
+        self.max_size = max_size
+        self.ttl = ttl
+        self._size = None  # type: Optional[int]
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __getstate__(self):  # type: () -> Dict[str, Any]
+        # Copies sent to worker processes count the size of the directory themselves.
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_size'] = None
+        return state
+
+    def __setstate__(self, state):  # type: (Dict[str, Any]) -> None
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def get(self, key):  # type: (str) -> Optional[Tuple[Dict[str, str], bytes]]
+        path = self._path(key)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl < time.time():
+                self._unlink(path)
+                return None
+            with open(path, 'rb') as f:
+                meta = json.loads(f.readline().decode('utf-8'))
+                data = f.read()
+            os.utime(path, None)
+        except (IOError, OSError, ValueError):
+            return None
+        return meta, data
+
+    def set(self, key, meta, data):  # type: (str, Mapping[str, str], bytes) -> None
+        header = json.dumps(_cached_meta(meta)).encode('utf-8') + b'\n'
+        _write_atomic(self._path(key), [header, data])
+        if self.max_size is not None:
+            with self._lock:
+                if self._size is None:
+                    self._size = sum(size for _, size, _ in self._entries())
+                else:
+                    self._size += len(header) + len(data)
+                if self._size > self.max_size:
+                    self._evict()
+
+    def clear(self):  # type: () -> None
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._unlink(path)
+            self._size = 0
+
+    def _evict(self):  # type: () -> None
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        size = sum(size for _, size, _ in entries)
+        for path, entry_size, _ in entries:
+            if size <= self.max_size:  # type: ignore[operator]
+                break
+            self._unlink(path)
+            size -= entry_size
+        self._size = size
+
+    def _entries(self):  # type: () -> Iterable[Tuple[str, int, float]]
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def _path(self, key):  # type: (str) -> str
+        return os.path.join(self.directory, key)
+
+    def _unlink(self, path):  # type: (str) -> None
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+def cache_key(digest, commands):  # type: (str, Mapping[str, Any]) -> str
+    key = hashlib.sha256(digest.encode('ascii'))
+    key.update(json.dumps(commands, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return key.hexdigest()
+
+def _digest(chunks):  # type: (Iterable[Union[bytes, bytearray, memoryview]]) -> str
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def _cached_meta(meta):  # type: (Mapping[str, str]) -> Dict[str, str]
+    return dict((name, meta[name]) for name in CACHED_HEADERS if meta.get(name) is not None)
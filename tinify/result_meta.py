@@ -1,16 +1,17 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
-from requests.structures import CaseInsensitiveDict
 
 try:
-    from typing import Optional, Dict
+    from typing import Optional, Dict, Mapping
 except ImportError:
     pass
 
 
 
 class ResultMeta(object):
-    def __init__(self, meta):  # type: (CaseInsensitiveDict[str]) -> None
+    __slots__ = ('_meta',)
+
+    def __init__(self, meta):  # type: (Mapping[str, str]) -> None
         self._meta = meta
 
     @property
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import random
+import time
+
+try:
+    from typing import Any, Collection, Mapping, Optional
+except ImportError:
+    pass
+
+class RetryPolicy(object):
+    """Decides whether and when a failed request is retried.
+
+    The delay before retry n is delay * backoff ** (n - 1), capped at max_delay. With jitter
+    a random delay between zero and that value is used instead, so that many clients retrying
+    at once spread out. A Retry-After header sent by the server is waited for, but when it
+    asks for more than max_delay the request is not retried at all.
+
+    Connection errors and server errors (5xx) are retried. A 429 response is only retried
+    when it carries Retry-After, which signals a rate limit; without it the monthly
+    compression limit was reached and retrying is pointless. Pass statuses to retry an
+    explicit set of status codes instead. No retry is scheduled that would end later than
+    max_elapsed seconds after the first attempt.
+    """
+
+    def __init__(self, retries=3, delay=0.5, max_delay=30.0, backoff=2.0, jitter=True, max_elapsed=None, statuses=None, respect_retry_after=True):  # type: (int, float, float, float, bool, Optional[float], Optional[Collection[int]], bool) -> None
+        self.retries = retries
+        self.delay = delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+        self.statuses = frozenset(statuses) if statuses is not None else None
+        self.respect_retry_after = respect_retry_after
+
+    def should_retry(self, status, headers=None):  # type: (int, Optional[Mapping[str, str]]) -> bool
+        if self.statuses is not None:
+            return status in self.statuses
+        if status == 429:
+            return headers is not None and headers.get('retry-after') is not None
+        return status >= 500
+
+    def retry_delay(self, attempt, elapsed, status=None, headers=None):  # type: (int, float, Optional[int], Optional[Mapping[str, str]]) -> Optional[float]
+        """Seconds to wait before the next attempt, or None if the request should not be retried.
+
+        attempt is the number of attempts made so far, elapsed the seconds since the first one.
+        status and headers describe the failed response, or are None for a connection error.
+        """
+        if attempt > self.retries:
+            return None
+        if status is not None and not self.should_retry(status, headers):
+            return None
+
+        delay = min(self.max_delay, self.delay * self.backoff ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+
+        if self.respect_retry_after and headers is not None:
+            retry_after = _parse_retry_after(headers.get('retry-after'))
+            if retry_after is not None:
+                if retry_after > self.max_delay:
+                    return None
+                delay = max(delay, retry_after)
+
+        if self.max_elapsed is not None and elapsed + delay > self.max_elapsed:
+            return None
+        return delay
+
+def _parse_retry_after(value):  # type: (Optional[str]) -> Optional[float]
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_tz, mktime_tz
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, mktime_tz(date) - time.time())
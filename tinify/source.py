@@ -2,80 +2,292 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import tinify
+import io
+import os
 import sys
-from tinify.result import Result
+import collections
+import json
+import threading
+import time
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping  # type: ignore
+from tinify.client import _buffer
+from tinify.context import propagate
+from tinify.image_info import ImageInfo, Preflight
+from tinify.result import Result, _ResponseBody, _write_atomic
 from tinify.result_meta import ResultMeta
+from tinify.result_cache import cache_key, _digest
 
 try:
-    from typing import Union, Dict, IO, Any, Unpack, TYPE_CHECKING, overload
+    from typing import Union, Dict, IO, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple, Unpack, TYPE_CHECKING, overload
     if sys.version_info.major > 3 and sys.version_info.minor > 8:
         from  tinify._typed import *
 except ImportError:
     TYPE_CHECKING = False # type: ignore
 
 class Source(object):
+    CHUNK_SIZE = 64 * 1024
+
     @classmethod
-    def from_file(cls, path):  # type: (Union[str, IO]) -> Source
-        if hasattr(path, 'read'):
+    def from_file(cls, path):  # type: (Union[str, IO, Iterable[bytes]]) -> Source
+        preflight = tinify.preflight
+        if preflight is None:
+            return cls._from_file(path)
+
+        info = _inspect_file(preflight, path)
+        if info is not None and preflight.skip(info):
+            stream = hasattr(path, 'read') or hasattr(path, '__next__') or hasattr(path, 'next')
+            if hasattr(path, 'read'):
+                # The caller may close the file before the input is passed through.
+                return cls._deferred(_Upload(body=path.read(), info=info, skip=True))  # type: ignore[union-attr]
+            return cls._deferred(_Upload(body=path, info=info, skip=True) if stream else _Upload(path=path, info=info, skip=True))  # type: ignore[arg-type]
+        source = cls._from_file(path)
+        source._upload.info = info
+        return source
+
+    @classmethod
+    def _from_file(cls, path):  # type: (Union[str, IO, Iterable[bytes]]) -> Source
+        # File objects, mmaps and iterators of chunks are streamed to the API as they are read.
+        stream = hasattr(path, 'read') or hasattr(path, '__next__') or hasattr(path, 'next')
+        # With a cache the upload is deferred until a result turns out not to be cached.
+        if tinify.cache is not None:
+            if stream:
+                upload = _hashed_upload(path, cls.CHUNK_SIZE)
+                if upload is not None:
+                    return cls._deferred(upload)
+                return cls.from_buffer(path.read() if hasattr(path, 'read') else b''.join(path))  # type: ignore
+            with open(path, 'rb') as f:  # type: ignore[arg-type]
+                digest = _digest(iter(lambda: f.read(cls.CHUNK_SIZE), b''))
+            return cls._deferred(_Upload(path=path, digest=digest))  # type: ignore[arg-type]
+
+        # In lazy mode nothing is uploaded until the input is needed. File objects are read
+        # now though, as they are usually closed by then.
+        if tinify.lazy:
+            if hasattr(path, 'read'):
+                return cls._deferred(_Upload(body=path.read()))  # type: ignore[union-attr]
+            if stream:
+                return cls._deferred(_Upload(body=path))
+            return cls._deferred(_Upload(path=path))  # type: ignore[arg-type]
+
+        if stream:
             return cls._shrink(path)
         else:
-            with open(path, 'rb') as f:
-                return cls._shrink(f.read())
+            with open(path, 'rb') as f:  # type: ignore[arg-type]
+                return cls._shrink(f)
+
+    @classmethod
+    def from_buffer(cls, string):  # type: (Union[bytes, bytearray, memoryview]) -> Source
+        # Bytes-like objects are sent as they are, so large buffers are not copied.
+        string = _buffer(string)
+        preflight = tinify.preflight
+        if preflight is None:
+            return cls._from_buffer(string)
+
+        data = string.encode('utf-8') if isinstance(string, type('')) else string  # type: ignore[attr-defined]
+        info = preflight.inspect(bytes(data[:preflight.HEADER_SIZE]), memoryview(data).nbytes)
+        if preflight.skip(info):
+            return cls._deferred(_Upload(body=string, info=info, skip=True))
+        source = cls._from_buffer(string)
+        source._upload.info = info
+        return source
 
     @classmethod
-    def from_buffer(cls, string):  # type: (bytes) -> Source
+    def _from_buffer(cls, string):  # type: (Union[bytes, bytearray, memoryview]) -> Source
+        if tinify.cache is not None:
+            data = string.encode('utf-8') if isinstance(string, type('')) else string  # type: ignore[attr-defined]
+            return cls._deferred(_Upload(body=string, digest=_digest([data])))
+        if tinify.lazy:
+            return cls._deferred(_Upload(body=string))
         return cls._shrink(string)
 
     @classmethod
     def from_url(cls, url):  # type: (str) -> Source
+        if tinify.lazy:
+            return cls._deferred(_Upload(body={"source": {"url": url}}))
         return cls._shrink({"source": {"url": url}})
 
     @classmethod
     def _shrink(cls, obj):  # type: (Any) -> Source
-        response = tinify.get_client().request('POST', '/shrink', obj)
-        return cls(response.headers['location'])
+        return cls(_shrink(obj))
+
+    @classmethod
+    def _deferred(cls, upload):  # type: (_Upload) -> Source
+        source = cls(None)  # type: ignore[arg-type]
+        source._upload = upload
+        return source
 
     def __init__(self, url, **commands):  # type: (str, **Any) -> None
-        self.url = url
+        self._upload = _Upload(url)
         self.commands = commands
 
+    @property
+    def url(self):  # type: () -> str
+        return self._upload.location()
+
+    @url.setter
+    def url(self, value):  # type: (str) -> None
+        self._upload = _Upload(value)
+
+    @property
+    def info(self):  # type: () -> Optional[ImageInfo]
+        """Format, dimensions and size of the input, when inspected with tinify.preflight."""
+        return self._upload.info
+
+    @property
+    def skipped(self):  # type: () -> bool
+        """Whether the result is the input itself, because preflight chose to skip it."""
+        return self._upload.skip and not self.commands
+
+    @property
+    def pending(self):  # type: () -> bool
+        """Whether the input has yet to be uploaded."""
+        return self._upload.url is None
+
     def preserve(self, *options):  # type: (*PreserveOption) -> "Source"
-        return type(self)(self.url, **self._merge_commands(preserve=self._flatten(options)))
+        return self._derive(**self._merge_commands(preserve=self._flatten(options)))
 
     def resize(self, **options):  # type: (Unpack[ResizeOptions]) -> "Source"
-        return type(self)(self.url, **self._merge_commands(resize=options))
+        return self._derive(**self._merge_commands(resize=options))
 
     def convert(self, **options):  # type: (Unpack[ConvertOptions]) -> "Source"
-        return type(self)(self.url, **self._merge_commands(convert=options))
+        return self._derive(**self._merge_commands(convert=options))
 
     def transform(self, **options):  # type: (Unpack[TransformOptions]) -> "Source"
-        return type(self)(self.url, **self._merge_commands(transform=options))
+        return self._derive(**self._merge_commands(transform=options))
 
     if TYPE_CHECKING:
         @overload
-        def store(self, **options): # type: (Unpack[S3StoreOptions]) -> ResultMeta
+        def store(self, timeout=None, **options): # type: (Optional[float], Unpack[S3StoreOptions]) -> ResultMeta
             pass
 
         @overload
-        def store(self, **options): # type: (Unpack[GCSStoreOptions]) -> ResultMeta
+        def store(self, timeout=None, **options): # type: (Optional[float], Unpack[GCSStoreOptions]) -> ResultMeta
             pass
 
-    def store(self, **options):  # type: (Any) -> ResultMeta
-        response = tinify.get_client().request('POST', self.url, self._merge_commands(store=options))
+    def store(self, timeout=None, **options):  # type: (Optional[float], Any) -> ResultMeta
+        deadline = _deadline(timeout)
+        url = self._upload.location(deadline)
+        response = tinify.get_client().request('POST', url, self._merge_commands(store=options), deadline=deadline)
+        return ResultMeta(response.headers)
+
+    def result(self, timeout=None, lazy=False):  # type: (Optional[float], bool) -> Result
+        """Fetch the result. With lazy, only the headers are read until the data is needed;
+        the unread response holds on to its connection until then, or until released."""
+        if self.skipped:
+            return self._upload.passthrough()
+
+        cache, key = self._cache()
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return Result(*cached)
+        elif lazy:
+            response = self._request_result(stream=True, deadline=_deadline(timeout))
+            return Result(response.headers, body=_ResponseBody(response))
+
+        response = self._request_result(deadline=_deadline(timeout))
+        if key is not None:
+            cache.set(key, response.headers, response.content)
+        return Result(response.headers, response.content)
+
+    def iter_content(self, chunk_size=CHUNK_SIZE, timeout=None):  # type: (int, Optional[float]) -> Iterator[bytes]
+        cache, key = self._cache()
+        cached = cache.get(key) if key is not None else None
+        if self.skipped:
+            cached = (None, self._upload.passthrough().data)
+        if cached is not None:
+            data = cached[1]
+            for offset in range(0, len(data), chunk_size):
+                yield data[offset:offset + chunk_size]
+            return
+
+        response = self._request_result(stream=True, deadline=_deadline(timeout))
+        try:
+            for chunk in response.iter_content(chunk_size):
+                yield chunk
+        finally:
+            response.close()
+
+    def to_file(self, path, stream=False, timeout=None):  # type: (Union[str, IO], bool, Optional[float]) -> None
+        if not stream:
+            return self.result(timeout).to_file(path)
+
+        # Write chunks as they arrive; a path is only replaced once the download is complete.
+        if hasattr(path, 'write'):
+            for chunk in self.iter_content(timeout=timeout):
+                path.write(chunk)  # type: ignore[union-attr]
+        else:
+            _write_atomic(path, self.iter_content(timeout=timeout))  # type: ignore[arg-type]
+
+    def to_buffer(self, timeout=None):  # type: (Optional[float]) -> bytes
+        return self.result(timeout).to_buffer()
+
+    def meta(self, timeout=None):  # type: (Optional[float]) -> ResultMeta
+        """Fetch the size, dimensions and type of the result without downloading the image."""
+        if self.skipped:
+            return ResultMeta(self._upload.passthrough()._meta)
+        cache, key = self._cache()
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            return ResultMeta(cached[0])
+
+        # Closing the response unread skips the body, at the cost of its connection.
+        response = self._request_result(stream=True, deadline=_deadline(timeout))
+        response.close()
         return ResultMeta(response.headers)
 
-    def result(self):  # type: () -> Result
+    def variants(self, variants, concurrency=None):  # type: (Union[Mapping[Any, Dict[str, Any]], Sequence[Dict[str, Any]]], Optional[int]) -> Any
+        """Fetch several outputs of this source concurrently.
+
+        Every variant is a dict of commands, e.g. {"resize": {"width": 100}, "convert": {...}},
+        applied on top of the commands of this source. Given a mapping of names to commands this
+        returns a dict of names to results; given a sequence it returns a list in the same order.
+        Identical command sets are requested only once.
+        """
+        named = isinstance(variants, Mapping)
+        items = list(variants.items()) if named else list(enumerate(variants))  # type: ignore[union-attr, arg-type]
+
+        unique = collections.OrderedDict()  # type: collections.OrderedDict[str, Dict[str, Any]]
+        for _, commands in items:
+            unique.setdefault(json.dumps(commands, sort_keys=True), commands)
+        if not unique:
+            return {} if named else []
+
+        # Imported on use; concurrent.futures pulls in logging and adds to the import time.
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Upload once before fanning out.
+        self._upload.location()
+        workers = concurrency or min(len(unique), tinify.pool_maxsize or tinify.Client.POOL_MAXSIZE)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = dict((key, executor.submit(propagate(self._derive(**self._merge_commands(**commands)).result)))
+                for key, commands in unique.items())
+            results = dict((key, future.result()) for key, future in futures.items())
+
+        if named:
+            return dict((name, results[json.dumps(commands, sort_keys=True)]) for name, commands in items)
+        return [results[json.dumps(commands, sort_keys=True)] for _, commands in items]
+
+    def _request_result(self, stream=False, deadline=None):  # type: (bool, Optional[float]) -> Any
+        url = self._upload.location(deadline)
         if not self.commands:
-            response = tinify.get_client().request('GET', self.url, self.commands)
+            return tinify.get_client().request('GET', url, self.commands, stream=stream, deadline=deadline)
         else:
-            response = tinify.get_client().request('POST', self.url, self.commands)
-        return Result(response.headers, response.content)
+            return tinify.get_client().request('POST', url, self.commands, stream=stream, deadline=deadline)
 
-    def to_file(self, path):  # type: (Union[str, IO]) -> None
-        return self.result().to_file(path)
+    def _derive(self, **commands):  # type: (**Any) -> Source
+        # Derived sources share the input, so it is uploaded at most once.
+        source = type(self)(None, **commands)  # type: ignore[arg-type]
+        source._upload = self._upload
+        return source
 
-    def to_buffer(self):  # type: () -> bytes
-        return self.result().to_buffer()
+    def _cache(self):  # type: () -> Tuple[Any, Optional[str]]
+        cache = tinify.cache
+        if cache is None or self._upload.digest is None:
+            return cache, None
+        return cache, cache_key(self._upload.digest, self.commands)
 
     def _merge_commands(self, **options):  # type: (**Any) -> Dict[str, Any]
         commands = self.commands.copy()
@@ -88,3 +300,106 @@ class Source(object):
             while isinstance(items[i], seqtypes):
                 items[i:i+1] = items[i]
         return items
+
+class _Upload(object):
+    """The input of a source and its location once it has been uploaded."""
+
+    def __init__(self, url=None, body=None, path=None, digest=None, info=None, skip=False):  # type: (Optional[str], Any, Optional[str], Optional[str], Optional[ImageInfo], bool) -> None
+        self.url = url
+        self.body = body
+        self.path = path
+        self.digest = digest
+        self.info = info
+        self.skip = skip
+        # Called with the location once the input has been uploaded.
+        self.on_upload = None  # type: Optional[Callable[[str], Any]]
+        self._lock = threading.Lock()
+
+    def passthrough(self):  # type: () -> Result
+        # The input of a skipped source is returned as its own result.
+        data = None  # type: Any
+        with self._lock:
+            if self.path is not None:
+                with open(self.path, 'rb') as f:
+                    data = f.read()
+            else:
+                data = self._buffer_body()
+        if isinstance(data, type('')):
+            data = data.encode('utf-8')
+        meta = {'Content-Length': str(memoryview(data).nbytes)}
+        if self.info is not None:
+            meta['Content-Type'] = self.info.content_type
+            if self.info.width is not None:
+                meta['Image-Width'] = str(self.info.width)
+                meta['Image-Height'] = str(self.info.height)
+        return Result(meta, data)
+
+    def _buffer_body(self):  # type: () -> Any
+        # Streams and iterables can only be read once; keep what they held.
+        if hasattr(self.body, 'read'):
+            self.body = self.body.read()
+        elif not isinstance(self.body, (bytes, bytearray, memoryview, type(''))):
+            self.body = b''.join(self.body)
+        return self.body
+
+    def location(self, deadline=None):  # type: (Optional[float]) -> str
+        if self.url is None:
+            with self._lock:
+                if self.url is None:
+                    if self.path is not None:
+                        with open(self.path, 'rb') as f:
+                            self.url = _shrink(f, deadline)
+                    elif self.skip:
+                        # Sources derived from a skipped one upload it, but it still passes through.
+                        self.url = _shrink(self._buffer_body(), deadline)
+                    else:
+                        if getattr(self.body, 'closed', False):
+                            raise ValueError('The file object was closed before it was uploaded')
+                        self.url = _shrink(self.body, deadline)
+                        self.body = None
+                    if self.on_upload is not None:
+                        self.on_upload(self.url)
+        return self.url  # type: ignore[return-value]
+
+def _shrink(obj, deadline=None):  # type: (Any, Optional[float]) -> str
+    response = tinify.get_client().request('POST', '/shrink', obj, deadline=deadline)
+    return response.headers['location']
+
+def _hashed_upload(stream, chunk_size):  # type: (Any, int) -> Optional[_Upload]
+    # Seekable streams are hashed in chunks and rewound, or read from their file when they
+    # have one, so large inputs are not held in memory. Other streams give None.
+    if not hasattr(stream, 'read') or not hasattr(stream, 'seek') or isinstance(stream, io.TextIOBase):
+        return None
+    try:
+        position = stream.tell()
+    except (IOError, OSError, ValueError):
+        return None
+    name = getattr(stream, 'name', None)
+    if position == 0 and isinstance(name, (str, type(''))) and os.path.isfile(name):
+        with open(name, 'rb') as f:
+            return _Upload(path=name, digest=_digest(iter(lambda: f.read(chunk_size), b'')))
+    digest = _digest(iter(lambda: stream.read(chunk_size), b''))
+    stream.seek(position)
+    return _Upload(body=stream, digest=digest)
+
+def _inspect_file(preflight, path):  # type: (Preflight, Any) -> Optional[ImageInfo]
+    if isinstance(path, (bytes, type(''))) or hasattr(path, '__fspath__'):
+        with open(path, 'rb') as f:
+            return preflight.inspect(f.read(preflight.HEADER_SIZE), os.path.getsize(path))
+
+    # Seekable streams are peeked at and rewound; other streams are not inspected.
+    if not hasattr(path, 'read') or not hasattr(path, 'seek'):
+        return None
+    try:
+        position = path.tell()
+        path.seek(0, 2)
+        size = path.tell() - position
+        path.seek(position)
+    except (IOError, OSError, ValueError):
+        return None
+    header = path.read(preflight.HEADER_SIZE)
+    path.seek(position)
+    return preflight.inspect(header, size)
+
+def _deadline(timeout):  # type: (Optional[float]) -> Optional[float]
+    return time.time() + timeout if timeout is not None else None
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import base64
+import collections
+import datetime
+import json
+import threading
+import time
+
+try:
+    from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+except ImportError:
+    pass
+
+class Transport(object):
+    """Connections a Client sends its requests over.
+
+    A client creates its transport by calling a factory: a Transport subclass, or any callable
+    taking the same arguments. It calls the factory again for fresh connections after a fork.
+    auth is a (username, password) pair and headers are sent with every request. verify is the
+    path of the CA bundle to check the server certificate with.
+
+    Responses need the parts of the requests.Response interface used by tinify: status_code,
+    ok, headers (case insensitive), content, json(), iter_content(), close() and elapsed.
+    """
+
+    def __init__(self, auth, headers, proxy=None, pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True, verify=None):  # type: (Tuple[str, str], Dict[str, str], Optional[str], int, int, bool, bool, Optional[str]) -> None
+        self.auth = auth
+        self.headers = headers
+        self.proxy = proxy
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.verify = verify
+
+    def request(self, method, url, headers=None, data=None, stream=False, timeout=None):  # type: (str, str, Optional[Dict[str, str]], Any, bool, Optional[Tuple[float, float]]) -> Any
+        """Send a request and return its response. timeout is a (connect, read) pair of seconds.
+
+        A streamed response is returned once the headers are received and must be closed.
+        """
+        raise NotImplementedError
+
+    def is_timeout(self, error):  # type: (Exception) -> bool
+        """Tell whether an error raised by request() is a timeout."""
+        import socket
+        return isinstance(error, socket.timeout)
+
+    def pool_stats(self):  # type: () -> List[Dict[str, Any]]
+        return []
+
+    def close(self):  # type: () -> None
+        pass
+
+class Response(object):
+    """Response of a transport that does not return requests.Response objects.
+
+    read is called with a chunk size to stream the body, and close to release the connection.
+    """
+
+    def __init__(self, status_code, headers, content=None, read=None, close=None, elapsed=0.0):  # type: (int, Any, Optional[bytes], Optional[Callable[[int], Iterator[bytes]]], Optional[Callable[[], None]], float) -> None
+        self.status_code = status_code
+        self.headers = headers
+        self.elapsed = datetime.timedelta(seconds=elapsed)
+        self._content = content
+        self._read = read
+        self._close = close
+
+    @property
+    def ok(self):  # type: () -> bool
+        return self.status_code < 400
+
+    @property
+    def content(self):  # type: () -> bytes
+        if self._content is None:
+            self._content = b''.join(self._read(64 * 1024)) if self._read else b''
+            self.close()
+        return self._content
+
+    def iter_content(self, chunk_size=1):  # type: (int) -> Iterator[bytes]
+        if self._content is not None or self._read is None:
+            content = self.content
+            for offset in range(0, len(content), chunk_size):
+                yield content[offset:offset + chunk_size]
+            return
+        for chunk in self._read(chunk_size):
+            yield chunk
+        self.close()
+
+    def json(self):  # type: () -> Any
+        return json.loads(self.content.decode('utf-8'))
+
+    def close(self):  # type: () -> None
+        close, self._close = self._close, None
+        if close is not None:
+            close()
+
+class RequestsTransport(Transport):
+    """Sends requests with a requests session. This is the default transport."""
+
+    def __init__(self, *args, **kwargs):  # type: (*Any, **Any) -> None
+        Transport.__init__(self, *args, **kwargs)
+        # requests is only imported once the first client connects; importing tinify stays cheap.
+        import requests.adapters
+
+        self.session = requests.sessions.Session()
+        # Size the pool for the number of threads sharing this client, so connections are
+        # kept warm instead of being discarded and set up again with a new TLS handshake.
+        self.adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        self.session.mount('https://', self.adapter)
+        if self.proxy:
+            self.session.proxies = {'https': self.proxy}
+        self.session.auth = self.auth
+        self.session.headers = dict(self.headers)  # type: ignore[assignment]
+        if not self.keep_alive:
+            self.session.headers['connection'] = 'close'
+        if self.verify:
+            self.session.verify = self.verify
+
+    def request(self, method, url, headers=None, data=None, stream=False, timeout=None):  # type: (str, str, Optional[Dict[str, str]], Any, bool, Optional[Tuple[float, float]]) -> Any
+        return self.session.request(method, url, headers=headers, data=data, stream=stream, timeout=timeout)
+
+    def is_timeout(self, error):  # type: (Exception) -> bool
+        import requests.exceptions
+        return isinstance(error, requests.exceptions.Timeout)
+
+    def pool_stats(self):  # type: () -> List[Dict[str, Any]]
+        return _pool_stats(self.adapter.poolmanager)
+
+    def close(self):  # type: () -> None
+        self.session.close()
+
+class Urllib3Transport(Transport):
+    """Sends requests with urllib3 directly, with less overhead per request than requests."""
+
+    def __init__(self, *args, **kwargs):  # type: (*Any, **Any) -> None
+        Transport.__init__(self, *args, **kwargs)
+        import urllib3
+
+        headers = dict(self.headers)
+        headers['authorization'] = _basic_auth(self.auth)
+        if not self.keep_alive:
+            headers['connection'] = 'close'
+        self._headers = headers
+
+        options = {
+            'num_pools': self.pool_connections,
+            'maxsize': self.pool_maxsize,
+            'block': self.pool_block,
+            'cert_reqs': 'CERT_REQUIRED',
+            'ca_certs': self.verify,
+        }  # type: Dict[str, Any]
+        if self.proxy:
+            self.pool = urllib3.ProxyManager(self.proxy, **options)  # type: urllib3.PoolManager
+        else:
+            self.pool = urllib3.PoolManager(**options)
+
+    def request(self, method, url, headers=None, data=None, stream=False, timeout=None):  # type: (str, str, Optional[Dict[str, str]], Any, bool, Optional[Tuple[float, float]]) -> Any
+        import urllib3
+
+        merged = dict(self._headers)
+        merged.update(headers or {})
+        started = time.time()
+        response = self.pool.request(method, url, body=data, headers=merged,
+            timeout=urllib3.Timeout(connect=timeout[0], read=timeout[1]) if timeout else None,
+            preload_content=not stream, retries=False)
+        elapsed = time.time() - started
+        if not stream:
+            return Response(response.status, response.headers, content=response.data, elapsed=elapsed)
+
+        consumed = [False]
+
+        def read(chunk_size):  # type: (int) -> Iterator[bytes]
+            for chunk in response.stream(chunk_size):
+                yield chunk
+            consumed[0] = True
+
+        def close():  # type: () -> None
+            # Like requests, drop the connection if the body was not read to the end.
+            if not consumed[0]:
+                response.close()
+            response.release_conn()
+
+        return Response(response.status, response.headers, read=read, close=close, elapsed=elapsed)
+
+    def is_timeout(self, error):  # type: (Exception) -> bool
+        import urllib3.exceptions
+        return isinstance(error, urllib3.exceptions.TimeoutError)
+
+    def pool_stats(self):  # type: () -> List[Dict[str, Any]]
+        return _pool_stats(self.pool)
+
+    def close(self):  # type: () -> None
+        self.pool.clear()
+
+class HttpxTransport(Transport):
+    """Sends requests with httpx, over HTTP/2 by default (requires tinify[http2]).
+
+    With HTTP/2 the requests of all threads sharing a client are multiplexed over one
+    connection. Pass http2=False, e.g. with functools.partial, to use HTTP/1.1.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, *args, **kwargs):  # type: (*Any, **Any) -> None
+        http2 = kwargs.pop('http2', True)
+        Transport.__init__(self, *args, **kwargs)
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError('HttpxTransport requires httpx, install it with: pip install tinify[http2]')
+        import ssl
+
+        self.client = httpx.Client(
+            auth=self.auth,
+            headers=self.headers,
+            verify=ssl.create_default_context(cafile=self.verify) if self.verify else True,
+            proxy=self.proxy or None,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize if self.keep_alive else 0,
+            ),
+            follow_redirects=True,
+        )
+
+    def request(self, method, url, headers=None, data=None, stream=False, timeout=None):  # type: (str, str, Optional[Dict[str, str]], Any, bool, Optional[Tuple[float, float]]) -> Any
+        import httpx
+
+        # httpx sends bytes, and iterables of bytes; a file is read in chunks rather than lines.
+        if isinstance(data, (bytearray, memoryview)):
+            data = bytes(data)
+        elif hasattr(data, 'read'):
+            stream_body = data
+            data = iter(lambda: stream_body.read(self.CHUNK_SIZE), b'')
+        # Requests wait for a free connection without a time limit, as with the async client.
+        timeouts = httpx.Timeout(connect=timeout[0], read=timeout[1], write=timeout[1], pool=None) if timeout else None
+
+        started = time.time()
+        request = self.client.build_request(method, url, headers=headers, content=data, timeout=timeouts)
+        response = self.client.send(request, stream=stream)
+        elapsed = time.time() - started
+        if not stream:
+            return Response(response.status_code, response.headers, content=response.content, elapsed=elapsed)
+        return Response(response.status_code, response.headers, read=response.iter_bytes, close=response.close, elapsed=elapsed)
+
+    def is_timeout(self, error):  # type: (Exception) -> bool
+        import httpx
+        return isinstance(error, httpx.TimeoutException)
+
+    def close(self):  # type: () -> None
+        self.client.close()
+
+MemoryRequest = collections.namedtuple('MemoryRequest', ['method', 'url', 'headers', 'body'])
+
+class MemoryTransport(Transport):
+    """Answers requests with registered responses, without a network. Meant for tests.
+
+    An instance is its own factory, so it can be passed to a client as it is and keeps its
+    responses and recorded requests when the client reconnects.
+
+        transport = MemoryTransport()
+        transport.add('POST', '/shrink', 201, {'Location': 'https://api.tinify.com/output/1'})
+        transport.add('GET', '/output/1', body=b'compressed')
+        tinify.transport = transport
+    """
+
+    def __init__(self):  # type: () -> None
+        Transport.__init__(self, ('', ''), {})
+        self.requests = []  # type: List[MemoryRequest]
+        self._routes = []  # type: List[Tuple[str, str, Any]]
+        self._lock = threading.Lock()
+
+    def __call__(self, auth, headers, **options):  # type: (Tuple[str, str], Dict[str, str], **Any) -> MemoryTransport
+        self.auth = auth
+        self.headers = headers
+        return self
+
+    def add(self, method, url, status=200, headers=None, body=b'', error=None):  # type: (str, str, int, Optional[Dict[str, str]], Any, Optional[Exception]) -> None
+        """Answer requests to url, or to any host when url is a path, until another response
+        is added for it. body may be bytes, text or an object sent as JSON. With error the
+        request raises it instead."""
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        with self._lock:
+            self._routes.append((method.upper(), url, error or (status, headers or {}, body)))
+
+    @property
+    def last_request(self):  # type: () -> Optional[MemoryRequest]
+        return self.requests[-1] if self.requests else None
+
+    def request(self, method, url, headers=None, data=None, stream=False, timeout=None):  # type: (str, str, Optional[Dict[str, str]], Any, bool, Optional[Tuple[float, float]]) -> Any
+        from requests.structures import CaseInsensitiveDict
+
+        merged = CaseInsensitiveDict(self.headers)
+        merged['authorization'] = _basic_auth(self.auth)
+        merged.update(headers or {})
+        with self._lock:
+            self.requests.append(MemoryRequest(method, url, merged, _read_body(data)))
+            answer = self._answer(method, url)
+        if isinstance(answer, Exception):
+            raise answer
+        status, response_headers, body = answer
+        return Response(status, CaseInsensitiveDict(response_headers), content=body)
+
+    def _answer(self, method, url):  # type: (str, str) -> Any
+        try:
+            from urllib.parse import urlsplit
+        except ImportError:
+            from urlparse import urlsplit  # type: ignore
+        path = urlsplit(url).path
+        for route_method, route_url, answer in reversed(self._routes):
+            if route_method == method.upper() and route_url in (url, path):
+                return answer
+        message = 'No response added for {0} {1}'.format(method, url)
+        return (404, {'Content-Type': 'application/json'}, json.dumps({'error': 'NotFound', 'message': message}).encode('utf-8'))
+
+def _basic_auth(auth):  # type: (Tuple[str, str]) -> str
+    credentials = '{0}:{1}'.format(*auth).encode('utf-8')
+    return 'Basic ' + base64.b64encode(credentials).decode('ascii')
+
+def _read_body(data):  # type: (Any) -> bytes
+    if data is None:
+        return b''
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    if hasattr(data, 'read'):
+        return data.read()
+    return b''.join(bytes(chunk) for chunk in data)
+
+def _pool_stats(manager):  # type: (Any) -> List[Dict[str, Any]]
+    pools = manager.pools
+    stats = []
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats.append({
+            'host': pool.host,
+            'port': pool.port,
+            'maxsize': pool.pool.maxsize if pool.pool else 0,
+            'idle': sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            'connections': pool.num_connections,
+            'requests': pool.num_requests,
+        })
+    return stats